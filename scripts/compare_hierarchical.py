@@ -0,0 +1,105 @@
+# /// script
+# requires-python = ">=3.13"
+# dependencies = [
+#     "pandas",
+#     "fsspec",
+#     "huggingface_hub",
+#     "requests",
+# ]
+# ///
+"""Compare hierarchical and flat semantic search on a running deployment.
+
+Start the API with ``HIERARCHICAL_SEARCH_ENABLED=true`` and document vectors in place
+(index the corpus with the setting on, or call ``POST /index/document-vectors``). Each
+query is sent once to warm the query embedding cache, then once with
+``"hierarchical": false`` and once with the default, in alternating order. Flat results
+are the reference: recall@k is the share of the flat top-k that hierarchical search
+also returns.
+
+    uv run python scripts/compare_hierarchical.py --queries 200 --limit 10
+"""
+
+import argparse
+import json
+import math
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import requests
+
+
+def load_queries(path: Path | None, count: int) -> list[str]:
+    """Queries from a file (one per line), or the lead sentence of held-out BBC articles."""
+    if path is not None:
+        lines = [line.strip() for line in path.read_text(encoding="utf-8").splitlines()]
+        return [line for line in lines if line][:count]
+    df = pd.read_json("hf://datasets/SetFit/bbc-news/test.jsonl", lines=True)  # type: ignore
+    return [text.split(".")[0][:200] for text in df["text"].head(count)]  # type: ignore
+
+
+def search(session: requests.Session, url: str, payload: dict[str, Any]) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    response = session.post(url, json=payload, timeout=60)
+    latency = time.perf_counter() - start
+    response.raise_for_status()
+    return latency, [hit["id"] for hit in response.json()["hits"]]
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+def compare(queries: list[str], base_url: str, index: str | None, limit: int) -> dict[str, Any]:
+    url = f"{base_url.rstrip('/')}/search/semantic" + (f"?index={index}" if index else "")
+    session = requests.Session()
+    latencies: dict[str, list[float]] = {"flat": [], "hierarchical": []}
+    recalls: list[float] = []
+    for i, query in enumerate(queries):
+        payload = {"query": query, "limit": limit}
+        search(session, url, {**payload, "hierarchical": False})
+        modes = ["flat", "hierarchical"] if i % 2 == 0 else ["hierarchical", "flat"]
+        hits: dict[str, list[str]] = {}
+        for mode in modes:
+            latency, hits[mode] = search(session, url, {**payload, "hierarchical": mode == "hierarchical"})
+            latencies[mode].append(latency * 1000)
+        if hits["flat"]:
+            recalls.append(len(set(hits["flat"]) & set(hits["hierarchical"])) / len(hits["flat"]))
+
+    return {
+        "queries": len(queries),
+        "limit": limit,
+        f"recall@{limit}": round(statistics.mean(recalls), 4) if recalls else None,
+        "latency_ms": {
+            mode: {
+                "p50": round(statistics.median(samples), 1),
+                "p90": round(_percentile(samples, 0.90), 1),
+                "p99": round(_percentile(samples, 0.99), 1),
+                "mean": round(statistics.mean(samples), 1),
+            }
+            for mode, samples in latencies.items()
+            if samples
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--index", help="named index to search (default: the server's default index)")
+    parser.add_argument("--queries", type=int, default=200, help="number of queries")
+    parser.add_argument("--query-file", type=Path, help="file with one query per line")
+    parser.add_argument("--limit", type=int, default=10, help="hits per search (k for recall@k)")
+    args = parser.parse_args()
+
+    queries = load_queries(args.query_file, args.queries)
+    if not queries:
+        parser.error("no queries to run")
+    print(json.dumps(compare(queries, args.base_url, args.index, args.limit), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+# /// script
+# requires-python = ">=3.13"
+# dependencies = [
+#     "requests",
+# ]
+# ///
+"""Replay captured request traces against the API and report latency and errors.
+
+Traces are the JSON Lines files written when ``TRACE_CAPTURE_ENABLED`` is set. Each
+trace only records the shape of a request, so bodies are rebuilt from synthetic text
+of the same size; traces whose body was too large to capture are replayed without
+one. By default the app runs in-process with local stand-ins for Meilisearch and
+Bedrock whose latencies are configurable; pass ``--base-url`` to drive a running
+deployment instead. The stand-ins only cover indexing, search and stats, so traces of
+rebuild, migration and admin routes are skipped in-process.
+
+Arrivals are open-loop: requests are sent on schedule whether or not earlier ones have
+finished, and latency is measured from the scheduled send time so queueing is counted.
+
+    uv run python scripts/replay_traces.py traces/requests.jsonl --mode poisson --rate 20 --requests 2000
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+VOCABULARY = [
+    "market",
+    "election",
+    "league",
+    "minister",
+    "film",
+    "music",
+    "growth",
+    "court",
+    "report",
+    "season",
+    "club",
+    "company",
+    "government",
+    "player",
+    "album",
+    "profit",
+    "record",
+    "china",
+    "europe",
+    "cup",
+    "technology",
+    "phone",
+    "bank",
+    "tax",
+]
+
+# Routes that need a real Meilisearch or admin state, which the in-process stand-ins lack.
+UNSTUBBED_ROUTES = ("/index/rebuild", "/index/migration", "/admin/")
+
+type Send = Callable[[str, str, Any], int]
+
+
+def load_traces(path: Path) -> list[dict[str, Any]]:
+    with path.open(encoding="utf-8") as file:
+        traces = [json.loads(line) for line in file if line.strip()]
+    return sorted(traces, key=lambda trace: trace.get("ts", 0))
+
+
+def _words(count: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(max(count, 1)))
+
+
+def _text(chars: int, rng: random.Random) -> str:
+    return _words(chars // 7 + 1, rng)[: max(chars, 1)]
+
+
+def synthesise_request(trace: dict[str, Any], sequence: int, rng: random.Random) -> tuple[str, str, Any]:
+    """Rebuild a request with the same method, route and body proportions as ``trace``."""
+    path = re.sub(r"\{[^}]+\}", f"replay-{sequence}", trace["path"])
+    if trace.get("named_index"):
+        path += "?index=replay"
+
+    body: Any = None
+    if "documents" in trace:
+        count = trace["documents"]
+        per_document = trace.get("document_chars", 0) // max(count, 1)
+        body = [{"id": f"replay-{sequence}-{i}", "body": _text(per_document, rng)} for i in range(count)]
+    elif any(key in trace for key in ("query_words", "limit", "ids", "filtered")):
+        body = {}
+        if "query_words" in trace:
+            body["query"] = _words(trace["query_words"], rng)
+        if "limit" in trace:
+            body["limit"] = trace["limit"]
+        if "ids" in trace:
+            body["ids"] = [f"replay-{sequence}-{i}" for i in range(trace["ids"])]
+        if trace.get("filtered"):
+            body["filter"] = 'metadata.source = "replay"'
+    return trace["method"], path, body
+
+
+def arrival_offsets(traces: list[dict[str, Any]], mode: str, rate: float, count: int, seed: int) -> list[float]:
+    """Send times in seconds from the start of the run."""
+    if mode == "constant":
+        return [i / rate for i in range(count)]
+    if mode == "poisson":
+        rng = random.Random(seed)
+        offsets, now = [], 0.0
+        for _ in range(count):
+            offsets.append(now)
+            now += rng.expovariate(rate)
+        return offsets
+    # "recorded": keep the captured gaps, compressed by ``rate`` (a speed-up factor).
+    first = traces[0].get("ts", 0)
+    span = traces[-1].get("ts", 0) - first
+    offsets = []
+    for i in range(count):
+        lap, position = divmod(i, len(traces))
+        offsets.append((lap * (span + 1) + traces[position].get("ts", 0) - first) / rate)
+    return offsets
+
+
+def _stand_in_app(args: argparse.Namespace) -> Iterator[Send]:
+    """Run the real app with Meilisearch and Bedrock replaced by in-memory stand-ins."""
+    for name, value in {
+        "MODEL_ID": "replay-model",
+        "EMBEDDER_NAME": "replay",
+        "MEILISEARCH_URL": "http://127.0.0.1:7700",
+        "MEILI_MASTER_KEY": "replay",
+        "AWS_ACCESS_KEY_ID": "replay",
+        "AWS_SECRET_ACCESS_KEY": "replay",
+        "REGION": "eu-west-2",
+        "PREWARM_ON_STARTUP": "false",
+        "TRACE_CAPTURE_ENABLED": "false",
+    }.items():
+        os.environ.setdefault(name, value)
+
+    from fastapi.testclient import TestClient
+    from langchain_core.embeddings import Embeddings
+
+    from src.app import app
+    from src.dependencies.index_dependencies import (
+        get_admin_profiler,
+        get_dependencies,
+        get_indexing_dependencies,
+        get_migration,
+        get_prewarmer,
+        get_query_log,
+        get_rebuilds,
+        get_runtime_stats,
+        get_workloads,
+    )
+    from src.domain.dataclasses.dataclasses import (
+        SearchRequestDataClass,
+        SimilarityRequestDataClass,
+        VectorisedDocument,
+    )
+    from src.exceptions.exceptions import FeatureDisabledError
+    from src.infrastructure.llms.base import LLMABC
+    from src.infrastructure.vectorstores.base import VectorStoreABC
+    from src.service.prewarm import Prewarmer
+    from src.service.query_log import QueryLog
+    from src.service.search_service import SearchService
+    from src.service.singleflight import get_search_coalescer
+
+    def pause(mean_s: float) -> None:
+        if mean_s > 0:
+            time.sleep(random.expovariate(1 / mean_s))
+
+    class StandInEmbeddings(Embeddings):
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            pause(args.embed_latency)
+            return [self.embed(text) for text in texts]
+
+        def embed_query(self, text: str) -> list[float]:
+            pause(args.embed_latency)
+            return self.embed(text)
+
+        @staticmethod
+        def embed(text: str) -> list[float]:
+            return [byte / 255 for byte in hashlib.blake2b(text.encode(), digest_size=16).digest()]
+
+    class StandInVectorStore(VectorStoreABC):
+        def __init__(self) -> None:
+            self.documents: dict[str, VectorisedDocument] = {}
+            self.lock = threading.Lock()
+
+        def add_texts(self, documents: list[VectorisedDocument]) -> None:
+            pause(args.search_latency)
+            with self.lock:
+                self.documents.update((document.id, document) for document in documents)
+
+        def delete_documents(self, document_ids: list[str]) -> None:
+            pause(args.search_latency)
+            removed = set(document_ids)
+            with self.lock:
+                self.documents = {k: v for k, v in self.documents.items() if v.doc_id not in removed}
+
+        def hybrid_search(self, query: SearchRequestDataClass, vector: list[float]) -> dict[str, Any]:
+            pause(args.search_latency)
+            return self._results(query.limit)
+
+        def similarity_search(self, request: SimilarityRequestDataClass) -> dict[str, Any]:
+            pause(args.search_latency)
+            return self._results(request.limit)
+
+        def remove_embedder(self, embedder_name: str) -> None:
+            with self.lock:
+                for document in self.documents.values():
+                    document.vectors.pop(embedder_name, None)
+
+        def iter_documents(self, batch_size: int = 1000) -> Iterator[list[VectorisedDocument]]:
+            with self.lock:
+                documents = list(self.documents.values())
+            for start in range(0, len(documents), batch_size):
+                yield documents[start : start + batch_size]
+
+        def get_documents_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+            with self.lock:
+                found = [self.documents[i] for i in ids if i in self.documents]
+            return [{"id": document.id, "chunk": document.chunk, "url": document.url} for document in found]
+
+        def _results(self, limit: int) -> dict[str, Any]:
+            with self.lock:
+                documents = list(self.documents.values())[:limit]
+            hits = [{"id": document.id, "chunk": document.chunk, "url": document.url} for document in documents]
+            return {"hits": hits, "processingTimeMs": 0, "limit": limit, "offset": 0, "estimatedTotalHits": len(hits)}
+
+    class StandInLLM(LLMABC):
+        def extract_keywords(self, query: str) -> str:
+            pause(args.llm_latency)
+            return ", ".join(query.split()[:5])
+
+        def summarise(self, query: str, results: dict[str, Any]) -> str:
+            pause(args.llm_latency * 4)
+            return f"Summary of {len(results['hits'])} results."
+
+    service = SearchService(
+        StandInEmbeddings(),
+        StandInVectorStore(),
+        StandInLLM(),
+        embedding_concurrency=4,
+        coalescer=get_search_coalescer(),
+    )
+    app.dependency_overrides[get_dependencies] = lambda: service
+    app.dependency_overrides[get_indexing_dependencies] = lambda: service
+    query_log = QueryLog(sample_rate=0.0)
+    app.dependency_overrides[get_query_log] = lambda: query_log
+    app.dependency_overrides[get_prewarmer] = lambda: Prewarmer(query_log, service_factory=lambda _: service)
+    app.dependency_overrides[get_runtime_stats] = lambda: {
+        "workloads": get_workloads().stats(),
+        "coalescing": get_search_coalescer().stats(),
+    }
+
+    def unstubbed() -> None:
+        raise FeatureDisabledError("Not available when replaying in-process; use --base-url.")
+
+    # A safety net behind UNSTUBBED_ROUTES: these would otherwise reach a real Meilisearch.
+    for dependency in (get_rebuilds, get_migration, get_admin_profiler):
+        app.dependency_overrides[dependency] = unstubbed
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+
+        def send(method: str, path: str, body: Any) -> int:
+            return client.request(method, path, json=body).status_code
+
+        yield send
+
+
+def _remote(base_url: str) -> Iterator[Send]:
+    import requests
+
+    session = requests.Session()
+
+    def send(method: str, path: str, body: Any) -> int:
+        return session.request(method, base_url.rstrip("/") + path, json=body, timeout=60).status_code
+
+    try:
+        yield send
+    finally:
+        session.close()
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarise(results: dict[str, list[tuple[float, int]]], elapsed_s: float) -> dict[str, Any]:
+    summary: dict[str, Any] = {"elapsed_s": round(elapsed_s, 2), "endpoints": {}}
+    everything = [result for endpoint in results.values() for result in endpoint]
+    for name, endpoint_results in sorted(results.items()) + [("TOTAL", everything)]:
+        latencies = [latency * 1000 for latency, _ in endpoint_results]
+        if not latencies:
+            continue
+        summary["endpoints"][name] = {
+            "requests": len(endpoint_results),
+            "server_error_rate": round(sum(status >= 500 for _, status in endpoint_results) / len(latencies), 4),
+            "client_error_rate": round(sum(400 <= status < 500 for _, status in endpoint_results) / len(latencies), 4),
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p90_ms": round(_percentile(latencies, 0.90), 1),
+            "p99_ms": round(_percentile(latencies, 0.99), 1),
+            "max_ms": round(max(latencies), 1),
+        }
+    summary["throughput_rps"] = round(len(everything) / elapsed_s, 2) if elapsed_s else 0.0
+    return summary
+
+
+def _print_summary(summary: dict[str, Any]) -> None:
+    print(f"{'endpoint':<40} {'n':>6} {'5xx':>7} {'4xx':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for name, row in summary["endpoints"].items():
+        print(
+            f"{name:<40} {row['requests']:>6} {row['server_error_rate']:>7.2%} {row['client_error_rate']:>7.2%} "
+            f"{row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}",
+        )
+    print(f"\n{summary['throughput_rps']} req/s over {summary['elapsed_s']}s")
+
+
+def replay(traces: list[dict[str, Any]], send: Send, args: argparse.Namespace) -> dict[str, Any]:
+    count = args.requests or len(traces)
+    offsets = arrival_offsets(traces, args.mode, args.rate, count, args.seed)
+    rng = random.Random(args.seed)
+    requests = [synthesise_request(traces[i % len(traces)], i, rng) for i in range(count)]
+
+    results: dict[str, list[tuple[float, int]]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def fire(name: str, request: tuple[str, str, Any], scheduled_at: float) -> None:
+        try:
+            status = send(*request)
+        except Exception:  # noqa: BLE001
+            status = 599
+        latency = time.perf_counter() - scheduled_at
+        with lock:
+            results[name].append((latency, status))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.max_in_flight) as executor:
+        for i, (offset, request) in enumerate(zip(offsets, requests, strict=True)):
+            scheduled_at = start + offset
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            trace = traces[i % len(traces)]
+            executor.submit(fire, f"{trace['method']} {trace['path']}", request, scheduled_at)
+    return summarise(results, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traces", type=Path, help="JSON Lines trace file")
+    parser.add_argument("--mode", choices=["constant", "poisson", "recorded"], default="poisson")
+    parser.add_argument("--rate", type=float, default=10.0, help="requests/s, or speed-up factor for 'recorded'")
+    parser.add_argument("--requests", type=int, default=0, help="number of requests (default: one per trace)")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process stand-ins")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="mean stand-in embedding latency (s)")
+    parser.add_argument("--search-latency", type=float, default=0.01, help="mean stand-in Meilisearch latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="mean stand-in keyword-extraction latency (s)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    traces = load_traces(args.traces)
+    if not args.base_url:
+        skipped = {trace["path"] for trace in traces if trace["path"].startswith(UNSTUBBED_ROUTES)}
+        if skipped:
+            traces = [trace for trace in traces if trace["path"] not in skipped]
+            print(
+                f"Skipping routes the in-process stand-ins do not cover: {', '.join(sorted(skipped))}", file=sys.stderr
+            )
+    if not traces:
+        parser.error(f"no replayable traces in {args.traces}")
+
+    target = _remote(args.base_url) if args.base_url else _stand_in_app(args)
+    send = next(target)
+    try:
+        summary = replay(traces, send, args)
+    finally:
+        target.close()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        _print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# /// script
+# requires-python = ">=3.13"
+# dependencies = [
+#     "pyarrow",
+# ]
+# ///
+"""Export an index's chunks and vectors to a snapshot file, or restore them from one.
+
+Restoring writes the stored vectors straight back, so standing up a new Meilisearch
+node, recovering from a loss or re-creating an index with new settings costs file and
+network I/O instead of a full re-embedding. Uses the app's settings (``ENV_FILE``) to
+reach Meilisearch; a ``.parquet`` path gives a compressed Parquet file, anything else
+a memory-mappable Arrow IPC file.
+
+    uv run --extra snapshots python scripts/vector_snapshot.py export snapshots/documents.arrow --index documents
+    uv run --extra snapshots python scripts/vector_snapshot.py import snapshots/documents.arrow --index documents
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--index", default=None, help="index name (defaults to INDEX_NAME)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from src.conf.settings import get_settings
+    from src.dependencies.index_dependencies import get_dependencies, get_embedder_layout, get_indexing_dependencies
+    from src.infrastructure.workloads import workload
+    from src.service.snapshots import export_snapshot, import_snapshot
+
+    index_name = args.index or get_settings().index_name
+    service = get_dependencies(index_name) if args.action == "export" else get_indexing_dependencies(index_name)
+    vectorstore = service.vectorstore
+    embedder_name = get_embedder_layout(index_name).read
+
+    start = time.perf_counter()
+    with workload("ingest"):
+        if args.action == "export":
+            count = export_snapshot(vectorstore, args.path, embedder_name, args.batch_size)
+        else:
+            count = import_snapshot(vectorstore, args.path, embedder_name, args.batch_size)
+    direction = "from" if args.action == "export" else "into"
+    print(f"{args.action.title()}ed {count} chunks {direction} {index_name} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
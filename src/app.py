@@ -1,22 +1,86 @@
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from functools import partial
 from typing import Annotated, Any
 
 from fastapi import BackgroundTasks, Depends, FastAPI, Request
 from fastapi.responses import JSONResponse
 
-from src.dependencies.index_dependencies import get_dependencies
+from src.conf.settings import get_settings
+from src.dependencies.index_dependencies import (
+    get_admin_profiler,
+    get_deadline,
+    get_dependencies,
+    get_embedder_layout,
+    get_index_name,
+    get_indexing_dependencies,
+    get_migration,
+    get_prewarmer,
+    get_profiler,
+    get_query_log,
+    get_rebuilds,
+    get_runtime_stats,
+    get_trace_recorder,
+    get_workloads,
+)
+from src.domain.chunk import close_chunking_engines
 from src.domain.dataclasses.dataclasses import (
     Document,
     SearchRequestDataClass,
     SimilarityRequestDataClass,
 )
-from src.domain.schemas.requests import IndexRequest, SearchRequest, SimilarityRequest
-from src.exceptions.exceptions import AppError
+from src.domain.schemas.requests import (
+    DeleteRequest,
+    IndexRequest,
+    SearchRequest,
+    SimilarityBatchRequest,
+    SimilarityRequest,
+)
+from src.exceptions.exceptions import AppError, FeatureDisabledError, ProfileNotFoundError
 from src.infrastructure.logger import setup_logger
+from src.infrastructure.profiling import Profiler, ProfilingMiddleware
+from src.infrastructure.tracing import TraceMiddleware
+from src.infrastructure.vectorstores.neighbours import NeighbourCachedVectorStore, save_neighbour_tables
+from src.infrastructure.workloads import WorkloadScheduler
+from src.service.deadline import Deadline
+from src.service.deduplication import save_deduplicators
+from src.service.migration import EmbedderLayout, EmbeddingMigration, stop_migrations
+from src.service.prewarm import Prewarmer
+from src.service.query_log import QueryLog
+from src.service.rebuild import RebuildManager
 from src.service.search_service import SearchService
 
 logger = setup_logger(name="logger")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    query_log = get_query_log()
+    query_log.load()
+    if get_settings().prewarm_on_startup:
+        get_prewarmer().start()
+    yield
+    # Let queued ingest finish before the state it updates is saved.
+    get_workloads().join()
+    close_chunking_engines()
+    stop_migrations()
+    query_log.save()
+    save_neighbour_tables()
+    save_deduplicators()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfilingMiddleware, profiler_factory=get_profiler)
+app.add_middleware(TraceMiddleware, recorder_factory=get_trace_recorder)
+
+
+def _ingest_then_prewarm(
+    ingest: Callable[[list[Document]], None],
+    documents: list[Document],
+    prewarmer: Prewarmer,
+) -> None:
+    ingest(documents)
+    prewarmer.start()
 
 
 @app.exception_handler(AppError)
@@ -39,36 +103,282 @@ async def app_error_handler(request: Request, exc: AppError) -> JSONResponse:
 )
 def index(
     documents: list[IndexRequest],
-    search_service: Annotated[SearchService, Depends(get_dependencies)],
-    background_tasks: BackgroundTasks,
+    search_service: Annotated[SearchService, Depends(get_indexing_dependencies)],
+    prewarmer: Annotated[Prewarmer, Depends(get_prewarmer)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
 ) -> dict[str, str]:
     docs = [Document(**doc.model_dump()) for doc in documents]
-    background_tasks.add_task(search_service.index_documents, docs)
+    workloads.submit("ingest", partial(_ingest_then_prewarm, search_service.index_documents, docs, prewarmer))
+    return {"status": "success"}
+
+
+@app.put(
+    "/index/document",
+    status_code=202,
+)
+def replace(
+    documents: list[IndexRequest],
+    search_service: Annotated[SearchService, Depends(get_indexing_dependencies)],
+    prewarmer: Annotated[Prewarmer, Depends(get_prewarmer)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
+) -> dict[str, str]:
+    docs = [Document(**doc.model_dump()) for doc in documents]
+    workloads.submit("ingest", partial(_ingest_then_prewarm, search_service.replace_documents, docs, prewarmer))
+    return {"status": "success"}
+
+
+@app.delete(
+    "/index/document/{document_id}",
+    status_code=202,
+)
+def delete(
+    document_id: str,
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+) -> dict[str, str]:
+    search_service.delete_documents([document_id])
+    return {"status": "success"}
+
+
+@app.post(
+    "/index/document/delete",
+    status_code=202,
+)
+def bulk_delete(
+    request: DeleteRequest,
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+) -> dict[str, str]:
+    search_service.delete_documents(request.ids)
+    return {"status": "success"}
+
+
+@app.get("/index/dead-letters")
+def dead_letters(
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+) -> dict[str, Any]:
+    if search_service.dead_letters is None:
+        raise FeatureDisabledError("No dead-letter queue is configured.")
+    return search_service.dead_letters.summary()
+
+
+@app.post(
+    "/index/dead-letters/retry",
+    status_code=202,
+)
+def retry_dead_letters(
+    search_service: Annotated[SearchService, Depends(get_indexing_dependencies)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
+) -> dict[str, str]:
+    workloads.submit("ingest", search_service.retry_dead_letters)
+    return {"status": "success"}
+
+
+@app.post(
+    "/index/neighbours",
+    status_code=202,
+)
+def rebuild_neighbours(
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
+) -> dict[str, str]:
+    vectorstore = search_service.vectorstore
+    if not isinstance(vectorstore, NeighbourCachedVectorStore):
+        raise FeatureDisabledError("Precomputed neighbours are not enabled.")
+    workloads.submit("ingest", vectorstore.rebuild)
+    return {"status": "success"}
+
+
+@app.post(
+    "/index/document-vectors",
+    status_code=202,
+)
+def build_document_vectors(
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
+) -> dict[str, str]:
+    if not search_service.uses_document_vectors:
+        raise FeatureDisabledError("Hierarchical search is not enabled.")
+    workloads.submit("ingest", search_service.build_document_vectors)
     return {"status": "success"}
 
 
+@app.post(
+    "/index/rebuild",
+    status_code=201,
+)
+def start_rebuild(
+    index_name: Annotated[str, Depends(get_index_name)],
+    search_service: Annotated[SearchService, Depends(get_indexing_dependencies)],
+    layout: Annotated[EmbedderLayout, Depends(get_embedder_layout)],
+    rebuilds: Annotated[RebuildManager, Depends(get_rebuilds)],
+) -> dict[str, Any]:
+    # The shadow index gets the embedders and dimensions the live one is written with,
+    # including a migration's second embedder.
+    return rebuilds.start(index_name, search_service, layout).summary()
+
+
+@app.post("/index/rebuild/documents")
+async def add_rebuild_documents(
+    documents: list[IndexRequest],
+    index_name: Annotated[str, Depends(get_index_name)],
+    rebuilds: Annotated[RebuildManager, Depends(get_rebuilds)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
+) -> dict[str, Any]:
+    docs = [Document(**doc.model_dump()) for doc in documents]
+    chunks = await workloads.run("ingest", partial(rebuilds.get(index_name).add_documents, docs))
+    return {"status": "success", "chunks": chunks}
+
+
+@app.post(
+    "/index/rebuild/swap",
+    status_code=202,
+)
+def swap_rebuild(
+    index_name: Annotated[str, Depends(get_index_name)],
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+    rebuilds: Annotated[RebuildManager, Depends(get_rebuilds)],
+    prewarmer: Annotated[Prewarmer, Depends(get_prewarmer)],
+    background_tasks: BackgroundTasks,
+) -> dict[str, Any]:
+    rebuild = rebuilds.get(index_name)
+    rebuild.begin_swap()
+    vectorstore = search_service.vectorstore
+    on_swapped = vectorstore.rebuild if isinstance(vectorstore, NeighbourCachedVectorStore) else None
+    background_tasks.add_task(rebuild.swap, on_swapped)
+    background_tasks.add_task(prewarmer.start)
+    return rebuild.summary()
+
+
+@app.get("/index/rebuild")
+def rebuild_status(
+    index_name: Annotated[str, Depends(get_index_name)],
+    rebuilds: Annotated[RebuildManager, Depends(get_rebuilds)],
+) -> dict[str, Any]:
+    return rebuilds.get(index_name).summary()
+
+
+@app.delete("/index/rebuild")
+def abort_rebuild(
+    index_name: Annotated[str, Depends(get_index_name)],
+    rebuilds: Annotated[RebuildManager, Depends(get_rebuilds)],
+) -> dict[str, Any]:
+    rebuild = rebuilds.get(index_name)
+    rebuild.abort()
+    return rebuild.summary()
+
+
+@app.get("/index/migration")
+def migration_status(
+    migration: Annotated[EmbeddingMigration, Depends(get_migration)],
+) -> dict[str, Any]:
+    return migration.status()
+
+
+@app.post(
+    "/index/migration/backfill",
+    status_code=202,
+)
+def start_backfill(
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+    migration: Annotated[EmbeddingMigration, Depends(get_migration)],
+) -> dict[str, Any]:
+    migration.start(search_service)
+    return migration.status()
+
+
+@app.post("/index/migration/cleanup")
+def cleanup_migration(
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+    migration: Annotated[EmbeddingMigration, Depends(get_migration)],
+) -> dict[str, Any]:
+    migration.cleanup(search_service.vectorstore)
+    return migration.status()
+
+
 @app.post("/search/semantic")
-def semantic_search(
+async def semantic_search(
     request: SearchRequest,
     search_service: Annotated[SearchService, Depends(get_dependencies)],
+    query_log: Annotated[QueryLog, Depends(get_query_log)],
+    index_name: Annotated[str, Depends(get_index_name)],
+    deadline: Annotated[Deadline, Depends(get_deadline)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
 ) -> dict[str, Any]:
+    query_log.record(index_name, request.query, request.limit)
     request_data = SearchRequestDataClass(**request.model_dump())
-    return search_service.semantic_search(request=request_data)
+    return await workloads.run(
+        "query",
+        partial(search_service.semantic_search, request=request_data, deadline=deadline),
+    )
 
 
 @app.post("/search/conversational")
-def generative_search(
+async def generative_search(
     request: SearchRequest,
     search_service: Annotated[SearchService, Depends(get_dependencies)],
+    query_log: Annotated[QueryLog, Depends(get_query_log)],
+    index_name: Annotated[str, Depends(get_index_name)],
+    deadline: Annotated[Deadline, Depends(get_deadline)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
 ) -> dict[str, Any]:
+    query_log.record(index_name, request.query, request.limit)
     request_data = SearchRequestDataClass(**request.model_dump())
-    return search_service.conversational_search(request=request_data)
+    return await workloads.run(
+        "query",
+        partial(search_service.conversational_search, request=request_data, deadline=deadline),
+    )
 
 
 @app.post("/search/similar")
-def similar_search(
+async def similar_search(
     request: SimilarityRequest,
     search_service: Annotated[SearchService, Depends(get_dependencies)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
 ) -> dict[str, Any]:
     request_data = SimilarityRequestDataClass(**request.model_dump())
-    return search_service.similar_search(request=request_data)
+    return await workloads.run("query", partial(search_service.similar_search, request=request_data))
+
+
+@app.post("/search/similar/batch")
+async def similar_search_batch(
+    request: SimilarityBatchRequest,
+    search_service: Annotated[SearchService, Depends(get_dependencies)],
+    workloads: Annotated[WorkloadScheduler, Depends(get_workloads)],
+) -> dict[str, Any]:
+    requests = [
+        SimilarityRequestDataClass(id=document_id, limit=request.limit, filter=request.filter)
+        for document_id in request.ids
+    ]
+    return {"results": await workloads.run("query", partial(search_service.similar_search_batch, requests))}
+
+
+@app.get("/stats")
+def stats(
+    runtime_stats: Annotated[dict[str, Any], Depends(get_runtime_stats)],
+) -> dict[str, Any]:
+    return runtime_stats
+
+
+@app.get("/admin/profiles")
+def list_profiles(
+    profiler: Annotated[Profiler, Depends(get_admin_profiler)],
+) -> dict[str, Any]:
+    return {"profiles": profiler.profiles()}
+
+
+@app.get("/admin/profiles/hot")
+def hot_functions(
+    profiler: Annotated[Profiler, Depends(get_admin_profiler)],
+    limit: int = 20,
+) -> dict[str, Any]:
+    return profiler.hot_functions(limit)
+
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    profiler: Annotated[Profiler, Depends(get_admin_profiler)],
+) -> dict[str, Any]:
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise ProfileNotFoundError
+    return profile.to_dict()
@@ -16,12 +16,96 @@ class Settings(BaseSettings):
     provider: Literal["Amazon"] = "Amazon"
     model_id: str
     embedder_name: str
+    embedder_dimensions: int = 1024
     meilisearch_url: str
+    meilisearch_shard_urls: list[str] = []
+    shard_read_concurrency: int = 0
+    shard_write_concurrency: int = 0
+    meilisearch_replica_urls: list[str] = []
+    replica_max_strikes: int = 3
+    replica_ejection_s: float = 30.0
+    replica_slow_threshold_s: float = 2.0
+    meilisearch_pool_size: int = 10
+    meilisearch_ingest_pool_size: int = 4
+    meilisearch_max_batch_bytes: int = 10_000_000
+    meilisearch_write_concurrency: int = 2
+    meilisearch_max_pending_tasks: int = 20
+    meilisearch_write_retries: int = 3
+    rebuild_write_concurrency: int = 4
+    rebuild_wait_timeout_s: float = 3600.0
+    index_name: str = "documents"
+    index_registry_size: int = 32
     meili_master_key: SecretStr
     aws_access_key_id: SecretStr
     aws_secret_access_key: SecretStr
     region: str
     model_provider: Literal["Bedrock"] = "Bedrock"
+    chunk_size: int = 4000
+    chunk_overlap: int = 200
+    chunk_length_unit: Literal["characters", "tokens"] = "characters"
+    chunking_workers: int = 0
+    chunking_parallel_threshold: int = 1_000_000
+    embedding_initial_concurrency: int = 4
+    embedding_max_concurrency: int = 16
+    embedding_latency_target_s: float = 5.0
+    embedding_max_retries: int = 5
+    ingest_embedding_initial_concurrency: int = 2
+    ingest_embedding_max_concurrency: int = 8
+    workload_query_concurrency: int = 32
+    workload_query_queue: int = 256
+    workload_ingest_concurrency: int = 2
+    workload_ingest_queue: int = 100
+    workload_ingest_max_yield_s: float = 10.0
+    index_document_retries: int = 2
+    index_retry_delay_s: float = 1.0
+    dead_letter_dir: str = "dead_letters"
+    search_coalescing_enabled: bool = True
+    query_embedding_cache_size: int = 10_000
+    query_log_sample_rate: float = 0.1
+    query_log_max_entries: int = 10_000
+    query_log_path: str | None = None
+    prewarm_on_startup: bool = True
+    prewarm_top_n: int = 200
+    prewarm_max_qps: float = 2.0
+    neighbour_table_enabled: bool = False
+    neighbour_table_k: int = 20
+    neighbour_table_dir: str = "neighbour_tables"
+    hierarchical_search_enabled: bool = False
+    hierarchical_document_candidates: int = 20
+    migration_embedder_name: str | None = None
+    migration_model_id: str | None = None
+    migration_dimensions: int = 1024
+    migration_read_target: bool = False
+    migration_batch_size: int = 100
+    migration_max_chunks_per_s: float = 20.0
+    migration_state_dir: str = "migrations"
+    session_max_count: int = 1000
+    session_ttl_s: float = 1800.0
+    session_max_turns: int = 10
+    session_max_hits: int = 50
+    session_reuse_similarity: float = 0.9
+    session_follow_up_similarity: float = 0.6
+    trace_capture_enabled: bool = False
+    trace_capture_path: str = "traces/requests.jsonl"
+    trace_sample_rate: float = 1.0
+    request_timeout_s: float = 30.0
+    keyword_extraction_budget_s: float = 2.0
+    min_summary_budget_s: float = 1.0
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_delay_s: float = 0.25
+    llm_hedge_budget_ratio: float = 0.05
+    llm_hedge_model_id: str | None = None
+    # Off by default: skipped duplicates are invisible to the duplicating document's filters.
+    dedup_enabled: bool = False
+    dedup_max_distance: int = 6
+    dedup_shingle_size: int = 2
+    dedup_signature_dir: str = "dedup_signatures"
+    profiling_enabled: bool = False
+    profiling_admin_token: SecretStr | None = None
+    profiling_sample_every: int = 0
+    profiling_interval_s: float = 0.005
+    profiling_max_profiles: int = 50
     model_config = SettingsConfigDict(env_file=env_file, env_file_encoding="UTF-8")
 
     @classmethod
@@ -1,30 +1,403 @@
-from src.conf.settings import get_settings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Annotated, Any
+
+from fastapi import Depends, Header, Query
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from src.conf.settings import Settings, get_settings
+from src.domain.chunk import get_chunking_engine
+from src.exceptions.exceptions import AdminAuthorisationError, FeatureDisabledError
 from src.infrastructure.llms.bedrock import LangchainLLM, get_embedder
+from src.infrastructure.llms.cache import CachedEmbeddings, get_query_embedding_cache
+from src.infrastructure.llms.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    AdaptiveEmbeddings,
+    get_embedding_limiter,
+)
 from src.infrastructure.llms.factory import get_langchain_base_chat_model
-from src.infrastructure.vectorstores.meilisearch import get_vectorstore
+from src.infrastructure.llms.hedging import Hedger, get_llm_hedger
+from src.infrastructure.profiling import Profiler
+from src.infrastructure.tracing import TraceRecorder
+from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.vectorstores.meilisearch import WriteOptions
+from src.infrastructure.vectorstores.neighbours import NeighbourCachedVectorStore, get_neighbour_table
+from src.infrastructure.vectorstores.registry import IndexRegistry, get_index_registry
+from src.infrastructure.vectorstores.replicas import get_replicated_vectorstore, replica_stats
+from src.infrastructure.vectorstores.sharded import get_sharded_vectorstore
+from src.infrastructure.workloads import WorkloadScheduler
+from src.service.dead_letters import get_dead_letter_queue
+from src.service.deadline import Deadline, StageBudgets, stage_executor
+from src.service.deduplication import deduplication_stats, get_deduplicator
+from src.service.migration import EmbedderLayout, EmbeddingMigration, get_embedding_migration
+from src.service.prewarm import Prewarmer
+from src.service.query_log import QueryLog
+from src.service.rebuild import RebuildManager, RebuildMirroredVectorStore
 from src.service.search_service import SearchService
+from src.service.sessions import SessionStore
+from src.service.singleflight import get_search_coalescer
+
+
+def get_index_name(
+    index: Annotated[str | None, Query(pattern=r"^[a-zA-Z0-9_-]+$", max_length=400)] = None,
+) -> str:
+    return index or get_settings().index_name
+
+
+def get_dependencies(index_name: Annotated[str, Depends(get_index_name)]) -> SearchService:
+    """The service for an existing index; an unknown index is a 404 rather than a new index."""
+    return _get_search_service(index_name, create=False)
+
+
+def get_indexing_dependencies(index_name: Annotated[str, Depends(get_index_name)]) -> SearchService:
+    """The service for an index being written to, which is created if it does not exist yet."""
+    return _get_search_service(index_name, create=True)
+
+
+def _get_search_service(index_name: str, create: bool) -> SearchService:
+    settings = get_settings()
+    layout = get_embedder_layout(index_name)
+    embedder = _get_embeddings(settings, _model_id(settings, layout.read))
 
+    vectorstore: VectorStoreABC
+    if settings.meilisearch_shard_urls:
+        vectorstore = get_sharded_vectorstore(
+            layout.read,
+            tuple(settings.meilisearch_shard_urls),
+            settings.meili_master_key,
+            index_name,
+            settings.index_registry_size,
+            settings.meilisearch_pool_size,
+            _get_write_options(settings),
+            settings.hierarchical_search_enabled,
+            layout.read_dimensions,
+            layout.extra_embedders,
+            settings.meilisearch_ingest_pool_size,
+            settings.shard_read_concurrency,
+            settings.shard_write_concurrency,
+            create,
+        )
+    else:
+        vectorstore = primary = _get_index_registry(settings, layout).get(index_name, create=create)
+        if settings.meilisearch_replica_urls:
+            vectorstore = get_replicated_vectorstore(
+                primary,
+                tuple(settings.meilisearch_replica_urls),
+                settings.meili_master_key,
+                settings.meilisearch_pool_size,
+                settings.replica_max_strikes,
+                settings.replica_ejection_s,
+                settings.replica_slow_threshold_s,
+            )
+        if (rebuilds := get_rebuild_manager()) is not None:
+            vectorstore = RebuildMirroredVectorStore(vectorstore, rebuilds, index_name)
+    if settings.neighbour_table_enabled:
+        vectorstore = NeighbourCachedVectorStore(
+            vectorstore,
+            get_neighbour_table(Path(settings.neighbour_table_dir) / f"{index_name}.npz", k=settings.neighbour_table_k),
+        )
+    llm = LangchainLLM(
+        chat_model=_get_chat_model(settings, settings.model_id),
+        hedge_model=_get_chat_model(settings, settings.llm_hedge_model_id)
+        if settings.llm_hedge_enabled and settings.llm_hedge_model_id
+        else None,
+        hedger=_get_llm_hedger(settings) if settings.llm_hedge_enabled else None,
+    )
+
+    chunker = get_chunking_engine(
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap,
+        length_unit=settings.chunk_length_unit,
+        max_workers=settings.chunking_workers,
+        parallel_threshold=settings.chunking_parallel_threshold,
+    )
 
-def get_dependencies() -> SearchService:
+    return SearchService(
+        embedder,
+        vectorstore,
+        llm,
+        chunker,
+        embedding_concurrency=settings.embedding_max_concurrency,
+        coalescer=get_search_coalescer() if settings.search_coalescing_enabled else None,
+        deduplicator=get_deduplicator(
+            Path(settings.dedup_signature_dir) / f"{index_name}.json",
+            max_distance=settings.dedup_max_distance,
+            shingle_size=settings.dedup_shingle_size,
+        )
+        if settings.dedup_enabled
+        else None,
+        stage_budgets=StageBudgets(
+            keyword_extraction_s=settings.keyword_extraction_budget_s,
+            min_summary_s=settings.min_summary_budget_s,
+        ),
+        document_candidates=settings.hierarchical_document_candidates if settings.hierarchical_search_enabled else 0,
+        shadow_embedder=(layout.shadow, _get_embeddings(settings, _model_id(settings, layout.shadow)))
+        if layout.shadow
+        else None,
+        dead_letters=get_dead_letter_queue(Path(settings.dead_letter_dir) / f"{index_name}.jsonl"),
+        document_retries=settings.index_document_retries,
+        retry_delay_s=settings.index_retry_delay_s,
+        sessions=get_session_store(index_name),
+        stage_executor=get_stage_executor(),
+    )
+
+
+def _get_embedding_migration(index_name: str) -> EmbeddingMigration | None:
+    """The embedding migration configured for ``index_name``, if any."""
     settings = get_settings()
+    if not settings.migration_embedder_name or not settings.migration_model_id:
+        return None
+    return get_embedding_migration(
+        Path(settings.migration_state_dir) / f"{index_name}.json",
+        source=settings.embedder_name,
+        target=settings.migration_embedder_name,
+        read_target=settings.migration_read_target,
+        batch_size=settings.migration_batch_size,
+        max_chunks_per_s=settings.migration_max_chunks_per_s,
+    )
 
-    embedder = get_embedder(
+
+def get_embedder_layout(index_name: Annotated[str, Depends(get_index_name)]) -> EmbedderLayout:
+    settings = get_settings()
+    migration = _get_embedding_migration(index_name)
+    if migration is None:
+        return EmbedderLayout(settings.embedder_name, settings.embedder_dimensions)
+    return migration.layout(settings.embedder_dimensions, settings.migration_dimensions)
+
+
+def get_migration(index_name: Annotated[str, Depends(get_index_name)]) -> EmbeddingMigration:
+    migration = _get_embedding_migration(index_name)
+    if migration is None:
+        raise FeatureDisabledError("No embedding migration is configured.")
+    return migration
+
+
+def get_deadline(
+    x_request_timeout_ms: Annotated[int | None, Header(gt=0)] = None,
+) -> Deadline:
+    """Start the request's deadline; a header may shorten, but not extend, the configured timeout."""
+    timeout_s = get_settings().request_timeout_s
+    if x_request_timeout_ms is not None:
+        timeout_s = min(timeout_s, x_request_timeout_ms / 1000)
+    return Deadline(timeout_s)
+
+
+def _model_id(settings: Settings, embedder_name: str) -> str:
+    if embedder_name == settings.migration_embedder_name and settings.migration_model_id:
+        return settings.migration_model_id
+    return settings.model_id
+
+
+def _get_embeddings(settings: Settings, model_id: str) -> CachedEmbeddings:
+    return CachedEmbeddings(
+        AdaptiveEmbeddings(
+            get_embedder(
+                aws_access_key_id=settings.aws_access_key_id,
+                aws_secret_access_key=settings.aws_secret_access_key,
+                model_id=model_id,
+                region=settings.region,
+            ),
+            limiter=_get_embedding_limiter(settings),
+            max_retries=settings.embedding_max_retries,
+            ingest_limiter=_get_ingest_embedding_limiter(settings),
+        ),
+        cache=get_query_embedding_cache(settings.query_embedding_cache_size, model_id),
+    )
+
+
+def _get_chat_model(settings: Settings, model_id: str) -> BaseChatModel:
+    return get_langchain_base_chat_model(
+        provider=settings.provider,
+        model_id=model_id,
         aws_access_key_id=settings.aws_access_key_id,
         aws_secret_access_key=settings.aws_secret_access_key,
-        model_id=settings.model_id,
         region=settings.region,
+        llm_name=settings.model_provider,
     )
 
-    vectorstore = get_vectorstore(settings.meilisearch_url, settings.meili_master_key)
-    llm = LangchainLLM(
-        chat_model=get_langchain_base_chat_model(
-            provider=settings.provider,
-            model_id=settings.model_id,
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region=settings.region,
-            llm_name=settings.model_provider,
-        ),
+
+def _get_llm_hedger(settings: Settings) -> Hedger:
+    return get_llm_hedger(
+        percentile=settings.llm_hedge_percentile,
+        min_delay_s=settings.llm_hedge_min_delay_s,
+        budget_ratio=settings.llm_hedge_budget_ratio,
+    )
+
+
+def _get_embedding_limiter(settings: Settings) -> AdaptiveConcurrencyLimiter:
+    return get_embedding_limiter(
+        initial_limit=settings.embedding_initial_concurrency,
+        max_limit=settings.embedding_max_concurrency,
+        latency_target_s=settings.embedding_latency_target_s,
+    )
+
+
+def _get_ingest_embedding_limiter(settings: Settings) -> AdaptiveConcurrencyLimiter:
+    return get_embedding_limiter(
+        initial_limit=settings.ingest_embedding_initial_concurrency,
+        max_limit=settings.ingest_embedding_max_concurrency,
+        latency_target_s=settings.embedding_latency_target_s,
+        workload="ingest",
     )
 
-    return SearchService(embedder, vectorstore, llm)
+
+def _get_index_registry(settings: Settings, layout: EmbedderLayout | None = None) -> IndexRegistry:
+    layout = layout or EmbedderLayout(settings.embedder_name, settings.embedder_dimensions)
+    return get_index_registry(
+        layout.read,
+        settings.meilisearch_url,
+        settings.meili_master_key,
+        settings.index_registry_size,
+        settings.meilisearch_pool_size,
+        _get_write_options(settings),
+        settings.hierarchical_search_enabled,
+        layout.read_dimensions,
+        layout.extra_embedders,
+        settings.meilisearch_ingest_pool_size,
+    )
+
+
+def _get_write_options(settings: Settings) -> WriteOptions:
+    return WriteOptions(
+        max_batch_bytes=settings.meilisearch_max_batch_bytes,
+        max_parallel_batches=settings.meilisearch_write_concurrency,
+        max_pending_tasks=settings.meilisearch_max_pending_tasks,
+        max_retries=settings.meilisearch_write_retries,
+    )
+
+
+@lru_cache
+def get_query_log() -> QueryLog:
+    settings = get_settings()
+    return QueryLog(
+        max_entries=settings.query_log_max_entries,
+        sample_rate=settings.query_log_sample_rate,
+        path=settings.query_log_path,
+    )
+
+
+@lru_cache
+def get_workloads() -> WorkloadScheduler:
+    settings = get_settings()
+    return WorkloadScheduler(
+        query_concurrency=settings.workload_query_concurrency,
+        query_queue=settings.workload_query_queue,
+        ingest_concurrency=settings.workload_ingest_concurrency,
+        ingest_queue=settings.workload_ingest_queue,
+        ingest_max_yield_s=settings.workload_ingest_max_yield_s,
+    )
+
+
+@lru_cache
+def get_stage_executor() -> ThreadPoolExecutor:
+    return stage_executor(get_settings().workload_query_concurrency)
+
+
+@lru_cache
+def get_session_store(index_name: str) -> SessionStore:
+    """Conversation sessions of one index; a session's hits only make sense for the index they came from."""
+    settings = get_settings()
+    return SessionStore(
+        max_sessions=settings.session_max_count,
+        ttl_s=settings.session_ttl_s,
+        max_turns=settings.session_max_turns,
+        max_hits=settings.session_max_hits,
+        reuse_similarity=settings.session_reuse_similarity,
+        follow_up_similarity=settings.session_follow_up_similarity,
+    )
+
+
+@lru_cache
+def get_prewarmer() -> Prewarmer:
+    settings = get_settings()
+    return Prewarmer(
+        query_log=get_query_log(),
+        service_factory=get_dependencies,
+        top_n=settings.prewarm_top_n,
+        max_qps=settings.prewarm_max_qps,
+        is_busy=lambda: get_search_coalescer().stats()["in_flight"] > 0,
+    )
+
+
+@lru_cache
+def get_trace_recorder() -> TraceRecorder | None:
+    settings = get_settings()
+    if not settings.trace_capture_enabled:
+        return None
+    return TraceRecorder(path=settings.trace_capture_path, sample_rate=settings.trace_sample_rate)
+
+
+@lru_cache
+def get_profiler() -> Profiler | None:
+    settings = get_settings()
+    if not settings.profiling_enabled or settings.profiling_admin_token is None:
+        return None
+    return Profiler(
+        admin_token=settings.profiling_admin_token.get_secret_value(),
+        sample_every=settings.profiling_sample_every,
+        interval_s=settings.profiling_interval_s,
+        max_profiles=settings.profiling_max_profiles,
+    )
+
+
+def get_admin_profiler(
+    profiler: Annotated[Profiler | None, Depends(get_profiler)],
+    x_admin_token: Annotated[str | None, Header()] = None,
+) -> Profiler:
+    if profiler is None:
+        raise FeatureDisabledError("Profiling is not enabled.")
+    if not profiler.is_authorised(x_admin_token):
+        raise AdminAuthorisationError
+    return profiler
+
+
+@lru_cache
+def get_rebuild_manager() -> RebuildManager | None:
+    settings = get_settings()
+    if settings.meilisearch_shard_urls:
+        return None
+    registry = _get_index_registry(settings, get_embedder_layout(settings.index_name))
+    # Nothing searches the shadow index, so it is written without queue backpressure.
+    write_options = replace(
+        _get_write_options(settings),
+        max_parallel_batches=settings.rebuild_write_concurrency,
+        max_pending_tasks=0,
+    )
+    return RebuildManager(
+        registry.client,
+        write_options=write_options,
+        wait_timeout_s=settings.rebuild_wait_timeout_s,
+    )
+
+
+def get_rebuilds(
+    manager: Annotated[RebuildManager | None, Depends(get_rebuild_manager)],
+) -> RebuildManager:
+    if manager is None:
+        raise FeatureDisabledError("Rebuilds are not supported on sharded indexes.")
+    return manager
+
+
+def get_runtime_stats() -> dict[str, Any]:
+    settings = get_settings()
+    return {
+        "embedding": _get_embedding_limiter(settings).stats(),
+        "ingest_embedding": _get_ingest_embedding_limiter(settings).stats(),
+        "workloads": get_workloads().stats(),
+        "coalescing": get_search_coalescer().stats(),
+        "query_embedding_cache": get_query_embedding_cache(
+            settings.query_embedding_cache_size,
+            _model_id(settings, get_embedder_layout(settings.index_name).read),
+        ).stats(),
+        "prewarm": get_prewarmer().stats(),
+        "sessions": get_session_store(settings.index_name).stats(),
+        "deduplication": deduplication_stats(),
+        "llm_hedging": _get_llm_hedger(settings).stats() if settings.llm_hedge_enabled else None,
+        "replicas": replica_stats() if settings.meilisearch_replica_urls else None,
+        "rebuilds": manager.stats() if (manager := get_rebuild_manager()) else None,
+        "embedding_migration": migration.status()
+        if (migration := _get_embedding_migration(settings.index_name))
+        else None,
+    }
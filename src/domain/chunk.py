@@ -1,10 +1,141 @@
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Literal
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
 
+from src.domain.dataclasses.dataclasses import Chunk
+
+LengthUnit = Literal["characters", "tokens"]
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the number of tokens in a text by counting words and punctuation marks."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+@lru_cache
+def get_text_splitter(
+    chunk_size: int = 4000,
+    chunk_overlap: int = 200,
+    length_unit: LengthUnit = "characters",
+) -> TextSplitter:
+    """Return a shared splitter for the given configuration."""
+    length_function = count_tokens if length_unit == "tokens" else len
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+    )
+
 
 def chunk_paragraphs(
     text: str,
     splitter: TextSplitter | None = None,
 ) -> list[str]:
     if splitter is None:
-        splitter = RecursiveCharacterTextSplitter()
+        splitter = get_text_splitter()
     return splitter.split_text(text=text)
+
+
+def _chunk_text(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    length_unit: LengthUnit,
+) -> list[Chunk]:
+    splitter = get_text_splitter(chunk_size, chunk_overlap, length_unit)
+    return [Chunk(text=chunk, token_count=count_tokens(chunk)) for chunk in chunk_paragraphs(text, splitter)]
+
+
+class ChunkingEngine:
+    """Split document bodies into chunks, fanning large batches out to a process pool.
+
+    Batches whose combined size is below ``parallel_threshold`` characters are chunked
+    inline; anything larger is spread across ``max_workers`` processes so big uploads
+    don't hold the GIL on the request thread. A ``max_workers`` below 2 disables the pool.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 4000,
+        chunk_overlap: int = 200,
+        length_unit: LengthUnit = "characters",
+        max_workers: int = 0,
+        parallel_threshold: int = 1_000_000,
+    ) -> None:
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size}).")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_unit: LengthUnit = length_unit
+        self.max_workers = max_workers
+        self.parallel_threshold = parallel_threshold
+        self._executor: ProcessPoolExecutor | None = None
+
+    def chunk(self, text: str) -> list[Chunk]:
+        return _chunk_text(text, self.chunk_size, self.chunk_overlap, self.length_unit)
+
+    def chunk_many(self, texts: list[str]) -> list[list[Chunk]]:
+        """Chunk several texts, preserving their order."""
+        if not self._should_parallelise(texts):
+            return [self.chunk(text) for text in texts]
+
+        chunk_text = partial(
+            _chunk_text,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            length_unit=self.length_unit,
+        )
+        return list(self._get_executor().map(chunk_text, texts))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _should_parallelise(self, texts: list[str]) -> bool:
+        if self.max_workers < 2 or len(texts) < 2:
+            return False
+        return sum(len(text) for text in texts) >= self.parallel_threshold
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # forkserver avoids forking the threads of a running web server.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return self._executor
+
+
+_engines: list[ChunkingEngine] = []
+
+
+@lru_cache
+def get_chunking_engine(
+    chunk_size: int,
+    chunk_overlap: int,
+    length_unit: LengthUnit,
+    max_workers: int,
+    parallel_threshold: int,
+) -> ChunkingEngine:
+    engine = ChunkingEngine(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_unit=length_unit,
+        max_workers=max_workers,
+        parallel_threshold=parallel_threshold,
+    )
+    _engines.append(engine)
+    return engine
+
+
+def close_chunking_engines() -> None:
+    """Shut down the worker processes of every engine `get_chunking_engine` built."""
+    for engine in _engines:
+        engine.close()
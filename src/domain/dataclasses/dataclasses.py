@@ -1,4 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+type MetadataValue = str | int | float | bool | list[str]
+type Filter = str | list[str | list[str]]
 
 
 @dataclass
@@ -6,6 +9,13 @@ class Document:
     id: str
     body: str
     url: str | None = None
+    metadata: dict[str, MetadataValue] = field(default_factory=dict)
+
+
+@dataclass
+class Chunk:
+    text: str
+    token_count: int
 
 
 @dataclass
@@ -14,15 +24,25 @@ class VectorisedDocument:
     id: str
     chunk: str
     url: str | None = None
+    token_count: int | None = None
+    doc_id: str | None = None
+    metadata: dict[str, MetadataValue] = field(default_factory=dict)
+    content_hash: str | None = None
+    # Vectors from other embedders, stored alongside ``vector`` while migrating between models.
+    vectors: dict[str, list[float]] = field(default_factory=dict)
 
 
 @dataclass
 class SearchRequestDataClass:
     query: str
     limit: int
+    filter: Filter | None = None
+    hierarchical: bool | None = None
+    session_id: str | None = None
 
 
 @dataclass
 class SimilarityRequestDataClass:
     id: str | int
     limit: int
+    filter: Filter | None = None
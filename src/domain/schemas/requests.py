@@ -5,13 +5,41 @@ class IndexRequest(BaseModel):
     id: str
     url: str | None = None
     body: str
+    metadata: dict[str, str | int | float | bool | list[str]] = Field(
+        default_factory=dict,
+        description="Stored on every chunk and filterable as `metadata.<key>`.",
+    )
+
+
+class DeleteRequest(BaseModel):
+    ids: list[str] = Field(min_length=1)
 
 
 class SearchRequest(BaseModel):
     query: str
     limit: int = Field(default=5, gt=0, lt=20)
+    filter: str | list[str | list[str]] | None = Field(
+        default=None,
+        description='Meilisearch filter expression, e.g. `metadata.site = "bbc" AND metadata.year >= 2020`.',
+    )
+    hierarchical: bool | None = Field(
+        default=None,
+        description="Set to false to bypass document pre-selection when hierarchical search is enabled.",
+    )
+    session_id: str | None = Field(
+        default=None,
+        max_length=128,
+        description="Conversational search only: follow-up questions in a session reuse earlier turns' sources.",
+    )
 
 
 class SimilarityRequest(BaseModel):
     id: str | int
     limit: int = Field(default=5, gt=0, lt=20)
+    filter: str | list[str | list[str]] | None = None
+
+
+class SimilarityBatchRequest(BaseModel):
+    ids: list[str | int] = Field(min_length=1, max_length=200)
+    limit: int = Field(default=5, gt=0, lt=20)
+    filter: str | list[str | list[str]] | None = None
@@ -87,6 +87,110 @@ class IndexingError(VectorDatabaseError):
     message = "Indexing Failed."
 
 
+class InvalidFilterError(VectorDatabaseError):
+    """Raised when Meilisearch rejects a search filter expression."""
+
+    status_code = 400
+    code = "invalid_filter"
+    message = "Invalid filter expression."
+
+
+class DeletionError(VectorDatabaseError):
+    """Raised when a delete operation fails."""
+
+    status_code = 500
+    code = "deletion_failed"
+    message = "Deletion failed."
+
+
+class IndexNotFoundError(VectorDatabaseError):
+    """Raised when a read names an index that does not exist."""
+
+    status_code = 404
+    code = "index_not_found"
+    message = "Index not found."
+
+
+class DocumentFetchError(VectorDatabaseError):
+    """Raised when reading stored documents fails."""
+
+    status_code = 500
+    code = "document_fetch_failed"
+    message = "Fetching documents failed."
+
+
+class FeatureDisabledError(ServiceError):
+    """Raised when a request needs a feature that is switched off in the settings."""
+
+    status_code = 409
+    code = "feature_disabled"
+    message = "This feature is not enabled."
+
+
+class RebuildConflictError(ServiceError):
+    """Raised when a rebuild is started twice or used in the wrong state."""
+
+    status_code = 409
+    code = "rebuild_conflict"
+    message = "The rebuild cannot do that in its current state."
+
+
+class RebuildNotFoundError(ServiceError):
+    """Raised when no rebuild exists for an index."""
+
+    status_code = 404
+    code = "rebuild_not_found"
+    message = "No rebuild has been started for this index."
+
+
+class MigrationConflictError(ServiceError):
+    """Raised when an embedding migration step is run before the migration is ready for it."""
+
+    status_code = 409
+    code = "migration_conflict"
+    message = "The embedding migration cannot do that yet."
+
+
+class SnapshotMismatchError(ServiceError):
+    """Raised when a vector snapshot does not fit the index it is being imported into."""
+
+    status_code = 409
+    code = "snapshot_mismatch"
+    message = "The snapshot does not match this index."
+
+
+class AdminAuthorisationError(ServiceError):
+    """Raised when an admin route is called without a valid admin token."""
+
+    status_code = 403
+    code = "forbidden"
+    message = "A valid admin token is required."
+
+
+class ProfileNotFoundError(ServiceError):
+    """Raised when a stored profile does not exist or has been evicted."""
+
+    status_code = 404
+    code = "profile_not_found"
+    message = "Profile not found."
+
+
+class DeadlineExceededError(ServiceError):
+    """Raised when a request runs out of time before an essential stage completes."""
+
+    status_code = 504
+    code = "deadline_exceeded"
+    message = "The request did not complete within its deadline."
+
+
+class WorkloadSaturatedError(ServiceError):
+    """Raised when a workload class already has as many jobs waiting as it may queue."""
+
+    status_code = 503
+    code = "overloaded"
+    message = "The service is too busy to accept this request; try again later."
+
+
 class ConversationalSearchError(ServiceError):
     """Raised when a conversational search operation fails."""
 
@@ -9,11 +9,21 @@ from pydantic import SecretStr
 
 from src.exceptions.exceptions import KeywordExtractionError, SummarisationError
 from src.infrastructure.llms.base import LLMABC
+from src.infrastructure.llms.hedging import Hedger
+from src.infrastructure.profiling import profiled
 
 
+@profiled
 class LangchainLLM(LLMABC):
-    def __init__(self, chat_model: BaseChatModel) -> None:
+    def __init__(
+        self,
+        chat_model: BaseChatModel,
+        hedge_model: BaseChatModel | None = None,
+        hedger: Hedger | None = None,
+    ) -> None:
         self.llm = chat_model
+        self.hedge_model = hedge_model
+        self.hedger = hedger
         self.keyword_prompt = ChatPromptTemplate.from_messages(  # type: ignore
             [
                 (
@@ -50,11 +60,22 @@ class LangchainLLM(LLMABC):
             ],
         )
 
+    def _invoke(self, operation: str, prompt: ChatPromptTemplate, inputs: dict[str, Any]) -> str:
+        """Run ``prompt`` through the chat model, hedging with ``hedge_model`` if configured."""
+
+        def call(model: BaseChatModel) -> str:
+            chain = prompt | model | StrOutputParser()  # type: ignore
+            return chain.invoke(inputs)  # type: ignore
+
+        if self.hedger is None:
+            return call(self.llm)
+        hedge_model = self.hedge_model or self.llm
+        return self.hedger.run(operation, lambda: call(self.llm), lambda: call(hedge_model))
+
     @override
     def extract_keywords(self, query: str) -> str:
         try:
-            chain = self.keyword_prompt | self.llm | StrOutputParser()  # type: ignore
-            return chain.invoke({"query": query})  # type: ignore
+            return self._invoke("extract_keywords", self.keyword_prompt, {"query": query})  # type: ignore
         except LangChainException as e:
             raise KeywordExtractionError("Keyword extraction failed") from e
 
@@ -65,8 +86,9 @@ class LangchainLLM(LLMABC):
         results: dict[str, Any],
     ) -> str:
         try:
-            summarise_chain = self.summarise_prompt | self.llm | StrOutputParser()  # type: ignore
-            return summarise_chain.invoke(  # type: ignore
+            return self._invoke(
+                "summarise",
+                self.summarise_prompt,  # type: ignore
                 {
                     "original_query": query,
                     "results": results["hits"],
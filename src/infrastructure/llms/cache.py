@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import override
+
+from langchain_core.embeddings import Embeddings
+
+from src.infrastructure.profiling import profiled
+
+
+class QueryEmbeddingCache:
+    """A thread-safe LRU of query text to embedding."""
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> list[float] | None:
+        with self._lock:
+            vector = self._entries.get(text)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector: list[float]) -> None:
+        with self._lock:
+            self._entries[text] = vector
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+@profiled
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated query embeddings from a `QueryEmbeddingCache`."""
+
+    def __init__(self, embedder: Embeddings, cache: QueryEmbeddingCache) -> None:
+        self.embedder = embedder
+        self.cache = cache
+
+    @override
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embedder.embed_documents(texts)
+
+    @override
+    def embed_query(self, text: str) -> list[float]:
+        vector = self.cache.get(text)
+        if vector is None:
+            vector = self.embedder.embed_query(text)
+            self.cache.put(text, vector)
+        return vector
+
+
+@lru_cache
+def get_query_embedding_cache(max_entries: int, model_id: str = "") -> QueryEmbeddingCache:
+    """One cache per embedding model, so vectors from different models are never mixed."""
+    return QueryEmbeddingCache(max_entries=max_entries)
@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, override
+
+from botocore.exceptions import ClientError
+from langchain_core.embeddings import Embeddings
+from langchain_core.exceptions import LangChainException
+
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.profiling import profiled
+from src.infrastructure.workloads import Workload, current_workload
+
+logger = setup_logger(name="logger")
+
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Return True if the error, or anything it was raised from, is a provider throttling response."""
+    current: BaseException | None = error
+    while current is not None:
+        if isinstance(current, ClientError) and current.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+            return True
+        current = current.__cause__
+    return False
+
+
+class AdaptiveConcurrencyLimiter:
+    """Cap concurrent calls with an additive-increase / multiplicative-decrease limit.
+
+    Every healthy call grows the limit by ``1 / limit`` (about one slot per round of calls).
+    A throttled call, or one slower than ``latency_target_s``, multiplies it by
+    ``backoff_ratio``, at most once per ``decrease_cooldown_s`` so a single burst of
+    failures only counts once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        latency_target_s: float = 5.0,
+        backoff_ratio: float = 0.5,
+        decrease_cooldown_s: float = 1.0,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_s = latency_target_s
+        self.backoff_ratio = backoff_ratio
+        self.decrease_cooldown_s = decrease_cooldown_s
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self.throttle_count = 0
+        self.slow_call_count = 0
+        self.success_count = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self, latency_s: float) -> None:
+        with self._condition:
+            self.success_count += 1
+            if latency_s > self.latency_target_s:
+                self.slow_call_count += 1
+                self._decrease()
+            else:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            self.throttle_count += 1
+            self._decrease()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown_s:
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        logger.info("Embedding concurrency limit reduced to %d", self.limit)
+
+    def stats(self) -> dict[str, int]:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "successes": self.success_count,
+                "throttled": self.throttle_count,
+                "slow_calls": self.slow_call_count,
+            }
+
+
+@profiled
+class AdaptiveEmbeddings(Embeddings):
+    """Embeddings wrapper that runs every call through an `AdaptiveConcurrencyLimiter`.
+
+    Throttled calls are retried with exponential backoff and full jitter; once
+    ``max_retries`` is exhausted a `LangChainException` is raised so callers handle it
+    like any other embedding failure. Ingest work goes through ``ingest_limiter`` when
+    one is given, so bulk embedding backs off without shrinking the searches' limit.
+    """
+
+    def __init__(
+        self,
+        embedder: Embeddings,
+        limiter: AdaptiveConcurrencyLimiter,
+        max_retries: int = 5,
+        base_delay_s: float = 0.5,
+        max_delay_s: float = 20.0,
+        ingest_limiter: AdaptiveConcurrencyLimiter | None = None,
+    ) -> None:
+        self.embedder = embedder
+        self.limiter = limiter
+        self.ingest_limiter = ingest_limiter or limiter
+        self.max_retries = max_retries
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+
+    @override
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._call(self.embedder.embed_documents, texts)
+
+    @override
+    def embed_query(self, text: str) -> list[float]:
+        return self._call(self.embedder.embed_query, text)
+
+    def _call[T](self, func: Callable[[Any], T], argument: Any) -> T:
+        limiter = self.ingest_limiter if current_workload() == "ingest" else self.limiter
+        attempt = 0
+        while True:
+            with limiter.acquire():
+                start = time.monotonic()
+                try:
+                    result = func(argument)
+                except Exception as e:
+                    if not is_throttling_error(e):
+                        raise
+                    limiter.on_throttle()
+                    if attempt >= self.max_retries:
+                        message = f"Embedding still throttled after {attempt} retries"
+                        raise LangChainException(message) from e
+                else:
+                    limiter.on_success(time.monotonic() - start)
+                    return result
+
+            delay = min(self.max_delay_s, self.base_delay_s * 2**attempt)
+            time.sleep(random.uniform(0, delay))
+            attempt += 1
+
+
+@lru_cache
+def get_embedding_limiter(
+    initial_limit: int,
+    max_limit: int,
+    latency_target_s: float,
+    workload: Workload = "query",
+) -> AdaptiveConcurrencyLimiter:
+    """Return the process-wide limiter for ``workload`` embedding calls."""
+    return AdaptiveConcurrencyLimiter(
+        initial_limit=initial_limit,
+        max_limit=max_limit,
+        latency_target_s=latency_target_s,
+    )
@@ -0,0 +1,159 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Any
+
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.profiling import run_bound
+
+logger = setup_logger(name="logger")
+
+
+class LatencyTracker:
+    """Rolling window of call latencies for one operation."""
+
+    def __init__(self, window: int = 500) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency_s: float) -> None:
+        with self._lock:
+            self._samples.append(latency_s)
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class Hedger:
+    """Send a backup request when a call runs past its usual latency.
+
+    A call that hasn't returned after the ``percentile`` latency of recent calls to the
+    same operation gets a hedge; whichever finishes first successfully wins and the
+    other is abandoned. Until ``min_samples`` latencies are known ``default_delay_s``
+    is used, and the delay never drops below ``min_delay_s``.
+
+    Hedges are paid for from a budget that earns ``budget_ratio`` of a hedge per call,
+    holding at most ``max_budget``, so hedging adds at most that fraction of extra load
+    even when the backend is uniformly slow.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_delay_s: float = 0.25,
+        default_delay_s: float = 2.0,
+        min_samples: int = 20,
+        budget_ratio: float = 0.05,
+        max_budget: float = 10.0,
+        window: int = 500,
+        max_workers: int = 32,
+    ) -> None:
+        self.percentile = percentile
+        self.min_delay_s = min_delay_s
+        self.default_delay_s = default_delay_s
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self.max_budget = max_budget
+        self.window = window
+        self._budget = min(1.0, max_budget)
+        self._trackers: dict[str, LatencyTracker] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.hedges_denied = 0
+
+    def delay_for(self, operation: str) -> float:
+        tracker = self._tracker(operation)
+        delay = self.percentile_latency(operation) if len(tracker) >= self.min_samples else None
+        return max(delay if delay is not None else self.default_delay_s, self.min_delay_s)
+
+    def percentile_latency(self, operation: str) -> float | None:
+        return self._tracker(operation).percentile(self.percentile)
+
+    def run[T](self, operation: str, primary: Callable[[], T], hedge: Callable[[], T]) -> T:
+        """Return the result of ``primary``, or of ``hedge`` if it answers first."""
+        with self._lock:
+            self.calls += 1
+            self._budget = min(self._budget + self.budget_ratio, self.max_budget)
+
+        delay_s = self.delay_for(operation)
+        primary_future = self._submit(operation, primary)
+        done, _ = wait([primary_future], timeout=delay_s)
+        if done or not self._spend_budget():
+            return primary_future.result()
+
+        logger.info("Hedging %s after %.2fs", operation, delay_s)
+        hedge_future = self._submit(None, hedge)
+        pending: set[Future[T]] = {primary_future, hedge_future}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                if future is hedge_future:
+                    with self._lock:
+                        self.hedges_won += 1
+                for loser in pending:
+                    loser.cancel()
+                return future.result()
+        assert error is not None
+        raise error
+
+    def _submit[T](self, operation: str | None, func: Callable[[], T]) -> Future[T]:
+        start = time.monotonic()
+        future = self._executor.submit(contextvars.copy_context().run, run_bound, func)
+        if operation is not None:
+            # Primary latencies are recorded even when a hedge wins, so the percentile
+            # reflects the backend rather than the hedged outcome.
+            tracker = self._tracker(operation)
+            future.add_done_callback(lambda _: tracker.record(time.monotonic() - start))
+        return future
+
+    def _spend_budget(self) -> bool:
+        with self._lock:
+            if self._budget < 1:
+                self.hedges_denied += 1
+                return False
+            self._budget -= 1
+            self.hedges_fired += 1
+            return True
+
+    def _tracker(self, operation: str) -> LatencyTracker:
+        with self._lock:
+            tracker = self._trackers.get(operation)
+            if tracker is None:
+                tracker = self._trackers[operation] = LatencyTracker(self.window)
+            return tracker
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            operations = list(self._trackers)
+            stats: dict[str, Any] = {
+                "calls": self.calls,
+                "hedges_fired": self.hedges_fired,
+                "hedges_won": self.hedges_won,
+                "hedges_denied": self.hedges_denied,
+                "budget": round(self._budget, 2),
+            }
+        stats["delay_s"] = {operation: round(self.delay_for(operation), 3) for operation in operations}
+        return stats
+
+
+@lru_cache
+def get_llm_hedger(percentile: float, min_delay_s: float, budget_ratio: float) -> Hedger:
+    return Hedger(percentile=percentile, min_delay_s=min_delay_s, budget_ratio=budget_ratio)
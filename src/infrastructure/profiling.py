@@ -0,0 +1,311 @@
+import functools
+import inspect
+import itertools
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = "x-profile"
+ADMIN_TOKEN_HEADER = "x-admin-token"
+PROFILE_ID_HEADER = "x-profile-id"
+MAX_STACK_DEPTH = 64
+
+_active_profile: ContextVar["Profile | None"] = ContextVar("active_profile", default=None)
+
+
+class Profile:
+    """Timings for one request.
+
+    Methods of classes decorated with `profiled` report a span (calls, total and self
+    time) while the request's context is active. With ``sample_stacks`` a background
+    thread also samples the call stacks of every thread that entered a span, giving a
+    statistical view of where time goes below the instrumented methods. Pooled worker
+    threads are sampled only while they run the request's work, see `run_bound`.
+    """
+
+    def __init__(self, method: str, path: str, sample_stacks: bool = False, interval_s: float = 0.005) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.sample_stacks = sample_stacks
+        self.interval_s = interval_s
+        self.status = 500
+        self.duration_s = 0.0
+        self.spans: dict[str, list[float]] = {}
+        self.stacks: Counter[str] = Counter()
+        self.leaf_functions: Counter[str] = Counter()
+        self._open_spans: dict[int, list[list[float]]] = {}
+        self._threads: set[int] = set()
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.sample_stacks:
+            self._sampler = threading.Thread(target=self._sample, name=f"profile-{self.id}", daemon=True)
+            self._sampler.start()
+
+    def finish(self, status: int) -> None:
+        self.status = status
+        self.duration_s = time.perf_counter() - self._start
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        """Sample the calling thread until the block exits, then stop sampling it."""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads.add(thread_id)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads.discard(thread_id)
+                self._open_spans.pop(thread_id, None)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads.add(thread_id)
+            open_spans = self._open_spans.setdefault(thread_id, [])
+        # Each open span tracks [start, time spent in nested spans].
+        frame = [time.perf_counter(), 0.0]
+        open_spans.append(frame)
+        try:
+            yield
+        finally:
+            open_spans.pop()
+            elapsed = time.perf_counter() - frame[0]
+            if open_spans:
+                open_spans[-1][1] += elapsed
+            with self._lock:
+                totals = self.spans.setdefault(name, [0, 0.0, 0.0])
+                totals[0] += 1
+                totals[1] += elapsed
+                totals[2] += elapsed - frame[1]
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads)
+            for thread_id in threads:
+                if (frame := frames.get(thread_id)) is not None:
+                    self._record_stack(frame)
+
+    def _record_stack(self, frame: FrameType) -> None:
+        names: list[str] = []
+        current: FrameType | None = frame
+        while current is not None and len(names) < MAX_STACK_DEPTH:
+            code = current.f_code
+            names.append(f"{code.co_qualname} ({Path(code.co_filename).name}:{current.f_lineno})")
+            current = current.f_back
+        self.stacks[";".join(reversed(names))] += 1
+        self.leaf_functions[names[0]] += 1
+
+    def functions(self) -> list[dict[str, Any]]:
+        with self._lock:
+            spans = sorted(self.spans.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                "function": name,
+                "calls": int(calls),
+                "total_ms": round(total_s * 1000, 2),
+                "self_ms": round(self_s * 1000, 2),
+            }
+            for name, (calls, total_s, self_s) in spans
+        ]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration_s * 1000, 2),
+        }
+
+    def to_dict(self, top: int = 50) -> dict[str, Any]:
+        return {
+            **self.summary(),
+            "functions": self.functions(),
+            "samples": sum(self.leaf_functions.values()),
+            "sample_interval_ms": self.interval_s * 1000,
+            "hot_frames": [{"frame": name, "samples": count} for name, count in self.leaf_functions.most_common(top)],
+            # Collapsed "a;b;c count" lines, ready for flamegraph tooling.
+            "stacks": [f"{stack} {count}" for stack, count in self.stacks.most_common(top)],
+        }
+
+
+def _profiled_function[**P, R](name: str, func: Callable[P, R]) -> Callable[P, R]:
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        profile = _active_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        with profile.span(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def run_bound[T](func: Callable[[], T]) -> T:
+    """Run ``func`` on a pooled worker thread for the active profile, if any.
+
+    Call it inside the request's copied context. The thread is only sampled until
+    ``func`` returns, not while it goes on to serve other requests.
+    """
+    profile = _active_profile.get()
+    if profile is None:
+        return func()
+    with profile.thread():
+        return func()
+
+
+def profiled[T: type](cls: T) -> T:
+    """Report every method defined on ``cls`` as a span of the active `Profile`, if any."""
+    for name, attribute in list(vars(cls).items()):
+        if inspect.isfunction(attribute) and not name.startswith("__"):
+            setattr(cls, name, _profiled_function(f"{cls.__name__}.{name}", attribute))
+    return cls
+
+
+class Profiler:
+    """Decide which requests to profile and keep the results.
+
+    A request carrying ``X-Profile: 1`` and the admin token is profiled with stack
+    sampling and stored, newest first, for retrieval by id. Independently, one in every
+    ``sample_every`` requests is profiled with spans only and folded into a running
+    aggregate of the hottest instrumented functions.
+    """
+
+    def __init__(
+        self,
+        admin_token: str,
+        sample_every: int = 0,
+        interval_s: float = 0.005,
+        max_profiles: int = 50,
+    ) -> None:
+        self.admin_token = admin_token
+        self.sample_every = sample_every
+        self.interval_s = interval_s
+        self.max_profiles = max_profiles
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+        self._aggregate: dict[str, list[float]] = {}
+        self._sampled_requests = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def is_authorised(self, token: str | None) -> bool:
+        return token is not None and secrets.compare_digest(token.encode(), self.admin_token.encode())
+
+    def start(self, method: str, path: str, headers: Mapping[str, str]) -> Profile | None:
+        if headers.get(PROFILE_HEADER, "").lower() in {"1", "true"} and self.is_authorised(
+            headers.get(ADMIN_TOKEN_HEADER),
+        ):
+            profile = Profile(method, path, sample_stacks=True, interval_s=self.interval_s)
+        elif self.sample_every > 0 and next(self._counter) % self.sample_every == 0:
+            profile = Profile(method, path)
+        else:
+            return None
+        profile.start()
+        return profile
+
+    def finish(self, profile: Profile, status: int) -> None:
+        profile.finish(status)
+        with self._lock:
+            if profile.sample_stacks:
+                self._profiles[profile.id] = profile
+                while len(self._profiles) > self.max_profiles:
+                    self._profiles.popitem(last=False)
+                return
+            self._sampled_requests += 1
+            for name, (calls, total_s, self_s) in profile.spans.items():
+                totals = self._aggregate.setdefault(name, [0, 0.0, 0.0])
+                totals[0] += calls
+                totals[1] += total_s
+                totals[2] += self_s
+
+    def get(self, profile_id: str) -> Profile | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def profiles(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles.values())]
+
+    def hot_functions(self, limit: int = 20) -> dict[str, Any]:
+        with self._lock:
+            ranked = sorted(self._aggregate.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+            sampled_requests = self._sampled_requests
+        return {
+            "sampled_requests": sampled_requests,
+            "functions": [
+                {
+                    "function": name,
+                    "calls": int(calls),
+                    "total_ms": round(total_s * 1000, 2),
+                    "self_ms": round(self_s * 1000, 2),
+                    "mean_ms": round(total_s * 1000 / calls, 2),
+                }
+                for name, (calls, total_s, self_s) in ranked
+            ],
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running selected requests under a `Profile`.
+
+    The profile is bound to the request's context, which Starlette carries into the
+    worker thread of sync endpoints, so instrumented methods report to it. Profiled
+    responses carry an ``X-Profile-Id`` header. Inert while ``profiler_factory``
+    returns None. The profile is finished on a worker thread, since that waits for its
+    stack sampler to stop.
+    """
+
+    def __init__(self, app: ASGIApp, profiler_factory: Callable[[], Profiler | None]) -> None:
+        self.app = app
+        self.profiler_factory = profiler_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = self.profiler_factory() if scope["type"] == "http" else None
+        profile = profiler.start(scope["method"], scope["path"], Headers(scope=scope)) if profiler else None
+        if profiler is None or profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile.sample_stacks:
+                    headers = list(message.get("headers", []))
+                    headers.append((PROFILE_ID_HEADER.encode(), profile.id.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        token = _active_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _active_profile.reset(token)
+            await run_in_threadpool(profiler.finish, profile, status_code)
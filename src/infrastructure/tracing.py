@@ -0,0 +1,132 @@
+import json
+import random
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.infrastructure.logger import setup_logger
+
+logger = setup_logger(name="logger")
+
+MAX_CAPTURED_BODY_BYTES = 1_000_000
+
+
+def request_shape(body: bytes) -> dict[str, int]:
+    """Describe a JSON request body by its sizes only, never its content.
+
+    Queries become character and word counts, index payloads become a document count
+    and total body length, id lists become a count and filters a flag, so a trace can
+    be replayed with synthetic text of the same proportions.
+    """
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        return {}
+
+    shape: dict[str, int] = {}
+    if isinstance(payload, list):
+        documents = [document for document in payload if isinstance(document, dict)]
+        shape["documents"] = len(documents)
+        shape["document_chars"] = sum(len(str(document.get("body", ""))) for document in documents)
+    elif isinstance(payload, dict):
+        if isinstance(query := payload.get("query"), str):
+            shape["query_chars"] = len(query)
+            shape["query_words"] = len(query.split())
+        if isinstance(limit := payload.get("limit"), int):
+            shape["limit"] = limit
+        if isinstance(ids := payload.get("ids"), list):
+            shape["ids"] = len(ids)
+        if payload.get("filter"):
+            shape["filtered"] = 1
+    return shape
+
+
+class TraceRecorder:
+    """Append sampled, anonymised request traces to a JSON Lines file."""
+
+    def __init__(self, path: str | Path, sample_rate: float = 1.0) -> None:
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def should_record(self) -> bool:
+        return random.random() < self.sample_rate
+
+    def record(self, trace: dict[str, Any]) -> None:
+        line = json.dumps(trace, separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as file:
+                    file.write(line)
+                self.recorded += 1
+        except OSError:
+            logger.exception("Could not write request trace to %s", self.path)
+
+
+class TraceMiddleware:
+    """ASGI middleware recording the shape and timing of each HTTP request.
+
+    Only the route template, method, status, duration and `request_shape` of the body
+    are kept: no query text, document bodies, ids or index names reach the trace file.
+    Tracing is skipped entirely while ``recorder_factory`` returns None. The body is
+    measured and the trace written on a worker thread, off the event loop. Bodies over
+    ``MAX_CAPTURED_BODY_BYTES`` are not measured; their trace is marked ``truncated``.
+    """
+
+    def __init__(self, app: ASGIApp, recorder_factory: Callable[[], TraceRecorder | None]) -> None:
+        self.app = app
+        self.recorder_factory = recorder_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        recorder = self.recorder_factory() if scope["type"] == "http" else None
+        if recorder is None or not recorder.should_record():
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        truncated = False
+        status_code = 500
+        arrived_at = time.time()
+        start = time.perf_counter()
+
+        async def receive_and_capture() -> Message:
+            nonlocal truncated
+            message = await receive()
+            if message["type"] == "http.request" and (chunk := message.get("body", b"")):
+                if len(body) + len(chunk) <= MAX_CAPTURED_BODY_BYTES:
+                    body.extend(chunk)
+                else:
+                    truncated = True
+            return message
+
+        async def send_and_capture(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_capture, send_and_capture)
+        finally:
+            route = scope.get("route")
+            trace = {
+                "ts": round(arrived_at, 3),
+                "method": scope["method"],
+                "path": getattr(route, "path", scope["path"]),
+                "named_index": b"index=" in scope.get("query_string", b""),
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+
+            def measure_and_record() -> None:
+                shape = {"truncated": 1} if truncated else request_shape(bytes(body))
+                recorder.record({**trace, **shape})
+
+            await run_in_threadpool(measure_and_record)
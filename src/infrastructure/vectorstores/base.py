@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from typing import Any
 
 from src.domain.dataclasses.dataclasses import (
@@ -19,6 +20,13 @@ class VectorStoreABC(ABC):
         Returns a list of IDs assigned to the inserted documents.
         """
 
+    @abstractmethod
+    def delete_documents(
+        self,
+        document_ids: list[str],
+    ) -> None:
+        """Delete every chunk belonging to the given parent documents."""
+
     @abstractmethod
     def hybrid_search(
         self,
@@ -39,3 +47,61 @@ class VectorStoreABC(ABC):
 
         Returns an object containing relevant objects.
         """
+
+    def similarity_search_batch(
+        self,
+        requests: list[SimilarityRequestDataClass],
+    ) -> list[dict[str, Any]]:
+        """Perform several similarity searches.
+
+        Returns one result object per request, in request order.
+        """
+        return [self.similarity_search(request) for request in requests]
+
+    @property
+    def supports_document_vectors(self) -> bool:
+        """Whether `add_document_vectors` stores anything and `hierarchical_search` pre-selects documents."""
+        return False
+
+    def add_document_vectors(
+        self,
+        documents: list[VectorisedDocument],
+    ) -> None:
+        """Store one vector per parent document, used to pre-select documents in `hierarchical_search`.
+
+        Does nothing on a store without `supports_document_vectors`.
+        """
+
+    def hierarchical_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+        candidates: int,
+    ) -> dict[str, Any]:
+        """Pick the ``candidates`` best documents, then rank only their chunks.
+
+        Returns an object shaped like `hybrid_search`'s. A store without
+        `supports_document_vectors` runs a plain `hybrid_search`.
+        """
+        return self.hybrid_search(query, vector)
+
+    @abstractmethod
+    def remove_embedder(
+        self,
+        embedder_name: str,
+    ) -> None:
+        """Drop every vector stored under ``embedder_name``."""
+
+    @abstractmethod
+    def iter_documents(
+        self,
+        batch_size: int = 1000,
+    ) -> Iterator[list[VectorisedDocument]]:
+        """Yield every stored chunk, with its vector, in batches."""
+
+    @abstractmethod
+    def get_documents_by_ids(
+        self,
+        ids: list[str],
+    ) -> list[dict[str, Any]]:
+        """Fetch stored chunks by id, without their vectors."""
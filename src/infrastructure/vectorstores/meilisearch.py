@@ -1,23 +1,73 @@
+import json
 import re
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from functools import lru_cache
-from typing import Any
+from typing import Any, override
 
 import meilisearch
-from meilisearch.errors import MeilisearchError
+import requests
+from meilisearch._httprequests import HttpRequests
+from meilisearch.config import Config
+from meilisearch.errors import MeilisearchApiError, MeilisearchError
 from meilisearch.index import Index
 from pydantic import SecretStr
+from requests.adapters import HTTPAdapter
 
 from src.domain.dataclasses.dataclasses import (
+    Filter,
     SearchRequestDataClass,
     SimilarityRequestDataClass,
     VectorisedDocument,
 )
 from src.exceptions.exceptions import (
+    DeletionError,
+    DocumentFetchError,
     IndexingError,
+    IndexNotFoundError,
+    InvalidFilterError,
     SemanticSearchError,
     SimilarSearchError,
 )
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.profiling import profiled
 from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.workloads import bind_workload, current_workload
+
+logger = setup_logger(name="logger")
+
+INVALID_FILTER_CODES = frozenset({"invalid_search_filter", "invalid_similar_filter"})
+PENDING_TASK_STATUSES = ["enqueued", "processing"]
+# Document-level vectors live in a companion index named after the chunk index.
+DOCUMENT_INDEX_SUFFIX = "__docs"
+
+
+@dataclass(frozen=True)
+class WriteOptions:
+    """Limits on how `MeiliVectorStore.add_texts` sends documents.
+
+    Documents go out as NDJSON batches of at most ``max_batch_bytes``, up to
+    ``max_parallel_batches`` at a time. Before each batch the index's task queue is
+    checked and, while ``max_pending_tasks`` or more tasks are enqueued or processing,
+    the write waits (for at most ``max_queue_wait_s``). A failed batch is retried on
+    its own up to ``max_retries`` times with exponential backoff; a batch rejected as
+    too large is split in half instead. Meilisearch accepts a batch before indexing it,
+    so each batch's task is then awaited for up to ``task_timeout_s``: a task that fails
+    with an internal error is retried too, and one that rejects its documents is split
+    until the rejected documents are isolated.
+    """
+
+    max_batch_bytes: int = 10_000_000
+    max_parallel_batches: int = 2
+    max_pending_tasks: int = 20
+    max_retries: int = 3
+    retry_delay_s: float = 0.5
+    queue_poll_s: float = 0.5
+    max_queue_wait_s: float = 300.0
+    task_timeout_s: float = 300.0
 
 
 def get_meilisearch_client(meilisearch_url: str, meili_master_key: SecretStr) -> meilisearch.Client:
@@ -27,44 +77,459 @@ def get_meilisearch_client(meilisearch_url: str, meili_master_key: SecretStr) ->
     )
 
 
+class PooledHttpRequests(HttpRequests):
+    """HttpRequests that reuses keep-alive connections through shared sessions.
+
+    Ingest work uses ``ingest_session`` when one is given, so bulk writes cannot hold
+    every connection that searches need.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        session: requests.Session,
+        ingest_session: requests.Session | None = None,
+    ) -> None:
+        super().__init__(config)
+        self.session = session
+        self.ingest_session = ingest_session or session
+
+    def _session(self) -> requests.Session:
+        return self.ingest_session if current_workload() == "ingest" else self.session
+
+    @override
+    def get(self, path: str) -> Any:
+        return self.send_request(self._session().get, path)
+
+    @override
+    def post(
+        self,
+        path: str,
+        body: Any = None,
+        content_type: str | None = "application/json",
+        *,
+        serializer: type[json.JSONEncoder] | None = None,
+    ) -> Any:
+        return self.send_request(self._session().post, path, body, content_type, serializer=serializer)
+
+    @override
+    def patch(self, path: str, body: Any = None, content_type: str | None = "application/json") -> Any:
+        return self.send_request(self._session().patch, path, body, content_type)
+
+    @override
+    def put(
+        self,
+        path: str,
+        body: Any = None,
+        content_type: str | None = "application/json",
+        *,
+        serializer: type[json.JSONEncoder] | None = None,
+    ) -> Any:
+        return self.send_request(self._session().put, path, body, content_type, serializer=serializer)
+
+    @override
+    def delete(self, path: str, body: Any = None) -> Any:
+        return self.send_request(self._session().delete, path, body)
+
+
+def _pooled_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_pooled_meilisearch_client(
+    meilisearch_url: str,
+    meili_master_key: SecretStr,
+    pool_size: int = 10,
+    ingest_pool_size: int = 0,
+) -> meilisearch.Client:
+    """Return a client whose requests share a bounded pool of keep-alive connections.
+
+    With ``ingest_pool_size``, ingest work gets a separate pool of that size.
+    """
+    client = get_meilisearch_client(meilisearch_url=meilisearch_url, meili_master_key=meili_master_key)
+    client.http = PooledHttpRequests(
+        client.config,
+        _pooled_session(pool_size),
+        _pooled_session(ingest_pool_size) if ingest_pool_size else None,
+    )
+    client.task_handler.http = client.http
+    return client
+
+
+def open_index(client: meilisearch.Client, index_name: str) -> Index:
+    """Return a handle on an index that reuses the client's connections."""
+    index = client.index(index_name)
+    index.http = client.http
+    index.task_handler.http = client.http
+    return index
+
+
+type ExtraEmbedders = tuple[tuple[str, int], ...]
+
+
+def index_settings(
+    embedder_name: str,
+    dimensions: int = 1024,
+    extra_embedders: ExtraEmbedders = (),
+) -> dict[str, Any]:
+    """Index settings registering ``embedder_name`` and any ``extra_embedders`` (name, dimensions)."""
+    return {
+        "embedders": {
+            f"{name}": {
+                "source": "userProvided",
+                "dimensions": embedder_dimensions,
+            }
+            for name, embedder_dimensions in ((embedder_name, dimensions), *extra_embedders)
+        },
+        # Nested metadata keys become filterable as `metadata.<key>`.
+        "filterableAttributes": ["doc_id", "url", "metadata"],
+    }
+
+
+def ensure_index(
+    client: meilisearch.Client,
+    index_name: str,
+    embedder_name: str,
+    dimensions: int = 1024,
+    extra_embedders: ExtraEmbedders = (),
+    create: bool = True,
+) -> Index:
+    """Create the index if it is missing and apply the embedder settings to it.
+
+    Without ``create`` a missing index raises `IndexNotFoundError` instead. Meilisearch
+    merges embedder settings, so embedders registered earlier are kept.
+    """
+    try:
+        client.get_raw_index(index_name)
+    except MeilisearchApiError as e:
+        if e.status_code != 404:
+            raise
+        if not create:
+            raise IndexNotFoundError(message=f"Index {index_name} does not exist.") from e
+        client.create_index(index_name, {"primaryKey": "id"})
+
+    index = open_index(client, index_name)
+    index.update_settings(body=index_settings(embedder_name, dimensions, extra_embedders))
+    return index
+
+
+def sanitise_identifier(raw_value: str, max_bytes: int = 511) -> str:
+    """Map a raw id onto the character set Meilisearch accepts for document ids."""
+    cleaned = raw_value.lower()
+
+    cleaned = re.sub(r"[^a-z0-9_-]", "_", cleaned)
+
+    if len(cleaned.encode("utf-8")) > max_bytes - 9:
+        cleaned = cleaned[: max_bytes - 9]
+
+    return f"{cleaned}"
+
+
+def quote_filter_value(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def document_filter(document_ids: list[str]) -> str:
+    """Build a filter matching every chunk whose parent is one of ``document_ids``."""
+    return f"doc_id IN [{', '.join(quote_filter_value(document_id) for document_id in document_ids)}]"
+
+
+def batch_by_size(lines: list[bytes], max_bytes: int) -> list[list[bytes]]:
+    """Group serialised documents into batches of at most ``max_bytes`` once newline-joined.
+
+    A document larger than ``max_bytes`` on its own is sent as a batch of one.
+    """
+    batches: list[list[bytes]] = []
+    current: list[bytes] = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > max_bytes:
+            batches.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        batches.append(current)
+    return batches
+
+
+class BatchTaskError(MeilisearchError):
+    """A batch Meilisearch accepted whose task then failed."""
+
+    def __init__(self, task_uid: int, status: str, error: dict[str, Any]) -> None:
+        self.task_uid = task_uid
+        self.status = status
+        self.error_type = error.get("type")
+        super().__init__(f"Task {task_uid} {status}: {error.get('message', '')}")
+
+    @property
+    def rejected_documents(self) -> bool:
+        """Whether the task failed on the documents themselves, which no retry will fix."""
+        return self.status == "failed" and self.error_type not in {"internal", "system"}
+
+
+def _is_retryable(error: MeilisearchError) -> bool:
+    """Server errors, rate limiting and connection failures are worth another try."""
+    if isinstance(error, MeilisearchApiError):
+        return error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, BatchTaskError):
+        return not error.rejected_documents
+    return True
+
+
+def restrict_to_documents(document_ids: list[str], filter_: Filter | None) -> Filter:
+    """AND a ``doc_id IN [...]`` clause onto an optional user filter."""
+    restriction = document_filter(document_ids)
+    if filter_ is None:
+        return restriction
+    return [restriction, *filter_] if isinstance(filter_, list) else [restriction, filter_]
+
+
+def _raise_for_invalid_filter(error: MeilisearchError) -> None:
+    """Surface a rejected filter as a client error rather than a search failure."""
+    if isinstance(error, MeilisearchApiError) and error.code in INVALID_FILTER_CODES:
+        raise InvalidFilterError(message=error.message) from error
+
+
+@profiled
 class MeiliVectorStore(VectorStoreABC):
-    def __init__(self, index: Index, embedder_name: str) -> None:
+    def __init__(
+        self,
+        index: Index,
+        embedder_name: str,
+        write_options: WriteOptions | None = None,
+        document_index: Index | None = None,
+    ) -> None:
         self.index = index
         self.embedder_name = embedder_name
+        self.write_options = write_options or WriteOptions()
+        self.document_store = (
+            MeiliVectorStore(document_index, embedder_name, write_options) if document_index is not None else None
+        )
+        # Uid of the latest write task, so readers can tell when their writes are searchable.
+        self.last_task_uid: int | None = None
+        # Failed batch tasks `add_texts` already retried, split or reported.
+        self._handled_failed_tasks: set[int] = set()
+        self._task_lock = threading.Lock()
 
     def _sanitise_identifier(self, raw_value: str, max_bytes: int = 511) -> str:
-        cleaned = raw_value.lower()
+        return sanitise_identifier(raw_value, max_bytes)
 
-        cleaned = re.sub(r"[^a-z0-9_-]", "_", cleaned)
+    def add_texts(self, documents: list[VectorisedDocument]) -> None:
+        """Write ``documents`` in size-bounded batches, retrying failed batches on their own.
 
-        if len(cleaned.encode("utf-8")) > max_bytes - 9:
-            cleaned = cleaned[: max_bytes - 9]
+        Raises `IndexingError` if any batch still fails after its retries; the other
+        batches are stored regardless.
+        """
+        if not documents:
+            return
+        lines = [
+            json.dumps(document, separators=(",", ":")).encode()
+            for document in self._convert_documents_to_dict(documents)
+        ]
+        batches = batch_by_size(lines, self.write_options.max_batch_bytes)
+        workers = min(self.write_options.max_parallel_batches, len(batches))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meili-write") as executor:
+                results = list(executor.map(bind_workload(self._write_batch), batches))
+        else:
+            results = [self._write_batch(batch) for batch in batches]
 
-        return f"{cleaned}"
+        failed = [(lost, error) for lost, error in results if error is not None]
+        if failed:
+            lost = sum(lost for lost, _ in failed)
+            message = f"error adding documents to vector store: {lost} of {len(lines)} documents failed"
+            raise IndexingError(message=message) from failed[0][1]
 
-    def add_texts(self, documents: list[VectorisedDocument]) -> None:
+    def _write_batch(self, lines: list[bytes]) -> tuple[int, MeilisearchError | None]:
+        """Send one batch, returning how many of its documents could not be stored and the first error."""
+        options = self.write_options
+        error: MeilisearchError | None = None
+        for attempt in range(options.max_retries + 1):
+            if attempt:
+                time.sleep(options.retry_delay_s * 2 ** (attempt - 1))
+            self._wait_for_task_queue()
+            try:
+                task_info = self.index.add_documents_ndjson(b"\n".join(lines))
+                self._track_task(task_info)
+                if (task_error := self._batch_task_error(task_info.task_uid)) is None:
+                    return 0, None
+                if task_error.rejected_documents and len(lines) > 1:
+                    logger.warning(
+                        "Task %d rejected a batch of %d documents, splitting it", task_error.task_uid, len(lines)
+                    )
+                    return self._write_halves(lines)
+                error = task_error
+            except MeilisearchApiError as e:
+                if e.status_code == 413 and len(lines) > 1:
+                    logger.warning("Batch of %d documents too large, splitting it", len(lines))
+                    return self._write_halves(lines)
+                error = e
+            except MeilisearchError as e:
+                error = e
+            if not _is_retryable(error):
+                break
+            logger.warning("Writing %d documents failed (attempt %d): %s", len(lines), attempt + 1, error)
+        return len(lines), error
+
+    def _write_halves(self, lines: list[bytes]) -> tuple[int, MeilisearchError | None]:
+        middle = len(lines) // 2
+        # Both halves are always sent: one failing must not lose the other.
+        first_lost, first_error = self._write_batch(lines[:middle])
+        second_lost, second_error = self._write_batch(lines[middle:])
+        return first_lost + second_lost, first_error or second_error
+
+    def _batch_task_error(self, task_uid: int) -> BatchTaskError | None:
+        """Wait for a batch's task to finish and return the error it failed with, if any."""
+        options = self.write_options
+        give_up_at = time.monotonic() + options.task_timeout_s
+        while (task := self.index.get_task(task_uid)).status in PENDING_TASK_STATUSES:
+            if time.monotonic() >= give_up_at:
+                logger.warning("Task %d on %s is still %s; not waiting for it", task_uid, self.index.uid, task.status)
+                return None
+            time.sleep(options.queue_poll_s)
+        if task.status == "succeeded":
+            return None
+        with self._task_lock:
+            self._handled_failed_tasks.add(task_uid)
+        return BatchTaskError(task_uid, task.status, task.error or {})
+
+    def _track_task(self, task_info: Any) -> None:
+        with self._task_lock:
+            self.last_task_uid = max(self.last_task_uid or 0, task_info.task_uid)
+
+    def latest_task_uid(self) -> int | None:
+        """The newest write task on this index or its document index."""
+        uids = [store.last_task_uid for store in filter(None, [self, self.document_store])]
+        return max((uid for uid in uids if uid is not None), default=None)
+
+    def task_finished(self, task_uid: int) -> bool:
         try:
-            documents_as_dict = self._convert_documents_to_dict(documents)
+            return self.index.get_task(task_uid).status not in PENDING_TASK_STATUSES
+        except MeilisearchError:
+            logger.debug("Could not read task %d", task_uid, exc_info=True)
+            return False
 
-            self.index.add_documents(documents_as_dict)
-        except MeilisearchError as e:
-            message = "error adding documents to vector store"
-            raise IndexingError(message=message) from e
+    def healthy(self) -> bool:
+        try:
+            return self.index.http.get(self.index.config.paths.health).get("status") == "available"
+        except (MeilisearchError, requests.RequestException):
+            return False
+
+    def _pending_tasks(self) -> int:
+        try:
+            return self.index.get_tasks({"statuses": PENDING_TASK_STATUSES, "limit": 1}).total
+        except (MeilisearchError, KeyError):
+            # Backpressure is best effort: an unreadable queue shouldn't block writes.
+            logger.debug("Could not read the task queue of %s", self.index.uid, exc_info=True)
+            return 0
+
+    def _wait_for_task_queue(self) -> None:
+        """Hold a write while the index already has too many tasks waiting."""
+        options = self.write_options
+        if options.max_pending_tasks <= 0:
+            return
+        waited_s = 0.0
+        while (pending := self._pending_tasks()) >= options.max_pending_tasks:
+            if waited_s >= options.max_queue_wait_s:
+                logger.warning("Task queue of %s still has %d pending tasks, writing anyway", self.index.uid, pending)
+                return
+            time.sleep(options.queue_poll_s)
+            waited_s += options.queue_poll_s
+
+    def wait_for_tasks(self, timeout_s: float) -> bool:
+        """Wait until no task on the index is enqueued or processing; False on timeout."""
+        deadline = time.monotonic() + timeout_s
+        while self._pending_tasks():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.write_options.queue_poll_s)
+        return True
+
+    def failed_tasks(self, since_task_uid: int = 0) -> int:
+        """Count the index's failed tasks whose uid is at least ``since_task_uid``.
+
+        An index uid's task history outlives deleting and re-creating the index and
+        moves with `swap_indexes`, so callers pass the uid of the first task they own.
+        Failed batch tasks `add_texts` has already dealt with are not counted.
+        """
+        failed = 0
+        parameters: dict[str, Any] = {"statuses": ["failed"], "limit": 100}
+        while True:
+            page = self.index.get_tasks(dict(parameters))
+            for task in page.results:
+                # Tasks come newest first.
+                if task.uid < since_task_uid:
+                    return failed
+                failed += task.uid not in self._handled_failed_tasks
+            if page.next_ is None:
+                return failed
+            parameters["from"] = page.next_
+
+    def count(self) -> int:
+        return self.index.get_stats().number_of_documents
 
     def _convert_documents_to_dict(
         self,
         documents: list[VectorisedDocument],
-    ) -> list[dict[str, str | None | dict[str, list[float]]]]:
+    ) -> list[dict[str, Any]]:
         return [
             {
                 "id": self._sanitise_identifier(doc.id),
-                "_vectors": {self.embedder_name: doc.vector},
+                "_vectors": {self.embedder_name: doc.vector, **doc.vectors},
                 "chunk": doc.chunk,
                 "url": doc.url,
+                "token_count": doc.token_count,
+                "doc_id": doc.doc_id,
+                "metadata": doc.metadata,
+                "content_hash": doc.content_hash,
             }
             for doc in documents
         ]
 
+    def delete_documents(self, document_ids: list[str]) -> None:
+        """Delete all chunks of the given documents with a single filter-based task."""
+        try:
+            self._track_task(self.index.delete_documents(filter=document_filter(document_ids)))
+        except MeilisearchError as e:
+            message = "error deleting documents from vector store"
+            raise DeletionError(message=message) from e
+        if self.document_store is not None:
+            self.document_store.delete_documents(document_ids)
+
+    @property
+    def supports_document_vectors(self) -> bool:
+        return self.document_store is not None
+
+    def add_document_vectors(self, documents: list[VectorisedDocument]) -> None:
+        if self.document_store is None:
+            return super().add_document_vectors(documents)
+        return self.document_store.add_texts(documents)
+
+    def hierarchical_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+        candidates: int,
+    ) -> dict[str, Any]:
+        """Rank the chunks of the ``candidates`` documents whose vectors best match the query.
+
+        Falls back to a flat search when no document matches, so documents indexed
+        before document vectors were stored are still found.
+        """
+        if self.document_store is None:
+            return super().hierarchical_search(query, vector, candidates)
+        documents = self.document_store.hybrid_search(replace(query, limit=candidates), vector)
+        document_ids = [hit["doc_id"] for hit in documents["hits"] if hit.get("doc_id") is not None]
+        if not document_ids:
+            return self.hybrid_search(query, vector)
+        return self.hybrid_search(replace(query, filter=restrict_to_documents(document_ids, query.filter)), vector)
+
     def hybrid_search(
         self,
         query: SearchRequestDataClass,
@@ -74,10 +539,14 @@ class MeiliVectorStore(VectorStoreABC):
             "vector": vector,
             "limit": query.limit,
             "hybrid": {"embedder": self.embedder_name, "semanticRatio": 0.7},
+            "showRankingScore": True,
         }
+        if query.filter:
+            params["filter"] = query.filter
         try:
             return self.index.search(query=query.query, opt_params=params)
         except MeilisearchError as e:
+            _raise_for_invalid_filter(e)
             message = "error executing hybrid search"
             raise SemanticSearchError(message=message) from e
 
@@ -85,39 +554,102 @@ class MeiliVectorStore(VectorStoreABC):
         self,
         request: SimilarityRequestDataClass,
     ) -> dict[str, Any]:
+        parameters: dict[str, Any] = {
+            "id": request.id,
+            "embedder": self.embedder_name,
+            "limit": request.limit,
+        }
+        if request.filter:
+            parameters["filter"] = request.filter
         try:
-            return self.index.get_similar_documents(
-                parameters={
-                    "id": request.id,
-                    "embedder": self.embedder_name,
-                    "limit": request.limit,
-                },
-            )
+            return self.index.get_similar_documents(parameters=parameters)
         except MeilisearchError as e:
+            _raise_for_invalid_filter(e)
             message = "error executing similarity search"
             raise SimilarSearchError(message=message) from e
 
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[VectorisedDocument]]:
+        offset = 0
+        while True:
+            try:
+                page = self.index.get_documents(
+                    {"retrieveVectors": True, "limit": batch_size, "offset": offset},
+                )
+            except MeilisearchError as e:
+                message = "error reading documents from vector store"
+                raise DocumentFetchError(message=message) from e
+            if not page.results:
+                return
+            yield [self._convert_document_to_vectorised(document) for document in page.results]
+            offset += len(page.results)
 
-@lru_cache
-def get_vectorstore(embedder_name: str, meilisearch_url: str, meili_master_key: SecretStr) -> MeiliVectorStore:
-    """Return a wrapper around Meilisearch vector store."""
-    client = get_meilisearch_client(meili_master_key=meili_master_key, meilisearch_url=meilisearch_url)
-    index_name = "documents"
+    def _convert_document_to_vectorised(self, document: Any) -> VectorisedDocument:
+        vectors = {
+            name: self._retrieved_vector(embedding) for name, embedding in getattr(document, "_vectors", {}).items()
+        }
+        return VectorisedDocument(
+            vector=vectors.pop(self.embedder_name, []),
+            vectors={name: vector for name, vector in vectors.items() if vector},
+            id=document.id,
+            chunk=getattr(document, "chunk", ""),
+            url=getattr(document, "url", None),
+            token_count=getattr(document, "token_count", None),
+            doc_id=getattr(document, "doc_id", None),
+            metadata=getattr(document, "metadata", None) or {},
+            content_hash=getattr(document, "content_hash", None),
+        )
 
-    settings = {
-        "embedders": {
-            f"{embedder_name}": {
-                "source": "userProvided",
-                "dimensions": 1024,
-            },
-        },
-    }
+    @staticmethod
+    def _retrieved_vector(embedding: Any) -> list[float]:
+        # Retrieved vectors come back as {"embeddings": [[...]], "regenerate": false}.
+        if isinstance(embedding, dict):
+            embeddings = embedding.get("embeddings") or [[]]
+            return embeddings[0]
+        return embedding
 
-    # Ensure index exists
-    if index_name not in [idx.uid for idx in client.get_indexes()["results"]]:
-        client.create_index(index_name, {"primaryKey": "id"})
+    def remove_embedder(self, embedder_name: str) -> None:
+        """Unregister ``embedder_name``, which drops every vector stored under it."""
+        try:
+            self.index.update_settings(body={"embedders": {embedder_name: None}})
+        except MeilisearchError as e:
+            message = f"error removing embedder {embedder_name}"
+            raise IndexingError(message=message) from e
+        if self.document_store is not None:
+            self.document_store.remove_embedder(embedder_name)
 
-    index = client.index(index_name)
-    index.update_settings(body=settings)
+    def get_documents_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        if not ids:
+            return []
+        try:
+            page = self.index.get_documents({"ids": ids, "limit": len(ids)})
+        except MeilisearchError as e:
+            message = "error fetching documents from vector store"
+            raise DocumentFetchError(message=message) from e
+        return [
+            {key: value for key, value in vars(document).items() if not key.startswith("_")}
+            for document in page.results
+        ]
 
-    return MeiliVectorStore(index=index, embedder_name=embedder_name)
+
+@lru_cache
+def get_vectorstore(
+    embedder_name: str,
+    meilisearch_url: str,
+    meili_master_key: SecretStr,
+    index_name: str = "documents",
+    write_options: WriteOptions | None = None,
+    document_vectors: bool = False,
+) -> MeiliVectorStore:
+    """Return a wrapper around Meilisearch vector store."""
+    client = get_meilisearch_client(meili_master_key=meili_master_key, meilisearch_url=meilisearch_url)
+    index = ensure_index(client, index_name, embedder_name)
+    document_index = (
+        ensure_index(client, f"{index_name}{DOCUMENT_INDEX_SUFFIX}", embedder_name) if document_vectors else None
+    )
+
+    return MeiliVectorStore(
+        index=index,
+        embedder_name=embedder_name,
+        write_options=write_options,
+        document_index=document_index,
+    )
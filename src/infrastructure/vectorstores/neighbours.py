@@ -0,0 +1,345 @@
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from src.domain.dataclasses.dataclasses import (
+    SearchRequestDataClass,
+    SimilarityRequestDataClass,
+    VectorisedDocument,
+)
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.vectorstores.meilisearch import sanitise_identifier
+
+logger = setup_logger(name="logger")
+
+type FloatArray = npt.NDArray[np.float32]
+type IndexArray = npt.NDArray[np.int32]
+
+
+def _normalise(vectors: Iterable[list[float]]) -> FloatArray:
+    matrix = np.asarray(list(vectors), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _top_k(scores: FloatArray, columns: IndexArray, k: int) -> tuple[IndexArray, FloatArray]:
+    """Return the ``k`` best columns per row of ``scores``, best first."""
+    if scores.shape[1] < k:
+        pad = k - scores.shape[1]
+        scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+        columns = np.pad(columns, ((0, 0), (0, pad)), constant_values=-1)
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1)
+    return (
+        np.take_along_axis(np.take_along_axis(columns, best, axis=1), order, axis=1),
+        np.take_along_axis(best_scores, order, axis=1),
+    )
+
+
+class NeighbourTable:
+    """Cosine top-``k`` neighbour lists for every stored chunk.
+
+    Vectors are kept L2-normalised in float16, neighbour positions as int32 and scores as
+    float16, so a table costs roughly ``2 * dimensions + 6 * k`` bytes per chunk, half of
+    what float32 would. The price is precision: float16 keeps about three significant
+    digits, so scores (and the ``_rankingScore`` served from them) can differ from a live
+    search's in the third decimal place, and neighbours that close may swap order. Upserts
+    recompute the rows of the changed chunks in full and merge the changed chunks into
+    every other row's list; deletions tombstone rows so they stop appearing as neighbours.
+    Upserts take turns and score outside the lock lookups take, holding it only to write
+    each batch of rows, so similar-document reads don't wait for a full-table matmul.
+
+    A table only answers queries once it is ``complete``, i.e. it has been rebuilt from
+    (or loaded from a snapshot of) the whole index; until then upserts are ignored.
+    """
+
+    def __init__(self, k: int = 20, batch_size: int = 1024, path: str | Path | None = None) -> None:
+        self.k = k
+        self.batch_size = batch_size
+        self.path = Path(path) if path else None
+        self.complete = False
+        self.ids: list[str] = []
+        self.doc_ids: list[str | None] = []
+        self.positions: dict[str, int] = {}
+        self.vectors = np.zeros((0, 0), dtype=np.float16)
+        self.alive = np.zeros(0, dtype=bool)
+        self.neighbours = np.zeros((0, k), dtype=np.int32)
+        self.scores = np.zeros((0, k), dtype=np.float16)
+        self._lock = threading.RLock()
+        # Serialises writers, which rewrite neighbour rows outside ``_lock``.
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def __contains__(self, chunk_id: str) -> bool:
+        position = self.positions.get(chunk_id)
+        return position is not None and bool(self.alive[position])
+
+    def rebuild(self, batches: Iterable[list[VectorisedDocument]]) -> None:
+        """Recompute the whole table from every stored chunk, then swap it in."""
+        start = time.monotonic()
+        fresh = NeighbourTable(k=self.k, batch_size=self.batch_size)
+        fresh.complete = True
+        for documents in batches:
+            fresh.upsert([document for document in documents if document.vector])
+        with self._write_lock, self._lock:
+            self.ids, self.doc_ids, self.positions = fresh.ids, fresh.doc_ids, fresh.positions
+            self.vectors, self.alive = fresh.vectors, fresh.alive
+            self.neighbours, self.scores = fresh.neighbours, fresh.scores
+            self.complete = True
+        logger.info("Built neighbour table for %d chunks in %.1fs", len(self), time.monotonic() - start)
+
+    def upsert(self, documents: list[VectorisedDocument]) -> None:
+        if not documents:
+            return
+        with self._write_lock:
+            with self._lock:
+                if not self.complete:
+                    return
+                unique_documents = {sanitise_identifier(document.id): document for document in documents}
+                changed = self._write_rows(list(unique_documents.values()))
+                alive = self.alive.copy()
+            # Only writers change vectors and neighbour rows, so these are read without ``_lock``.
+            self._refresh_rows(changed, alive)
+            self._merge_into_other_rows(changed)
+
+    def remove_documents(self, document_ids: list[str]) -> None:
+        removed = set(document_ids)
+        with self._lock:
+            for position, doc_id in enumerate(self.doc_ids):
+                if doc_id in removed:
+                    self.alive[position] = False
+
+    def neighbours_of(self, chunk_id: str, limit: int) -> list[tuple[str, float]] | None:
+        """Return up to ``limit`` live neighbours, or None if the table can't answer."""
+        with self._lock:
+            position = self.positions.get(sanitise_identifier(chunk_id))
+            if not self.complete or position is None or not self.alive[position] or limit > self.k:
+                return None
+            found = [
+                (self.ids[neighbour], float(score))
+                for neighbour, score in zip(self.neighbours[position], self.scores[position], strict=True)
+                if neighbour >= 0 and self.alive[neighbour] and np.isfinite(score)
+            ]
+            live_rows = len(self) - 1
+            if len(found) < min(limit, live_rows):
+                return None
+            return found[:limit]
+
+    def _write_rows(self, documents: list[VectorisedDocument]) -> IndexArray:
+        vectors = _normalise(document.vector for document in documents).astype(np.float16)
+        if self.vectors.shape[0] == 0:
+            self.vectors = np.zeros((0, vectors.shape[1]), dtype=np.float16)
+
+        positions: list[int] = []
+        new_rows: list[int] = []
+        for row, document in enumerate(documents):
+            chunk_id = sanitise_identifier(document.id)
+            position = self.positions.get(chunk_id)
+            if position is None:
+                position = len(self.ids)
+                self.positions[chunk_id] = position
+                self.ids.append(chunk_id)
+                self.doc_ids.append(document.doc_id)
+                new_rows.append(row)
+            else:
+                self.vectors[position] = vectors[row]
+                self.doc_ids[position] = document.doc_id
+            positions.append(position)
+
+        count = len(new_rows)
+        self.vectors = np.vstack([self.vectors, vectors[new_rows]])
+        self.alive = np.concatenate([self.alive, np.ones(count, dtype=bool)])
+        self.neighbours = np.vstack([self.neighbours, np.full((count, self.k), -1, dtype=np.int32)])
+        self.scores = np.vstack([self.scores, np.full((count, self.k), -np.inf, dtype=np.float16)])
+        self.alive[positions] = True
+        return np.unique(np.asarray(positions, dtype=np.int32))
+
+    def _refresh_rows(self, rows: IndexArray, alive: npt.NDArray[np.bool_]) -> None:
+        columns = np.arange(len(alive), dtype=np.int32)
+        all_vectors = self.vectors.astype(np.float32).T
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start : start + self.batch_size]
+            scores = self.vectors[batch].astype(np.float32) @ all_vectors
+            scores[:, ~alive] = -np.inf
+            scores[np.arange(len(batch)), batch] = -np.inf
+            neighbours, best = _top_k(scores, np.broadcast_to(columns, scores.shape), self.k)
+            with self._lock:
+                self.neighbours[batch] = neighbours
+                self.scores[batch] = best
+
+    def _merge_into_other_rows(self, changed: IndexArray) -> None:
+        others = np.setdiff1d(np.arange(len(self.ids), dtype=np.int32), changed)
+        changed_vectors = self.vectors[changed].astype(np.float32).T
+        for start in range(0, len(others), self.batch_size):
+            batch = others[start : start + self.batch_size]
+            current_neighbours = self.neighbours[batch]
+            current_scores = self.scores[batch].astype(np.float32)
+            # Entries pointing at a changed chunk are stale; the fresh scores below replace them.
+            current_scores[np.isin(current_neighbours, changed)] = -np.inf
+            fresh_scores = self.vectors[batch].astype(np.float32) @ changed_vectors
+            neighbours, best = _top_k(
+                np.hstack([current_scores, fresh_scores]),
+                np.hstack([current_neighbours, np.broadcast_to(changed, fresh_scores.shape)]),
+                self.k,
+            )
+            with self._lock:
+                self.neighbours[batch] = neighbours
+                self.scores[batch] = best
+
+    def save(self) -> None:
+        if self.path is None or not self.complete:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self.path.open("wb") as file:
+            np.savez(
+                file,
+                k=np.asarray(self.k),
+                ids=np.asarray(self.ids, dtype=str),
+                doc_ids=np.asarray(["" if doc_id is None else doc_id for doc_id in self.doc_ids], dtype=str),
+                vectors=self.vectors,
+                alive=self.alive,
+                neighbours=self.neighbours,
+                scores=self.scores,
+            )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "NeighbourTable":
+        with np.load(path) as data:
+            table = cls(k=int(data["k"]), path=path)
+            table.complete = True
+            table.ids = data["ids"].tolist()
+            table.doc_ids = [doc_id or None for doc_id in data["doc_ids"].tolist()]
+            table.positions = {chunk_id: position for position, chunk_id in enumerate(table.ids)}
+            table.vectors = data["vectors"]
+            table.alive = data["alive"]
+            table.neighbours = data["neighbours"]
+            table.scores = data["scores"]
+        return table
+
+
+class NeighbourCachedVectorStore(VectorStoreABC):
+    """Serve similarity searches from a precomputed `NeighbourTable`.
+
+    Writes and deletes go to the wrapped store and are mirrored into the table.
+    Requests the table can't answer (unknown ids, limits above ``k``, filters) fall
+    through to the wrapped store's live similarity search.
+    """
+
+    def __init__(self, inner: VectorStoreABC, table: NeighbourTable) -> None:
+        self.inner = inner
+        self.table = table
+
+    def rebuild(self, batch_size: int = 1000) -> None:
+        """Recompute the table from every chunk in the wrapped store and persist it."""
+        self.table.rebuild(self.inner.iter_documents(batch_size))
+        self.table.save()
+
+    def add_texts(self, documents: list[VectorisedDocument]) -> None:
+        self.inner.add_texts(documents)
+        self.table.upsert(documents)
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        self.inner.delete_documents(document_ids)
+        self.table.remove_documents(document_ids)
+
+    def hybrid_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+    ) -> dict[str, Any]:
+        return self.inner.hybrid_search(query, vector)
+
+    @property
+    def supports_document_vectors(self) -> bool:
+        return self.inner.supports_document_vectors
+
+    def add_document_vectors(self, documents: list[VectorisedDocument]) -> None:
+        self.inner.add_document_vectors(documents)
+
+    def hierarchical_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+        candidates: int,
+    ) -> dict[str, Any]:
+        return self.inner.hierarchical_search(query, vector, candidates)
+
+    def remove_embedder(self, embedder_name: str) -> None:
+        self.inner.remove_embedder(embedder_name)
+
+    def similarity_search(
+        self,
+        request: SimilarityRequestDataClass,
+    ) -> dict[str, Any]:
+        return self.similarity_search_batch([request])[0]
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[VectorisedDocument]]:
+        return self.inner.iter_documents(batch_size)
+
+    def get_documents_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        return self.inner.get_documents_by_ids(ids)
+
+    def similarity_search_batch(
+        self,
+        requests: list[SimilarityRequestDataClass],
+    ) -> list[dict[str, Any]]:
+        start = time.monotonic()
+        neighbour_lists = [
+            None if request.filter else self.table.neighbours_of(str(request.id), request.limit) for request in requests
+        ]
+        wanted = {chunk_id for neighbours in neighbour_lists if neighbours for chunk_id, _ in neighbours}
+        documents = {document["id"]: document for document in self.inner.get_documents_by_ids(sorted(wanted))}
+        processing_time_ms = round((time.monotonic() - start) * 1000)
+
+        results: list[dict[str, Any]] = []
+        for request, neighbours in zip(requests, neighbour_lists, strict=True):
+            if neighbours is None:
+                results.append(self.inner.similarity_search(request))
+                continue
+            hits = [
+                {**documents[chunk_id], "_rankingScore": score}
+                for chunk_id, score in neighbours
+                if chunk_id in documents
+            ]
+            results.append(
+                {
+                    "hits": hits,
+                    "id": request.id,
+                    "processingTimeMs": processing_time_ms,
+                    "limit": request.limit,
+                    "offset": 0,
+                    "estimatedTotalHits": len(hits),
+                },
+            )
+        return results
+
+
+_tables: dict[Path, NeighbourTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_neighbour_table(path: str | Path, k: int = 20) -> NeighbourTable:
+    """Return the process-wide table stored at ``path``, loading it on first use."""
+    path = Path(path)
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            table = NeighbourTable.load(path) if path.exists() else NeighbourTable(k=k, path=path)
+            _tables[path] = table
+        return table
+
+
+def save_neighbour_tables() -> None:
+    with _tables_lock:
+        tables = list(_tables.values())
+    for table in tables:
+        table.save()
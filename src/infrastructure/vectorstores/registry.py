@@ -0,0 +1,135 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import meilisearch
+from meilisearch.index import Index
+from pydantic import SecretStr
+
+from src.infrastructure.vectorstores.meilisearch import (
+    DOCUMENT_INDEX_SUFFIX,
+    ExtraEmbedders,
+    MeiliVectorStore,
+    WriteOptions,
+    ensure_index,
+    get_pooled_meilisearch_client,
+    open_index,
+)
+
+
+class IndexRegistry:
+    """Hand out `MeiliVectorStore` handles for named indexes on one pooled client.
+
+    Handles are kept in a bounded LRU, so hot indexes are a dictionary lookup and rarely
+    used ones are dropped. Embedder settings are applied the first time an index is
+    requested; handles re-opened after eviction skip that step, for the last
+    ``max_configured`` indexes. With ``document_vectors`` each index is paired with a
+    companion index holding one vector per document.
+
+    Only `get` with ``create`` makes a missing index, so reads can't create indexes
+    from arbitrary names.
+    """
+
+    def __init__(
+        self,
+        client: meilisearch.Client,
+        embedder_name: str,
+        max_handles: int = 32,
+        write_options: WriteOptions | None = None,
+        document_vectors: bool = False,
+        dimensions: int = 1024,
+        extra_embedders: ExtraEmbedders = (),
+        max_configured: int = 1024,
+    ) -> None:
+        self.client = client
+        self.embedder_name = embedder_name
+        self.max_handles = max_handles
+        self.write_options = write_options
+        self.document_vectors = document_vectors
+        self.dimensions = dimensions
+        self.extra_embedders = extra_embedders
+        self.max_configured = max_configured
+        self._handles: OrderedDict[str, MeiliVectorStore] = OrderedDict()
+        self._configured: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._configure_lock = threading.Lock()
+
+    def get(self, index_name: str, create: bool = False) -> MeiliVectorStore:
+        """Return a handle on ``index_name``; a missing index raises `IndexNotFoundError` unless ``create``."""
+        with self._lock:
+            store = self._handles.get(index_name)
+            if store is not None:
+                self._handles.move_to_end(index_name)
+                return store
+
+        index = self._open(index_name, create)
+        # The companion of an existing index is made on demand, e.g. once hierarchical search is enabled.
+        document_index = (
+            self._open(f"{index_name}{DOCUMENT_INDEX_SUFFIX}", create=True) if self.document_vectors else None
+        )
+
+        with self._lock:
+            store = self._handles.setdefault(
+                index_name,
+                MeiliVectorStore(
+                    index=index,
+                    embedder_name=self.embedder_name,
+                    write_options=self.write_options,
+                    document_index=document_index,
+                ),
+            )
+            self._handles.move_to_end(index_name)
+            while len(self._handles) > self.max_handles:
+                self._handles.popitem(last=False)
+            return store
+
+    def _open(self, index_name: str, create: bool) -> Index:
+        with self._configure_lock:
+            if index_name in self._configured:
+                self._configured.move_to_end(index_name)
+                return open_index(self.client, index_name)
+            index = ensure_index(
+                self.client,
+                index_name,
+                self.embedder_name,
+                self.dimensions,
+                self.extra_embedders,
+                create=create,
+            )
+            self._configured[index_name] = None
+            while len(self._configured) > self.max_configured:
+                self._configured.popitem(last=False)
+            return index
+
+    def __contains__(self, index_name: str) -> bool:
+        return index_name in self._handles
+
+
+@lru_cache
+def get_index_registry(
+    embedder_name: str,
+    meilisearch_url: str,
+    meili_master_key: SecretStr,
+    max_handles: int = 32,
+    pool_size: int = 10,
+    write_options: WriteOptions | None = None,
+    document_vectors: bool = False,
+    dimensions: int = 1024,
+    extra_embedders: ExtraEmbedders = (),
+    ingest_pool_size: int = 0,
+) -> IndexRegistry:
+    client = get_pooled_meilisearch_client(
+        meilisearch_url,
+        meili_master_key,
+        pool_size=pool_size,
+        ingest_pool_size=ingest_pool_size,
+    )
+    return IndexRegistry(
+        client,
+        embedder_name,
+        max_handles=max_handles,
+        write_options=write_options,
+        document_vectors=document_vectors,
+        dimensions=dimensions,
+        extra_embedders=extra_embedders,
+    )
@@ -0,0 +1,295 @@
+import threading
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import SecretStr
+
+from src.domain.dataclasses.dataclasses import (
+    SearchRequestDataClass,
+    SimilarityRequestDataClass,
+    VectorisedDocument,
+)
+from src.exceptions.exceptions import InvalidFilterError
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.vectorstores.meilisearch import (
+    DOCUMENT_INDEX_SUFFIX,
+    MeiliVectorStore,
+    get_pooled_meilisearch_client,
+    open_index,
+)
+
+logger = setup_logger(name="logger")
+
+
+@dataclass
+class Replica:
+    """A read replica and what the balancer knows about it."""
+
+    name: str
+    store: MeiliVectorStore
+    outstanding: int = 0
+    latency_s: float = 0.0
+    strikes: int = 0
+    # Zero while in rotation; otherwise when the replica may be health-checked again.
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    ejections: int = 0
+
+
+class ReplicaPool:
+    """Least-outstanding-requests balancing with ejection of failing or slow replicas.
+
+    A call that fails, or takes longer than ``slow_threshold_s``, is a strike; after
+    ``max_strikes`` in a row the replica is ejected for ``ejection_s``. When that runs
+    out it must pass ``health_check`` before it is picked again. Ties on outstanding
+    requests go to the replica with the lower latency average.
+    """
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        max_strikes: int = 3,
+        ejection_s: float = 30.0,
+        slow_threshold_s: float = 2.0,
+        health_check: Callable[[Replica], bool] = lambda replica: replica.store.healthy(),
+    ) -> None:
+        self.replicas = replicas
+        self.max_strikes = max_strikes
+        self.ejection_s = ejection_s
+        self.slow_threshold_s = slow_threshold_s
+        self.health_check = health_check
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Replica | None:
+        """Pick a replica and count a request against it; None when every replica is ejected."""
+        now = time.monotonic()
+        with self._lock:
+            # Ejection ends with a health check; until it passes the replica stays out.
+            readmitting = [replica for replica in self.replicas if 0.0 < replica.ejected_until <= now]
+            for replica in readmitting:
+                replica.ejected_until = now + self.ejection_s
+        for replica in readmitting:
+            healthy = self.health_check(replica)
+            with self._lock:
+                if healthy:
+                    replica.strikes = 0
+                    replica.ejected_until = 0.0
+                    logger.info("Replica %s is back in rotation", replica.name)
+        with self._lock:
+            available = [replica for replica in self.replicas if replica.ejected_until == 0.0]
+            if not available:
+                return None
+            replica = min(available, key=lambda replica: (replica.outstanding, replica.latency_s))
+            replica.outstanding += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica: Replica, elapsed_s: float, failed: bool = False) -> None:
+        with self._lock:
+            replica.outstanding -= 1
+            replica.latency_s = elapsed_s if replica.requests == 1 else 0.8 * replica.latency_s + 0.2 * elapsed_s
+            if failed:
+                replica.failures += 1
+            if not failed and elapsed_s <= self.slow_threshold_s:
+                replica.strikes = 0
+                return
+            replica.strikes += 1
+            if replica.strikes >= self.max_strikes and replica.ejected_until == 0.0:
+                replica.ejected_until = time.monotonic() + self.ejection_s
+                replica.ejections += 1
+                logger.warning(
+                    "Ejecting replica %s for %.0fs after %d %s calls",
+                    replica.name,
+                    self.ejection_s,
+                    replica.strikes,
+                    "failed" if failed else "slow",
+                )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                replica.name: {
+                    "outstanding": replica.outstanding,
+                    "latency_ms": round(replica.latency_s * 1000, 1),
+                    "requests": replica.requests,
+                    "failures": replica.failures,
+                    "ejections": replica.ejections,
+                    "ejected": replica.ejected_until > 0.0,
+                }
+                for replica in self.replicas
+            }
+
+
+class ReplicatedVectorStore(VectorStoreABC):
+    """Send writes to the primary and spread searches over read replicas.
+
+    Searches go to the replica with the fewest requests in flight, and fall back to the
+    primary if it fails or every replica is ejected. After a write, searches stay on
+    the primary until that write's Meilisearch task has finished, so this process
+    reads its own writes even while the replicas catch up.
+    """
+
+    def __init__(
+        self,
+        primary: MeiliVectorStore,
+        pool: ReplicaPool,
+        pin_check_interval_s: float = 0.05,
+    ) -> None:
+        self.primary = primary
+        self.pool = pool
+        self.pin_check_interval_s = pin_check_interval_s
+        self._pinned_task: int | None = None
+        self._pin_checked_at = 0.0
+        self._lock = threading.Lock()
+        self.primary_reads = 0
+
+    def add_texts(self, documents: list[VectorisedDocument]) -> None:
+        try:
+            self.primary.add_texts(documents)
+        finally:
+            self._pin()
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        try:
+            self.primary.delete_documents(document_ids)
+        finally:
+            self._pin()
+
+    @property
+    def supports_document_vectors(self) -> bool:
+        return self.primary.supports_document_vectors
+
+    def add_document_vectors(self, documents: list[VectorisedDocument]) -> None:
+        try:
+            self.primary.add_document_vectors(documents)
+        finally:
+            self._pin()
+
+    def remove_embedder(self, embedder_name: str) -> None:
+        self.primary.remove_embedder(embedder_name)
+
+    def _pin(self) -> None:
+        task_uid = self.primary.latest_task_uid()
+        if task_uid is None:
+            return
+        with self._lock:
+            self._pinned_task = max(self._pinned_task or 0, task_uid)
+            self._pin_checked_at = 0.0
+
+    def pinned(self) -> bool:
+        """Whether a write from this process may not have reached the replicas yet."""
+        with self._lock:
+            task_uid = self._pinned_task
+            if task_uid is None:
+                return False
+            if time.monotonic() - self._pin_checked_at < self.pin_check_interval_s:
+                return True
+            self._pin_checked_at = time.monotonic()
+        if not self.primary.task_finished(task_uid):
+            return True
+        with self._lock:
+            if self._pinned_task == task_uid:
+                self._pinned_task = None
+        return False
+
+    def _read[T](self, func: Callable[[MeiliVectorStore], T]) -> T:
+        replica = None if self.pinned() else self.pool.acquire()
+        if replica is None:
+            with self._lock:
+                self.primary_reads += 1
+            return func(self.primary)
+        start = time.perf_counter()
+        try:
+            result = func(replica.store)
+        except InvalidFilterError:
+            # The request is at fault, not the replica.
+            self.pool.release(replica, time.perf_counter() - start)
+            raise
+        except Exception:
+            self.pool.release(replica, time.perf_counter() - start, failed=True)
+            logger.warning("Search on replica %s failed, retrying on the primary", replica.name, exc_info=True)
+            with self._lock:
+                self.primary_reads += 1
+            return func(self.primary)
+        self.pool.release(replica, time.perf_counter() - start)
+        return result
+
+    def hybrid_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+    ) -> dict[str, Any]:
+        return self._read(lambda store: store.hybrid_search(query, vector))
+
+    def hierarchical_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+        candidates: int,
+    ) -> dict[str, Any]:
+        return self._read(lambda store: store.hierarchical_search(query, vector, candidates))
+
+    def similarity_search(
+        self,
+        request: SimilarityRequestDataClass,
+    ) -> dict[str, Any]:
+        return self._read(lambda store: store.similarity_search(request))
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[VectorisedDocument]]:
+        # Maintenance reads need the primary's up-to-date view.
+        return self.primary.iter_documents(batch_size)
+
+    def get_documents_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        return self.primary.get_documents_by_ids(ids)
+
+    def stats(self) -> dict[str, Any]:
+        return {"primary_reads": self.primary_reads, "replicas": self.pool.stats()}
+
+
+_stores: dict[str, ReplicatedVectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_replicated_vectorstore(
+    primary: MeiliVectorStore,
+    replica_urls: tuple[str, ...],
+    meili_master_key: SecretStr,
+    pool_size: int = 10,
+    max_strikes: int = 3,
+    ejection_s: float = 30.0,
+    slow_threshold_s: float = 2.0,
+) -> ReplicatedVectorStore:
+    """Return the process-wide store that reads ``primary``'s index from the replicas at ``replica_urls``.
+
+    Replica indexes are opened as they are: their settings and documents are expected to
+    arrive from the primary, so nothing is written to them.
+    """
+    with _stores_lock:
+        store = _stores.get(primary.index.uid)
+        if store is not None and store.primary is primary:
+            return store
+        replicas: list[Replica] = []
+        for url in replica_urls:
+            client = get_pooled_meilisearch_client(url, meili_master_key, pool_size=pool_size)
+            document_index = (
+                open_index(client, f"{primary.index.uid}{DOCUMENT_INDEX_SUFFIX}") if primary.document_store else None
+            )
+            replica = MeiliVectorStore(
+                open_index(client, primary.index.uid),
+                primary.embedder_name,
+                document_index=document_index,
+            )
+            replicas.append(Replica(url, replica))
+        store = ReplicatedVectorStore(primary, ReplicaPool(replicas, max_strikes, ejection_s, slow_threshold_s))
+        _stores[primary.index.uid] = store
+        return store
+
+
+def replica_stats() -> dict[str, Any]:
+    with _stores_lock:
+        stores = dict(_stores)
+    return {index_name: store.stats() for index_name, store in stores.items()}
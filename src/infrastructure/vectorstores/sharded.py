@@ -0,0 +1,201 @@
+import bisect
+import hashlib
+from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any
+
+from pydantic import SecretStr
+
+from src.domain.dataclasses.dataclasses import (
+    SearchRequestDataClass,
+    SimilarityRequestDataClass,
+    VectorisedDocument,
+)
+from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.vectorstores.meilisearch import (
+    ExtraEmbedders,
+    MeiliVectorStore,
+    WriteOptions,
+    sanitise_identifier,
+)
+from src.infrastructure.vectorstores.registry import get_index_registry
+from src.infrastructure.workloads import bind_workload
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """Map keys onto ``nodes`` buckets so that resizing the ring only moves ~1/N of the keys."""
+
+    def __init__(self, nodes: int, replicas: int = 100) -> None:
+        if nodes < 1:
+            raise ValueError("A hash ring needs at least one node.")
+        points = sorted((_hash(f"{node}#{replica}"), node) for node in range(nodes) for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def get_node(self, key: str) -> int:
+        position = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[position]
+
+
+class ShardedVectorStore(VectorStoreABC):
+    """Spread documents over several Meilisearch shards by consistent hashing on the document id.
+
+    Writes are grouped per shard and sent concurrently, hybrid searches fan out to every
+    shard and are merged on ``_rankingScore``, and similarity searches go to the shard
+    that owns the requested document.
+
+    Reads and writes fan out on separate thread pools of ``read_concurrency`` and
+    ``write_concurrency`` workers (one per shard when 0), so a slow bulk write cannot
+    hold up searches.
+    """
+
+    def __init__(
+        self,
+        shards: list[MeiliVectorStore],
+        replicas: int = 100,
+        read_concurrency: int = 0,
+        write_concurrency: int = 0,
+    ) -> None:
+        self.shards = shards
+        self.ring = ConsistentHashRing(len(shards), replicas)
+        self.read_executor = ThreadPoolExecutor(read_concurrency or len(shards), thread_name_prefix="shard-read")
+        self.write_executor = ThreadPoolExecutor(write_concurrency or len(shards), thread_name_prefix="shard-write")
+
+    def shard_for(self, document_id: str) -> MeiliVectorStore:
+        return self.shards[self.ring.get_node(sanitise_identifier(document_id))]
+
+    def add_texts(self, documents: list[VectorisedDocument]) -> None:
+        documents_by_shard: dict[int, list[VectorisedDocument]] = defaultdict(list)
+        for document in documents:
+            documents_by_shard[self.ring.get_node(sanitise_identifier(document.id))].append(document)
+
+        futures = [
+            self.write_executor.submit(bind_workload(self.shards[shard].add_texts), shard_documents)
+            for shard, shard_documents in documents_by_shard.items()
+        ]
+        for future in futures:
+            future.result()
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        futures = [
+            self.write_executor.submit(bind_workload(shard.delete_documents), document_ids) for shard in self.shards
+        ]
+        for future in futures:
+            future.result()
+
+    def hybrid_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+    ) -> dict[str, Any]:
+        futures = [self.read_executor.submit(shard.hybrid_search, query, vector) for shard in self.shards]
+        results = [future.result() for future in futures]
+        return self._merge_results(query, results)
+
+    @property
+    def supports_document_vectors(self) -> bool:
+        return all(shard.supports_document_vectors for shard in self.shards)
+
+    def add_document_vectors(self, documents: list[VectorisedDocument]) -> None:
+        # Chunks of one document are spread over the shards, so every shard needs its vector.
+        futures = [
+            self.write_executor.submit(bind_workload(shard.add_document_vectors), documents) for shard in self.shards
+        ]
+        for future in futures:
+            future.result()
+
+    def hierarchical_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+        candidates: int,
+    ) -> dict[str, Any]:
+        futures = [
+            self.read_executor.submit(shard.hierarchical_search, query, vector, candidates) for shard in self.shards
+        ]
+        results = [future.result() for future in futures]
+        return self._merge_results(query, results)
+
+    def remove_embedder(self, embedder_name: str) -> None:
+        futures = [self.write_executor.submit(shard.remove_embedder, embedder_name) for shard in self.shards]
+        for future in futures:
+            future.result()
+
+    def similarity_search(
+        self,
+        request: SimilarityRequestDataClass,
+    ) -> dict[str, Any]:
+        return self.shard_for(str(request.id)).similarity_search(request)
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[VectorisedDocument]]:
+        for shard in self.shards:
+            yield from shard.iter_documents(batch_size)
+
+    def get_documents_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        ids_by_shard: dict[int, list[str]] = defaultdict(list)
+        for document_id in ids:
+            ids_by_shard[self.ring.get_node(sanitise_identifier(document_id))].append(document_id)
+
+        futures = [
+            self.read_executor.submit(self.shards[shard].get_documents_by_ids, shard_ids)
+            for shard, shard_ids in ids_by_shard.items()
+        ]
+        return [document for future in futures for document in future.result()]
+
+    @staticmethod
+    def _merge_results(query: SearchRequestDataClass, results: list[dict[str, Any]]) -> dict[str, Any]:
+        hits = [hit for result in results for hit in result["hits"]]
+        hits.sort(key=lambda hit: hit.get("_rankingScore", 0.0), reverse=True)
+        return {
+            "hits": hits[: query.limit],
+            "query": query.query,
+            "processingTimeMs": max((result.get("processingTimeMs", 0) for result in results), default=0),
+            "limit": query.limit,
+            "offset": 0,
+            "estimatedTotalHits": sum(result.get("estimatedTotalHits", 0) for result in results),
+        }
+
+
+@lru_cache(maxsize=32)
+def get_sharded_vectorstore(
+    embedder_name: str,
+    shard_urls: tuple[str, ...],
+    meili_master_key: SecretStr,
+    index_name: str = "documents",
+    max_handles: int = 32,
+    pool_size: int = 10,
+    write_options: WriteOptions | None = None,
+    document_vectors: bool = False,
+    dimensions: int = 1024,
+    extra_embedders: ExtraEmbedders = (),
+    ingest_pool_size: int = 0,
+    read_concurrency: int = 0,
+    write_concurrency: int = 0,
+    create: bool = False,
+) -> ShardedVectorStore:
+    """Return a vector store sharded over one index per Meilisearch url.
+
+    Missing shard indexes are only created with ``create``; otherwise they raise `IndexNotFoundError`.
+    """
+    shards = [
+        get_index_registry(
+            embedder_name,
+            url,
+            meili_master_key,
+            max_handles,
+            pool_size,
+            write_options,
+            document_vectors,
+            dimensions,
+            extra_embedders,
+            ingest_pool_size,
+        ).get(f"{index_name}_shard_{i}", create=create)
+        for i, url in enumerate(shard_urls)
+    ]
+    return ShardedVectorStore(shards, read_concurrency=read_concurrency, write_concurrency=write_concurrency)
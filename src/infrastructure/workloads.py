@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+from typing import Any, Literal
+
+from src.exceptions.exceptions import WorkloadSaturatedError
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.profiling import run_bound
+
+logger = setup_logger(name="logger")
+
+type Workload = Literal["query", "ingest"]
+
+# Anything not explicitly run as ingest, including request threads, counts as query work.
+_current_workload: ContextVar[Workload] = ContextVar("workload", default="query")
+
+
+def current_workload() -> Workload:
+    return _current_workload.get()
+
+
+@contextmanager
+def workload(name: Workload) -> Iterator[None]:
+    """Run the block as ``name`` work, so pooled clients and limiters pick that class's share."""
+    token = _current_workload.set(name)
+    try:
+        yield
+    finally:
+        _current_workload.reset(token)
+
+
+def bind_workload[**P, R](func: Callable[P, R]) -> Callable[P, R]:
+    """Wrap ``func`` to run as the caller's workload class on whichever thread it is handed to."""
+    name = current_workload()
+
+    def run(*args: P.args, **kwargs: P.kwargs) -> R:
+        with workload(name):
+            return func(*args, **kwargs)
+
+    return run
+
+
+class WorkloadClass:
+    """Concurrency cap, queue bound and wait-time record of one workload class."""
+
+    def __init__(self, name: Workload, max_concurrency: int, max_queue: int) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=name)
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.waits_s: deque[float] = deque(maxlen=1000)
+
+    def stats(self) -> dict[str, Any]:
+        waits = sorted(self.waits_s)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "wait_ms_p95": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else 0.0,
+        }
+
+
+class WorkloadScheduler:
+    """Run query and ingest work on separate bounded executors, with queries admitted first.
+
+    Each class has its own threads, so a large ingest cannot take the workers searches
+    run on, and at most ``max_queue`` jobs may wait for them before new ones are rejected
+    with `WorkloadSaturatedError`. An ingest job that is ready to start holds back while
+    searches are queued, for at most ``ingest_max_yield_s`` so ingest is never starved
+    outright.
+    """
+
+    def __init__(
+        self,
+        query_concurrency: int = 32,
+        query_queue: int = 256,
+        ingest_concurrency: int = 2,
+        ingest_queue: int = 100,
+        ingest_max_yield_s: float = 10.0,
+    ) -> None:
+        self.classes: dict[Workload, WorkloadClass] = {
+            "query": WorkloadClass("query", query_concurrency, query_queue),
+            "ingest": WorkloadClass("ingest", ingest_concurrency, ingest_queue),
+        }
+        self.ingest_max_yield_s = ingest_max_yield_s
+        self._condition = threading.Condition()
+
+    def submit[T](self, name: Workload, func: Callable[[], T]) -> Future[T]:
+        """Queue ``func`` as ``name`` work and return its future; failures are logged."""
+        future = self._enqueue(name, func)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    async def run[T](self, name: Workload, func: Callable[[], T]) -> T:
+        """Run ``func`` as ``name`` work and wait for its result without blocking the event loop."""
+        return await asyncio.wrap_future(self._enqueue(name, func))
+
+    def _enqueue[T](self, name: Workload, func: Callable[[], T]) -> Future[T]:
+        workload_class = self.classes[name]
+        with self._condition:
+            if workload_class.queued >= workload_class.max_queue:
+                workload_class.rejected += 1
+                raise WorkloadSaturatedError(f"Too many {name} requests are waiting; try again later.")
+            workload_class.queued += 1
+        # The request's context carries the active profile and deadline to the worker.
+        context = copy_context()
+        future = workload_class.executor.submit(
+            context.run, run_bound, partial(self._run, workload_class, time.monotonic(), func)
+        )
+        future.add_done_callback(lambda done: self._release_cancelled(workload_class, done))
+        return future
+
+    def _release_cancelled(self, workload_class: WorkloadClass, future: Future[Any]) -> None:
+        # A job cancelled before a worker picked it up, e.g. by a disconnected client, never reaches `_admit`.
+        if future.cancelled():
+            with self._condition:
+                workload_class.queued -= 1
+                self._condition.notify_all()
+
+    def _run[T](self, workload_class: WorkloadClass, enqueued_at: float, func: Callable[[], T]) -> T:
+        self._admit(workload_class, enqueued_at)
+        try:
+            with workload(workload_class.name):
+                return func()
+        finally:
+            with self._condition:
+                workload_class.in_flight -= 1
+                workload_class.completed += 1
+                self._condition.notify_all()
+
+    def _admit(self, workload_class: WorkloadClass, enqueued_at: float) -> None:
+        with self._condition:
+            if workload_class.name == "ingest":
+                give_up_at = time.monotonic() + self.ingest_max_yield_s
+                while self.classes["query"].queued and (remaining := give_up_at - time.monotonic()) > 0:
+                    self._condition.wait(remaining)
+            workload_class.queued -= 1
+            workload_class.in_flight += 1
+            workload_class.waits_s.append(time.monotonic() - enqueued_at)
+            self._condition.notify_all()
+
+    @staticmethod
+    def _log_failure(future: Future[Any]) -> None:
+        if not future.cancelled() and (error := future.exception()) is not None:
+            logger.error("Background job failed", exc_info=error)
+
+    def join(self, timeout_s: float | None = None) -> bool:
+        """Wait until no work is queued or running; False if ``timeout_s`` ran out first."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not any(c.queued or c.in_flight for c in self.classes.values()),
+                timeout_s,
+            )
+
+    def stats(self) -> dict[str, Any]:
+        with self._condition:
+            return {name: workload_class.stats() for name, workload_class in self.classes.items()}
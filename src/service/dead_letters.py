@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from src.domain.dataclasses.dataclasses import Document, VectorisedDocument
+from src.infrastructure.logger import setup_logger
+
+logger = setup_logger(name="logger")
+
+
+@dataclass
+class DeadLetter:
+    """A document that could not be indexed, with its chunks if they were embedded before the failure."""
+
+    document: Document
+    reason: str
+    chunks: list[VectorisedDocument] | None = None
+    attempts: int = 1
+    failed_at: float = field(default_factory=time.time)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, line: str) -> "DeadLetter":
+        data = json.loads(line)
+        chunks = data.pop("chunks")
+        return cls(
+            document=Document(**data.pop("document")),
+            chunks=[VectorisedDocument(**chunk) for chunk in chunks] if chunks is not None else None,
+            **data,
+        )
+
+
+class DeadLetterQueue:
+    """Documents that kept failing to index, appended to a JSON-lines file with the reason.
+
+    `take` claims the queued documents so they can be re-driven; any that fail again are
+    added back.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.claim_path = self.path.with_name(f"{self.path.name}.retrying")
+        self._lock = threading.Lock()
+        self._claimed = False
+
+    def add(self, letters: list[DeadLetter]) -> None:
+        if not letters:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as file:
+                file.writelines(f"{letter.to_json()}\n" for letter in letters)
+        for letter in letters:
+            logger.error("Dead-lettered document %s: %s", letter.document.id, letter.reason)
+
+    def read(self) -> list[DeadLetter]:
+        """Every queued document, including those claimed by a retry still running."""
+        with self._lock:
+            return self._read(self.claim_path) + self._read(self.path)
+
+    @contextmanager
+    def take(self) -> Iterator[list[DeadLetter]]:
+        """Claim the queued documents for the duration of a ``with`` block.
+
+        They are moved to a side file and only deleted when the block completes; if it
+        raises they are queued again, and a claim left behind by a crash is picked up by
+        the next `take`. Documents dead-lettered meanwhile join the queue as usual.
+        While one retry is running, another gets nothing.
+        """
+        with self._lock:
+            claimed = not self._claimed
+            if claimed:
+                self._claimed = True
+                if self.path.exists() and not self.claim_path.exists():
+                    self.path.replace(self.claim_path)
+                elif self.path.exists():
+                    # A claim left by a crash: retry it together with the queue.
+                    self._append(self.claim_path, self.path.read_text(encoding="utf-8"))
+                    self.path.unlink()
+            letters = self._read(self.claim_path) if claimed else []
+        if not claimed:
+            yield letters
+            return
+        try:
+            yield letters
+        except BaseException:
+            with self._lock:
+                self._release(keep=True)
+            raise
+        with self._lock:
+            self._release(keep=False)
+
+    def _release(self, keep: bool) -> None:
+        if keep and self.claim_path.exists():
+            self._append(self.path, self.claim_path.read_text(encoding="utf-8"))
+        self.claim_path.unlink(missing_ok=True)
+        self._claimed = False
+
+    @staticmethod
+    def _append(path: Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as file:
+            file.write(text)
+
+    def _read(self, path: Path) -> list[DeadLetter]:
+        if not path.exists():
+            return []
+        letters: list[DeadLetter] = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                letters.append(DeadLetter.from_json(line))
+            except (TypeError, ValueError, KeyError):
+                logger.exception("Skipping unreadable dead letter in %s", path)
+        return letters
+
+    def summary(self) -> dict[str, Any]:
+        letters = self.read()
+        return {
+            "documents": len(letters),
+            "embedded": sum(letter.chunks is not None for letter in letters),
+            "failures": [
+                {"id": letter.document.id, "reason": letter.reason, "attempts": letter.attempts} for letter in letters
+            ],
+        }
+
+
+_queues: dict[Path, DeadLetterQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_dead_letter_queue(path: str | Path) -> DeadLetterQueue:
+    """Return the process-wide dead-letter queue stored at ``path``."""
+    path = Path(path)
+    with _queues_lock:
+        queue = _queues.get(path)
+        if queue is None:
+            queue = _queues[path] = DeadLetterQueue(path)
+        return queue
@@ -0,0 +1,74 @@
+import contextvars
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from src.infrastructure.profiling import run_bound
+
+# Keyword extraction, retrieval and the summary each run as a stage call.
+STAGES_PER_REQUEST = 3
+
+
+def stage_executor(query_concurrency: int) -> ThreadPoolExecutor:
+    """A pool for the stage calls of ``query_concurrency`` concurrent searches.
+
+    Stage calls that overrun are abandoned rather than interrupted, so they run on a
+    dedicated pool where a stuck call can't hold up the request thread, but they keep
+    their worker until they return. The pool has two workers per stage of every
+    concurrent search, so each search slot can have a full set of abandoned calls and
+    still start its own stages without queueing behind them.
+    """
+    return ThreadPoolExecutor(max_workers=2 * STAGES_PER_REQUEST * query_concurrency, thread_name_prefix="stage")
+
+
+_stage_executor = stage_executor(query_concurrency=32)
+
+
+class Deadline:
+    """A point in time by which a request must have answered."""
+
+    def __init__(self, timeout_s: float) -> None:
+        self.timeout_s = timeout_s
+        self.expires_at = time.monotonic() + timeout_s
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def budget(self, limit_s: float | None = None) -> float:
+        """Time a stage may take: what is left, capped at ``limit_s``."""
+        remaining = self.remaining()
+        return remaining if limit_s is None else min(remaining, limit_s)
+
+
+@dataclass(frozen=True)
+class StageBudgets:
+    """Per-stage limits for a conversational search.
+
+    Keyword extraction is an optional refinement, so it may use at most
+    ``keyword_extraction_s``. The summary is skipped when less than ``min_summary_s``
+    is left once the sources have been retrieved.
+    """
+
+    keyword_extraction_s: float = 2.0
+    min_summary_s: float = 1.0
+
+
+def call_with_timeout[T](func: Callable[[], T], timeout_s: float, executor: ThreadPoolExecutor | None = None) -> T:
+    """Run ``func`` on ``executor`` and wait at most ``timeout_s`` for it.
+
+    Raises `TimeoutError` when the time runs out; the call itself is left to finish in
+    the background and its result is discarded.
+    """
+    if timeout_s <= 0:
+        raise TimeoutError
+    context = contextvars.copy_context()
+    future = (executor or _stage_executor).submit(context.run, run_bound, func)
+    try:
+        return future.result(timeout=timeout_s)
+    except TimeoutError:
+        future.cancel()
+        raise
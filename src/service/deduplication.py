@@ -0,0 +1,379 @@
+import hashlib
+import json
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from src.infrastructure.logger import setup_logger
+
+logger = setup_logger(name="logger")
+
+_WORD = re.compile(r"\w+")
+SIGNATURE_BITS = 64
+# Chunks shorter than this many words only match exactly; SimHash is too noisy below it.
+MIN_WORDS_FOR_NEAR_MATCH = 8
+
+
+def normalised_words(text: str) -> list[str]:
+    return _WORD.findall(text.casefold())
+
+
+def content_hash(words: list[str]) -> str:
+    """Hash of the normalised text, equal for chunks differing only in case, punctuation or spacing."""
+    return hashlib.blake2b(" ".join(words).encode(), digest_size=16).hexdigest()
+
+
+def simhash(words: list[str], shingle_size: int = 2) -> int:
+    """64-bit SimHash over word shingles; similar texts differ in few bits."""
+    shingles = [" ".join(words[i : i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))]
+    digests = b"".join(hashlib.blake2b(shingle.encode(), digest_size=8).digest() for shingle in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), 8), axis=1)
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+@dataclass
+class Signature:
+    chunk_id: str
+    doc_id: str
+    content_hash: str
+    simhash: int | None
+
+
+@dataclass
+class DeduplicationReport:
+    chunks: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    tokens_saved: int = 0
+    characters_saved: int = 0
+
+    @property
+    def embeddings_saved(self) -> int:
+        return self.exact_duplicates + self.near_duplicates
+
+    def merge(self, other: "DeduplicationReport") -> None:
+        self.chunks += other.chunks
+        self.exact_duplicates += other.exact_duplicates
+        self.near_duplicates += other.near_duplicates
+        self.tokens_saved += other.tokens_saved
+        self.characters_saved += other.characters_saved
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "chunks": self.chunks,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "embeddings_saved": self.embeddings_saved,
+            "tokens_saved": self.tokens_saved,
+            "characters_saved": self.characters_saved,
+        }
+
+
+@dataclass
+class DeduplicationPlan:
+    """Which chunks of an indexing batch to embed, and the signatures to commit once stored."""
+
+    keep: list[bool] = field(default_factory=list)
+    hashes: list[str] = field(default_factory=list)
+    signatures: list[Signature] = field(default_factory=list)
+    links: dict[str, tuple[str, str]] = field(default_factory=dict)
+    replacing: set[str] = field(default_factory=set)
+    report: DeduplicationReport = field(default_factory=DeduplicationReport)
+
+    def without(self, doc_ids: set[str]) -> tuple["DeduplicationPlan", set[str]]:
+        """Leave out documents that were not stored; also returns the documents linked to their chunks."""
+        dropped = {signature.chunk_id for signature in self.signatures if signature.doc_id in doc_ids}
+        links: dict[str, tuple[str, str]] = {}
+        orphaned: set[str] = set()
+        for chunk_id, (doc_id, canonical) in self.links.items():
+            if doc_id in doc_ids:
+                continue
+            if canonical in dropped:
+                orphaned.add(doc_id)
+                continue
+            links[chunk_id] = (doc_id, canonical)
+        plan = replace(
+            self,
+            signatures=[signature for signature in self.signatures if signature.doc_id not in doc_ids],
+            links=links,
+            replacing=self.replacing - doc_ids,
+        )
+        return plan, orphaned
+
+
+class ChunkDeduplicator:
+    """A persistent signature index that spots duplicate chunks before they are embedded.
+
+    Each stored chunk is recorded under a hash of its normalised text and a SimHash of
+    its word shingles. A new chunk is an exact duplicate if its hash is known and a near
+    duplicate if a known SimHash is within ``max_distance`` bits. Candidates are found
+    through ``max_distance + 1`` bands of the signature, at least one of which must match
+    exactly for any pair within the distance.
+
+    Duplicates are skipped and linked to the canonical chunk they matched. When a
+    canonical chunk's document is deleted or replaced, the documents linked to it are
+    reported as orphaned so they can be re-indexed.
+
+    Search filters and deletes know nothing of these links: a skipped chunk is only
+    stored under the canonical chunk's document, so ``doc_id`` or ``url`` filters on the
+    duplicating document don't find it. Only enable this where that is acceptable.
+
+    With a ``path``, every commit and forget is appended to a JSON-lines journal next to
+    the saved index, so a crash loses none of them; `save` folds the journal into the
+    index, as does every ``compact_every``-th journal entry.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 6,
+        shingle_size: int = 2,
+        path: str | Path | None = None,
+        compact_every: int = 1000,
+    ) -> None:
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.path = Path(path) if path else None
+        self.journal_path = self.path.with_name(f"{self.path.name}.log") if self.path else None
+        self.compact_every = compact_every
+        self._journal_entries = 0
+        self.bands = max_distance + 1
+        self.band_bits = SIGNATURE_BITS // self.bands
+        self.signatures: dict[str, Signature] = {}
+        self.links: dict[str, tuple[str, str]] = {}
+        self.totals = DeduplicationReport()
+        self._by_hash: dict[str, str] = {}
+        self._by_band: defaultdict[tuple[int, int], set[str]] = defaultdict(set)
+        self._by_doc: defaultdict[str, set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def _band_keys(self, signature: int) -> list[tuple[int, int]]:
+        mask = (1 << self.band_bits) - 1
+        return [(band, (signature >> (band * self.band_bits)) & mask) for band in range(self.bands)]
+
+    def plan(
+        self,
+        chunks: list[tuple[str, str, str, int]],
+        replacing: set[str] | None = None,
+    ) -> DeduplicationPlan:
+        """Decide which of ``chunks`` (chunk id, doc id, text, tokens) need embedding.
+
+        Stored chunks of the ``replacing`` documents are ignored, since they are about to
+        be overwritten. Chunks within the batch are also checked against each other.
+        """
+        plan = DeduplicationPlan(replacing=set(replacing or ()))
+        batch = ChunkDeduplicator(self.max_distance, self.shingle_size)
+        with self._lock:
+            for chunk_id, doc_id, text, tokens in chunks:
+                words = normalised_words(text)
+                signature = Signature(
+                    chunk_id=chunk_id,
+                    doc_id=doc_id,
+                    content_hash=content_hash(words),
+                    simhash=simhash(words, self.shingle_size) if len(words) >= MIN_WORDS_FOR_NEAR_MATCH else None,
+                )
+                canonical, exact = batch._match(signature, set())
+                if canonical is None:
+                    canonical, exact = self._match(signature, plan.replacing)
+
+                plan.hashes.append(signature.content_hash)
+                plan.report.chunks += 1
+                if canonical is None:
+                    plan.keep.append(True)
+                    plan.signatures.append(signature)
+                    batch._add(signature)
+                    continue
+                plan.keep.append(False)
+                plan.links[chunk_id] = (doc_id, canonical)
+                plan.report.exact_duplicates += exact
+                plan.report.near_duplicates += not exact
+                plan.report.tokens_saved += tokens
+                plan.report.characters_saved += len(text)
+        return plan
+
+    def commit(self, plan: DeduplicationPlan) -> set[str]:
+        """Record a stored batch; returns documents orphaned by the replaced ones."""
+        with self._lock:
+            orphaned = self._forget(plan.replacing)
+            for signature in plan.signatures:
+                self._add(signature)
+            self.links.update(plan.links)
+            self.totals.merge(plan.report)
+            self._journal(
+                {
+                    "forget": sorted(plan.replacing),
+                    "signatures": [_signature_row(signature) for signature in plan.signatures],
+                    "links": [[chunk_id, doc_id, canonical] for chunk_id, (doc_id, canonical) in plan.links.items()],
+                }
+            )
+        if plan.report.embeddings_saved:
+            logger.info("Skipped %d duplicate chunks: %s", plan.report.embeddings_saved, plan.report.as_dict())
+        return orphaned - plan.replacing
+
+    def forget(self, doc_ids: set[str] | list[str]) -> set[str]:
+        """Drop the signatures and links of ``doc_ids``; returns documents orphaned by it."""
+        with self._lock:
+            orphaned = self._forget(set(doc_ids))
+            self._journal({"forget": sorted(doc_ids)})
+        return orphaned
+
+    def _forget(self, removed: set[str]) -> set[str]:
+        orphaned: set[str] = set()
+        dropped: set[str] = set()
+        for doc_id in removed:
+            for chunk_id in self._by_doc.pop(doc_id, set()):
+                signature = self.signatures.pop(chunk_id)
+                if self._by_hash.get(signature.content_hash) == chunk_id:
+                    del self._by_hash[signature.content_hash]
+                if signature.simhash is not None:
+                    for key in self._band_keys(signature.simhash):
+                        self._by_band[key].discard(chunk_id)
+                dropped.add(chunk_id)
+        for chunk_id, (doc_id, canonical) in list(self.links.items()):
+            if doc_id in removed:
+                del self.links[chunk_id]
+            elif canonical in dropped:
+                orphaned.add(doc_id)
+                del self.links[chunk_id]
+        return orphaned
+
+    def _match(self, signature: Signature, ignored_docs: set[str]) -> tuple[str | None, bool]:
+        exact = self._by_hash.get(signature.content_hash)
+        if exact is not None and self.signatures[exact].doc_id not in ignored_docs:
+            return exact, True
+        if signature.simhash is None:
+            return None, False
+        for key in self._band_keys(signature.simhash):
+            for candidate in self._by_band.get(key, ()):
+                stored = self.signatures[candidate]
+                if stored.doc_id in ignored_docs or stored.simhash is None:
+                    continue
+                if (stored.simhash ^ signature.simhash).bit_count() <= self.max_distance:
+                    return candidate, False
+        return None, False
+
+    def _add(self, signature: Signature) -> None:
+        self.signatures[signature.chunk_id] = signature
+        self._by_hash.setdefault(signature.content_hash, signature.chunk_id)
+        self._by_doc[signature.doc_id].add(signature.chunk_id)
+        if signature.simhash is not None:
+            for key in self._band_keys(signature.simhash):
+                self._by_band[key].add(signature.chunk_id)
+
+    def replace_with(self, other: "ChunkDeduplicator") -> None:
+        """Take over the signatures and links of ``other``, dropping our own."""
+        with self._lock, other._lock:
+            self.signatures = {}
+            self.links = dict(other.links)
+            self._by_hash.clear()
+            self._by_band.clear()
+            self._by_doc.clear()
+            for signature in other.signatures.values():
+                self._add(signature)
+            self.totals.merge(other.totals)
+            self.save()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"signatures": len(self.signatures), "links": len(self.links), **self.totals.as_dict()}
+
+    def save(self) -> None:
+        """Write the whole index and empty the journal it now includes."""
+        if self.path is None or self.journal_path is None:
+            return
+        # Held throughout so no commit lands in a journal that is about to be emptied.
+        with self._lock:
+            payload = {
+                "signatures": [_signature_row(signature) for signature in self.signatures.values()],
+                "links": [[chunk_id, doc_id, canonical] for chunk_id, (doc_id, canonical) in self.links.items()],
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+            tmp_path.replace(self.path)
+            self.journal_path.unlink(missing_ok=True)
+            self._journal_entries = 0
+
+    def load(self) -> None:
+        """Read the saved index, then replay the journal written since it was saved."""
+        if self.path is None or self.journal_path is None:
+            return
+        with self._lock:
+            if self.path.exists():
+                try:
+                    payload = json.loads(self.path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    logger.exception("Could not read duplicate signatures from %s", self.path)
+                    payload = {"signatures": [], "links": []}
+                for row in payload["signatures"]:
+                    self._add(Signature(*row))
+                for chunk_id, doc_id, canonical in payload["links"]:
+                    self.links[chunk_id] = (doc_id, canonical)
+            if not self.journal_path.exists():
+                return
+            for line in self.journal_path.read_text(encoding="utf-8").splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash mid-write; the entries before it still apply.
+                    logger.warning("Skipping unreadable entry in %s", self.journal_path)
+                    continue
+                self._forget(set(entry["forget"]))
+                for row in entry.get("signatures", []):
+                    self._add(Signature(*row))
+                for chunk_id, doc_id, canonical in entry.get("links", []):
+                    self.links[chunk_id] = (doc_id, canonical)
+                self._journal_entries += 1
+
+    def _journal(self, entry: dict[str, list[Any]]) -> None:
+        if self.journal_path is None:
+            return
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.journal_path.open("a", encoding="utf-8") as file:
+            file.write(f"{json.dumps(entry)}\n")
+        self._journal_entries += 1
+        if self._journal_entries >= self.compact_every:
+            self.save()
+
+
+def _signature_row(signature: Signature) -> list[Any]:
+    return [signature.chunk_id, signature.doc_id, signature.content_hash, signature.simhash]
+
+
+_deduplicators: dict[Path, ChunkDeduplicator] = {}
+_deduplicators_lock = threading.Lock()
+
+
+def get_deduplicator(path: str | Path, max_distance: int = 6, shingle_size: int = 2) -> ChunkDeduplicator:
+    """Return the process-wide signature index stored at ``path``, loading it on first use."""
+    path = Path(path)
+    with _deduplicators_lock:
+        deduplicator = _deduplicators.get(path)
+        if deduplicator is None:
+            deduplicator = ChunkDeduplicator(max_distance=max_distance, shingle_size=shingle_size, path=path)
+            deduplicator.load()
+            _deduplicators[path] = deduplicator
+        return deduplicator
+
+
+def save_deduplicators() -> None:
+    with _deduplicators_lock:
+        deduplicators = list(_deduplicators.values())
+    for deduplicator in deduplicators:
+        deduplicator.save()
+
+
+def deduplication_stats() -> dict[str, int]:
+    with _deduplicators_lock:
+        deduplicators = list(_deduplicators.values())
+    totals = DeduplicationReport()
+    for deduplicator in deduplicators:
+        totals.merge(deduplicator.totals)
+    return {"indexes": len(deduplicators), **totals.as_dict()}
@@ -0,0 +1,89 @@
+import re
+from collections.abc import Iterable
+
+import numpy as np
+
+from src.domain.dataclasses.dataclasses import VectorisedDocument
+
+_POSITION = re.compile(r"(\d+)$")
+
+
+def _position(chunk_id: str) -> int:
+    match = _POSITION.search(chunk_id)
+    return int(match.group(1)) if match else 0
+
+
+class DocumentVectorBuilder:
+    """Fold chunk vectors into one vector per parent document.
+
+    A document's vector is the mean of its chunk vectors; its text, url and metadata
+    come from its lead chunk, so the document-level index can also match keywords.
+    Vectors from other embedders are averaged the same way, for documents whose every
+    chunk has one. Only running sums are kept, so a whole index can be streamed
+    through in batches.
+    """
+
+    def __init__(self) -> None:
+        self._sums: dict[str, np.ndarray] = {}
+        self._counts: dict[str, int] = {}
+        self._leads: dict[str, VectorisedDocument] = {}
+        self._extra_sums: dict[str, dict[str, np.ndarray]] = {}
+        self._extra_counts: dict[str, dict[str, int]] = {}
+
+    def add(self, chunks: Iterable[VectorisedDocument]) -> None:
+        for chunk in chunks:
+            if chunk.doc_id is None or not chunk.vector:
+                continue
+            vector = np.asarray(chunk.vector, dtype=np.float32)
+            if chunk.doc_id in self._sums:
+                self._sums[chunk.doc_id] += vector
+                self._counts[chunk.doc_id] += 1
+            else:
+                self._sums[chunk.doc_id] = vector.copy()
+                self._counts[chunk.doc_id] = 1
+            extra_sums = self._extra_sums.setdefault(chunk.doc_id, {})
+            extra_counts = self._extra_counts.setdefault(chunk.doc_id, {})
+            for name, extra in chunk.vectors.items():
+                if not extra:
+                    continue
+                extra_vector = np.asarray(extra, dtype=np.float32)
+                if name in extra_sums:
+                    extra_sums[name] += extra_vector
+                    extra_counts[name] += 1
+                else:
+                    extra_sums[name] = extra_vector.copy()
+                    extra_counts[name] = 1
+            lead = self._leads.get(chunk.doc_id)
+            if lead is None or _position(chunk.id) < _position(lead.id):
+                self._leads[chunk.doc_id] = chunk
+
+    def __len__(self) -> int:
+        return len(self._sums)
+
+    def build(self) -> list[VectorisedDocument]:
+        return [
+            VectorisedDocument(
+                id=doc_id,
+                vector=(total / self._counts[doc_id]).tolist(),
+                chunk=self._leads[doc_id].chunk,
+                url=self._leads[doc_id].url,
+                doc_id=doc_id,
+                metadata=self._leads[doc_id].metadata,
+                vectors=self._extra_vectors(doc_id),
+            )
+            for doc_id, total in self._sums.items()
+        ]
+
+    def _extra_vectors(self, doc_id: str) -> dict[str, list[float]]:
+        count = self._counts[doc_id]
+        return {
+            name: (total / count).tolist()
+            for name, total in self._extra_sums[doc_id].items()
+            if self._extra_counts[doc_id][name] == count
+        }
+
+
+def document_vectors(chunks: Iterable[VectorisedDocument]) -> list[VectorisedDocument]:
+    builder = DocumentVectorBuilder()
+    builder.add(chunks)
+    return builder.build()
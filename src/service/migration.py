@@ -0,0 +1,265 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from langchain_core.embeddings import Embeddings
+
+from src.domain.dataclasses.dataclasses import VectorisedDocument
+from src.exceptions.exceptions import MigrationConflictError
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.vectorstores.meilisearch import ExtraEmbedders
+from src.infrastructure.workloads import workload
+from src.service.document_vectors import DocumentVectorBuilder
+from src.service.search_service import SearchService
+
+logger = setup_logger(name="logger")
+
+
+@dataclass(frozen=True)
+class EmbedderLayout:
+    """The embedder searches read from, and the one written alongside it, if any."""
+
+    read: str
+    read_dimensions: int = 1024
+    shadow: str | None = None
+    shadow_dimensions: int = 1024
+
+    @property
+    def extra_embedders(self) -> ExtraEmbedders:
+        return ((self.shadow, self.shadow_dimensions),) if self.shadow else ()
+
+
+class EmbeddingMigration:
+    """Move an index from the ``source`` embedder to ``target`` while it stays searchable.
+
+    Both embedders are registered on the index and every chunk written during the
+    migration carries vectors from both. `backfill` walks the stored chunks and embeds
+    the ones still missing a ``target`` vector, at most ``max_chunks_per_s`` a second.
+    Chunks that already have one are skipped, so an interrupted back-fill resumes
+    without repeating embedding work. With ``document_vectors`` the pass also rebuilds
+    the document-level vectors from the migrated chunks, so hierarchical search can
+    switch models with the chunks.
+
+    Searches stay on ``source`` until a back-fill pass has covered every chunk and
+    ``read_target`` is switched on. `cleanup` then unregisters ``source``, dropping its
+    vectors. Progress is kept in a JSON file at ``path``.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        target: str,
+        read_target: bool = False,
+        path: str | Path | None = None,
+        batch_size: int = 100,
+        max_chunks_per_s: float = 20.0,
+    ) -> None:
+        self.source = source
+        self.target = target
+        self.read_target = read_target
+        self.path = Path(path) if path else None
+        self.batch_size = batch_size
+        self.max_chunks_per_s = max_chunks_per_s
+        self.scanned = 0
+        self.covered = 0
+        self.embedded = 0
+        self.complete = False
+        self.cleaned = False
+        self.error: str | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def reads_target(self) -> bool:
+        return self.cleaned or (self.read_target and self.complete)
+
+    def layout(self, source_dimensions: int = 1024, target_dimensions: int = 1024) -> EmbedderLayout:
+        if self.cleaned:
+            return EmbedderLayout(self.target, target_dimensions)
+        if self.reads_target():
+            return EmbedderLayout(self.target, target_dimensions, self.source, source_dimensions)
+        return EmbedderLayout(self.source, source_dimensions, self.target, target_dimensions)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, service: SearchService) -> bool:
+        """Back-fill ``service``'s store on a background thread unless a back-fill is already going."""
+        if self.reads_target():
+            raise MigrationConflictError(message=f"Searches already read from {self.target}.")
+        if service.shadow_embedder is None or service.shadow_embedder[0] != self.target:
+            raise MigrationConflictError(message=f"New chunks are not being embedded with {self.target}.")
+        vectorstore, embedder = service.vectorstore, service.shadow_embedder[1]
+        document_vectors = service.uses_document_vectors
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._backfill_as_ingest,
+                args=(vectorstore, embedder, document_vectors),
+                name=f"backfill-{self.target}",
+                daemon=True,
+            )
+            self._thread.start()
+            return True
+
+    def _backfill_as_ingest(self, vectorstore: VectorStoreABC, embedder: Embeddings, document_vectors: bool) -> None:
+        # The back-fill is bulk work: it uses the ingest connection pool and embedding limit.
+        with workload("ingest"):
+            self.backfill(vectorstore, embedder, document_vectors)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def backfill(self, vectorstore: VectorStoreABC, embedder: Embeddings, document_vectors: bool = False) -> None:
+        """Give every stored chunk a ``target`` vector; errors are recorded, not raised."""
+        self.scanned = self.covered = 0
+        self.error = None
+        builder = DocumentVectorBuilder() if document_vectors else None
+        embedded_this_run = 0
+        start = time.monotonic()
+        try:
+            for page in vectorstore.iter_documents(self.batch_size):
+                if self._stop.is_set():
+                    logger.info("Back-fill of %s stopped after %d chunks", self.target, self.scanned)
+                    return
+                missing = [chunk for chunk in page if not chunk.vectors.get(self.target)]
+                stored = self._embed(vectorstore, embedder, missing) if missing else 0
+                embedded_this_run += stored
+                self.scanned += len(page)
+                self.covered += len(page) - len(missing) + stored
+                self.embedded += stored
+                if builder is not None:
+                    builder.add(page)
+                self.save()
+                # Stay under the configured rate so live indexing and search keep their share.
+                delay = embedded_this_run / self.max_chunks_per_s - (time.monotonic() - start)
+                if delay > 0:
+                    self._stop.wait(delay)
+            if builder is not None:
+                self._store_document_vectors(vectorstore, builder)
+        except Exception as e:
+            logger.exception("Back-fill of %s failed", self.target)
+            self.error = str(e)
+            self.save()
+            return
+        self.complete = True
+        self.save()
+        logger.info("Back-fill of %s complete: %d chunks, %d embedded", self.target, self.scanned, self.embedded)
+
+    def _embed(self, vectorstore: VectorStoreABC, embedder: Embeddings, chunks: list[VectorisedDocument]) -> int:
+        vectors = embedder.embed_documents([chunk.chunk for chunk in chunks])
+        # Chunks replaced or deleted while they were embedded are left alone: a
+        # replacement was already written with both vectors.
+        current = {
+            document["id"]: document.get("chunk")
+            for document in vectorstore.get_documents_by_ids([chunk.id for chunk in chunks])
+        }
+        unchanged: list[VectorisedDocument] = []
+        for chunk, vector in zip(chunks, vectors, strict=True):
+            if current.get(chunk.id) == chunk.chunk:
+                chunk.vectors[self.target] = vector
+                unchanged.append(chunk)
+        if unchanged:
+            vectorstore.add_texts(unchanged)
+        return len(unchanged)
+
+    def _store_document_vectors(self, vectorstore: VectorStoreABC, builder: DocumentVectorBuilder) -> None:
+        # Documents with a chunk rewritten during the pass lack a full set of ``target``
+        # vectors; the rewrite already stored their document vector with both models.
+        documents = [document for document in builder.build() if self.target in document.vectors]
+        for start in range(0, len(documents), self.batch_size):
+            vectorstore.add_document_vectors(documents[start : start + self.batch_size])
+        logger.info("Stored %d document vectors with %s vectors", len(documents), self.target)
+
+    def cleanup(self, vectorstore: VectorStoreABC) -> None:
+        """Drop the ``source`` vectors once searches read from ``target``."""
+        if not self.reads_target():
+            raise MigrationConflictError(message=f"Searches still read from {self.source}.")
+        vectorstore.remove_embedder(self.source)
+        self.cleaned = True
+        self.save()
+        logger.info("Removed %s vectors; set EMBEDDER_NAME to %s", self.source, self.target)
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "source": self.source,
+            "target": self.target,
+            "reads": self.target if self.reads_target() else self.source,
+            "running": self.running,
+            "scanned": self.scanned,
+            "embedded": self.embedded,
+            "coverage": 1.0 if self.complete else round(self.covered / self.scanned, 4) if self.scanned else 0.0,
+            "complete": self.complete,
+            "cleaned": self.cleaned,
+            "error": self.error,
+        }
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        state = {
+            "source": self.source,
+            "target": self.target,
+            "embedded": self.embedded,
+            "complete": self.complete,
+            "cleaned": self.cleaned,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.exception("Could not read migration state from %s", self.path)
+            return
+        if (state.get("source"), state.get("target")) != (self.source, self.target):
+            logger.warning("Ignoring migration state for %s -> %s", state.get("source"), state.get("target"))
+            return
+        self.embedded = state.get("embedded", 0)
+        self.complete = state.get("complete", False)
+        self.cleaned = state.get("cleaned", False)
+
+
+_migrations: dict[Path, EmbeddingMigration] = {}
+_migrations_lock = threading.Lock()
+
+
+def get_embedding_migration(
+    path: str | Path,
+    source: str,
+    target: str,
+    read_target: bool = False,
+    batch_size: int = 100,
+    max_chunks_per_s: float = 20.0,
+) -> EmbeddingMigration:
+    """Return the process-wide migration whose progress is stored at ``path``, loading it on first use."""
+    path = Path(path)
+    with _migrations_lock:
+        migration = _migrations.get(path)
+        if migration is None or (migration.source, migration.target) != (source, target):
+            migration = EmbeddingMigration(source, target, read_target, path, batch_size, max_chunks_per_s)
+            migration.load()
+            _migrations[path] = migration
+        migration.read_target = read_target
+        return migration
+
+
+def stop_migrations() -> None:
+    with _migrations_lock:
+        migrations = list(_migrations.values())
+    for migration in migrations:
+        migration.stop()
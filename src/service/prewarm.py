@@ -0,0 +1,77 @@
+import threading
+import time
+from collections.abc import Callable
+
+from src.domain.dataclasses.dataclasses import SearchRequestDataClass
+from src.infrastructure.logger import setup_logger
+from src.service.query_log import QueryLog
+from src.service.search_service import SearchService
+
+logger = setup_logger(name="logger")
+
+
+class Prewarmer:
+    """Replay the most popular recorded queries to refill caches after a deploy or re-index.
+
+    Runs on a single background thread at no more than ``max_qps`` queries per second
+    and pauses whenever ``is_busy`` reports live search traffic.
+    """
+
+    def __init__(
+        self,
+        query_log: QueryLog,
+        service_factory: Callable[[str], SearchService],
+        top_n: int = 200,
+        max_qps: float = 2.0,
+        is_busy: Callable[[], bool] = lambda: False,
+    ) -> None:
+        self.query_log = query_log
+        self.service_factory = service_factory
+        self.top_n = top_n
+        self.interval_s = 1 / max_qps
+        self.is_busy = is_busy
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.warmed = 0
+        self.failures = 0
+
+    def start(self) -> bool:
+        """Start a pre-warm run in the background unless one is already going."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self.run, name="prewarm", daemon=True)
+            self._thread.start()
+            return True
+
+    def run(self) -> None:
+        queries = self.query_log.top(self.top_n)
+        self.runs += 1
+        logger.info("Pre-warming %d queries", len(queries))
+        for index_name, query, limit in queries:
+            while self.is_busy():
+                time.sleep(self.interval_s)
+            try:
+                self._warm(index_name, query, limit)
+                self.warmed += 1
+            except Exception:
+                self.failures += 1
+                logger.exception("Pre-warm query failed")
+            time.sleep(self.interval_s)
+
+    def _warm(self, index_name: str, query: str, limit: int) -> None:
+        service = self.service_factory(index_name)
+        vector = service.embedder.embed_query(query)
+        service.vectorstore.hybrid_search(
+            query=SearchRequestDataClass(query=query, limit=limit),
+            vector=vector,
+        )
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "runs": self.runs,
+            "warmed": self.warmed,
+            "failures": self.failures,
+        }
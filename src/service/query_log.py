@@ -0,0 +1,71 @@
+import json
+import random
+import threading
+from collections import Counter
+from pathlib import Path
+
+from src.infrastructure.logger import setup_logger
+
+logger = setup_logger(name="logger")
+
+type QueryKey = tuple[str, str, int]
+
+
+class QueryLog:
+    """A sampled, size-bounded frequency table of search queries.
+
+    Each query is recorded with probability ``sample_rate`` under an
+    ``(index, query, limit)`` key. Once the table holds more than ``max_entries`` keys
+    the least frequent tenth is dropped, keeping memory bounded while popular queries
+    survive. The table can be persisted to ``path`` so it outlives restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        sample_rate: float = 0.1,
+        path: str | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.sample_rate = sample_rate
+        self.path = Path(path) if path else None
+        self._counts: Counter[QueryKey] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, index_name: str, query: str, limit: int) -> None:
+        if random.random() >= self.sample_rate:
+            return
+        key = (index_name, " ".join(query.split()), limit)
+        with self._lock:
+            self._counts[key] += 1
+            if len(self._counts) > self.max_entries:
+                self._counts = Counter(dict(self._counts.most_common(self.max_entries * 9 // 10)))
+
+    def top(self, n: int) -> list[QueryKey]:
+        with self._lock:
+            return [key for key, _ in self._counts.most_common(n)]
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            entries = [[*key, count] for key, count in self._counts.most_common()]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entries), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.exception("Could not read query log from %s", self.path)
+            return
+        with self._lock:
+            for index_name, query, limit, count in entries:
+                self._counts[(index_name, query, limit)] += count
@@ -0,0 +1,439 @@
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, Literal
+
+import meilisearch
+from meilisearch.errors import MeilisearchApiError, MeilisearchError
+from meilisearch.index import Index
+
+from src.domain.dataclasses.dataclasses import (
+    Document,
+    SearchRequestDataClass,
+    SimilarityRequestDataClass,
+    VectorisedDocument,
+)
+from src.exceptions.exceptions import IndexingError, RebuildConflictError, RebuildNotFoundError
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.vectorstores.meilisearch import (
+    DOCUMENT_INDEX_SUFFIX,
+    MeiliVectorStore,
+    WriteOptions,
+    ensure_index,
+    index_settings,
+    open_index,
+    sanitise_identifier,
+)
+from src.service.deduplication import ChunkDeduplicator
+from src.service.migration import EmbedderLayout
+from src.service.search_service import SearchService
+
+logger = setup_logger(name="logger")
+
+SHADOW_SUFFIX = "__rebuild"
+
+type RebuildStatus = Literal["loading", "swapping", "completed", "failed", "aborted"]
+
+
+class IndexRebuild:
+    """A blue/green rebuild of one index.
+
+    Documents are loaded into a shadow index that has the embedder settings applied
+    before the first write and serves no searches, so it can be written as fast as the
+    store allows. `swap` waits for the shadow's tasks to finish, checks that it holds
+    every chunk written and no task failed, then swaps it with the live index in one
+    Meilisearch task and drops the old data. Searches see either the old corpus or the
+    new one, never a half-loaded index. Writes to the live index while the rebuild runs
+    are repeated on the shadow (see `RebuildMirroredVectorStore`), so none are lost at
+    the swap.
+    """
+
+    def __init__(
+        self,
+        client: meilisearch.Client,
+        index_name: str,
+        service: SearchService,
+        layout: EmbedderLayout,
+        write_options: WriteOptions | None = None,
+        wait_timeout_s: float = 3600.0,
+    ) -> None:
+        self.client = client
+        self.index_name = index_name
+        self.shadow_name = f"{index_name}{SHADOW_SUFFIX}"
+        self.live_service = service
+        self.layout = layout
+        self.write_options = write_options or WriteOptions()
+        self.wait_timeout_s = wait_timeout_s
+        self.status: RebuildStatus = "loading"
+        self.error: str | None = None
+        # Stored chunk ids, sanitised as Meilisearch stores them, mapped to their parent document.
+        self.chunk_ids: dict[str, str] = {}
+        self.documents = 0
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self.shadow: SearchService | None = None
+        # The shadow's create task; failures before it belong to earlier incarnations of the uid.
+        self._created_task_uids: dict[str, int] = {}
+        self._writers = 0
+        # Set once `swap` has drained the writers; live writes then wait for the swap to finish.
+        self._sealed = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def prepare(self) -> None:
+        """Create an empty shadow index with the embedder settings in place."""
+        try:
+            self._prepare()
+        except Exception as e:
+            self._finish("failed", str(e))
+            raise
+
+    @property
+    def index_pairs(self) -> list[tuple[str, str]]:
+        """(live, shadow) index names; document vectors get a pair of their own."""
+        pairs = [(self.index_name, self.shadow_name)]
+        if self.live_service.uses_document_vectors:
+            pairs.append((f"{self.index_name}{DOCUMENT_INDEX_SUFFIX}", f"{self.shadow_name}{DOCUMENT_INDEX_SUFFIX}"))
+        return pairs
+
+    def _prepare(self) -> None:
+        indexes = [self._create_shadow(shadow_name) for _, shadow_name in self.index_pairs]
+        store = MeiliVectorStore(
+            index=indexes[0],
+            embedder_name=self.layout.read,
+            write_options=self.write_options,
+            document_index=indexes[1] if len(indexes) > 1 else None,
+        )
+
+        live = self.live_service
+        deduplicator = live.deduplicator
+        self.shadow = SearchService(
+            embedder=live.embedder,
+            vectorstore=store,
+            llm=live.llm,
+            chunker=live.chunker,
+            embedding_concurrency=live.embedding_concurrency,
+            deduplicator=(
+                ChunkDeduplicator(deduplicator.max_distance, deduplicator.shingle_size) if deduplicator else None
+            ),
+            document_candidates=live.document_candidates,
+            shadow_embedder=live.shadow_embedder,
+            # Without a dead-letter queue a failed document fails the batch, so the swap check catches it.
+            document_retries=live.document_retries,
+            retry_delay_s=live.retry_delay_s,
+        )
+        logger.info("Rebuilding %s into %s", self.index_name, self.shadow_name)
+
+    def _create_shadow(self, shadow_name: str) -> Index:
+        self._drop_index(shadow_name)
+        task_info = self.client.create_index(shadow_name, {"primaryKey": "id"})
+        self._wait(task_info)
+        self._created_task_uids[shadow_name] = task_info.task_uid
+        index = open_index(self.client, shadow_name)
+        settings = index_settings(self.layout.read, self.layout.read_dimensions, self.layout.extra_embedders)
+        self._wait(index.update_settings(body=settings))
+        return index
+
+    def add_documents(self, documents: list[Document]) -> int:
+        """Load a batch of documents into the shadow index; returns the chunks stored."""
+        with self._lock:
+            self._require("loading")
+            self._writers += 1
+        try:
+            assert self.shadow is not None
+            chunk_ids = self.shadow.index_documents(documents)
+            with self._lock:
+                # Chunk ids are "<document id>::<position>".
+                self.chunk_ids.update(
+                    (sanitise_identifier(chunk_id), chunk_id.rsplit("::", 1)[0]) for chunk_id in chunk_ids
+                )
+                self.documents += len(documents)
+            return len(chunk_ids)
+        finally:
+            with self._idle:
+                self._writers -= 1
+                self._idle.notify_all()
+
+    @contextmanager
+    def live_write(self) -> Iterator[bool]:
+        """Bracket a write to the live index; yields whether to repeat it on the shadow.
+
+        Until `swap` has drained the shadow's writers the answer is yes. After that the
+        write waits for the swap to finish and goes to the live index only, which by then
+        holds whichever corpus won.
+        """
+        with self._idle:
+            if self._sealed:
+                self._idle.wait_for(lambda: not self.active)
+            mirrored = self.active and self.shadow is not None
+            if mirrored:
+                self._writers += 1
+        if not mirrored:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            with self._idle:
+                self._writers -= 1
+                self._idle.notify_all()
+
+    @property
+    def shadow_store(self) -> VectorStoreABC:
+        assert self.shadow is not None
+        return self.shadow.vectorstore
+
+    def mirror_texts(self, documents: list[VectorisedDocument]) -> None:
+        """Repeat a live write of ``documents`` on the shadow; call inside `live_write`."""
+        self.shadow_store.add_texts(documents)
+        with self._lock:
+            self.chunk_ids.update(
+                (sanitise_identifier(document.id), document.doc_id or document.id.rsplit("::", 1)[0])
+                for document in documents
+            )
+
+    def mirror_delete(self, document_ids: list[str]) -> None:
+        """Repeat a live delete on the shadow; call inside `live_write`."""
+        self.shadow_store.delete_documents(document_ids)
+        deleted = set(document_ids)
+        with self._lock:
+            self.chunk_ids = {
+                chunk_id: document_id for chunk_id, document_id in self.chunk_ids.items() if document_id not in deleted
+            }
+
+    def swap(self, on_swapped: Callable[[], None] | None = None) -> None:
+        """Verify the shadow index and make it live; failures are recorded, not raised."""
+        try:
+            self._swap()
+        except Exception as e:
+            logger.exception("Rebuild of %s failed", self.index_name)
+            self._finish("failed", str(e))
+            return
+        self._finish("completed")
+        if on_swapped is not None:
+            on_swapped()
+
+    def begin_swap(self) -> None:
+        """Stop accepting documents; call before scheduling `swap`."""
+        with self._lock:
+            self._require("loading")
+            self.status = "swapping"
+
+    def _swap(self) -> None:
+        with self._idle:
+            self._idle.wait_for(lambda: self._writers == 0)
+            self._sealed = True
+        assert self.shadow is not None
+        store = self.shadow.vectorstore
+        assert isinstance(store, MeiliVectorStore)
+        for shadow_store in filter(None, [store, store.document_store]):
+            if not shadow_store.wait_for_tasks(self.wait_timeout_s):
+                raise IndexingError(message=f"{shadow_store.index.uid} still had tasks running")
+            if failed := shadow_store.failed_tasks(self._created_task_uids[shadow_store.index.uid]):
+                raise IndexingError(message=f"{failed} tasks failed on {shadow_store.index.uid}")
+        expected, stored = len(self.chunk_ids), store.count()
+        if stored != expected:
+            raise IndexingError(message=f"{self.shadow_name} holds {stored} chunks, expected {expected}")
+
+        # Both sides of a swap must exist, so a first build still needs empty live indexes.
+        for live_name, _ in self.index_pairs:
+            ensure_index(
+                self.client,
+                live_name,
+                self.layout.read,
+                self.layout.read_dimensions,
+                self.layout.extra_embedders,
+            )
+        self._wait(self.client.swap_indexes([{"indexes": list(pair)} for pair in self.index_pairs]))
+        logger.info("Swapped %d chunks into %s", stored, self.index_name)
+        for _, shadow_name in self.index_pairs:
+            self._drop_index(shadow_name)
+
+        live_deduplicator = self.live_service.deduplicator
+        if live_deduplicator is not None and self.shadow.deduplicator is not None:
+            live_deduplicator.replace_with(self.shadow.deduplicator)
+
+    def abort(self) -> None:
+        with self._idle:
+            if self.status not in {"loading", "failed"}:
+                raise RebuildConflictError(message=f"Rebuild of {self.index_name} is {self.status}.")
+            self.status = "aborted"
+            # A write still in flight would re-create the shadow after it is dropped.
+            self._idle.wait_for(lambda: self._writers == 0)
+        for _, shadow_name in self.index_pairs:
+            self._drop_index(shadow_name)
+        self._finish("aborted")
+
+    @property
+    def active(self) -> bool:
+        return self.status in {"loading", "swapping"}
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "index": self.index_name,
+            "shadow_index": self.shadow_name,
+            "status": self.status,
+            "error": self.error,
+            "documents": self.documents,
+            "chunks": len(self.chunk_ids),
+            "started_at": round(self.started_at, 3),
+            "finished_at": round(self.finished_at, 3) if self.finished_at else None,
+        }
+
+    def _require(self, status: RebuildStatus) -> None:
+        if self.status != status:
+            raise RebuildConflictError(message=f"Rebuild of {self.index_name} is {self.status}.")
+
+    def _finish(self, status: RebuildStatus, error: str | None = None) -> None:
+        with self._idle:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self._idle.notify_all()
+
+    def _wait(self, task_info: Any) -> None:
+        task = self.client.wait_for_task(task_info.task_uid, timeout_in_ms=int(self.wait_timeout_s * 1000))
+        if task.status != "succeeded":
+            raise IndexingError(message=f"Meilisearch task {task_info.task_uid} {task.status}: {task.error}")
+
+    def _drop_index(self, index_name: str) -> None:
+        try:
+            task_info = self.client.delete_index(index_name)
+            # A missing index fails the task, which is fine: `swap` only counts the shadow's own tasks.
+            self.client.wait_for_task(task_info.task_uid, timeout_in_ms=int(self.wait_timeout_s * 1000))
+        except MeilisearchApiError as e:
+            if e.status_code != 404:
+                raise
+        except MeilisearchError:
+            logger.exception("Could not drop %s", index_name)
+
+
+class RebuildManager:
+    """Track at most one rebuild per index."""
+
+    def __init__(
+        self,
+        client: meilisearch.Client,
+        write_options: WriteOptions | None = None,
+        wait_timeout_s: float = 3600.0,
+    ) -> None:
+        self.client = client
+        self.write_options = write_options
+        self.wait_timeout_s = wait_timeout_s
+        self._rebuilds: dict[str, IndexRebuild] = {}
+        self._lock = threading.Lock()
+
+    def start(self, index_name: str, service: SearchService, layout: EmbedderLayout) -> IndexRebuild:
+        """Start rebuilding ``index_name`` with the embedders ``layout`` says it is written with."""
+        with self._lock:
+            current = self._rebuilds.get(index_name)
+            if current is not None and current.active:
+                raise RebuildConflictError(message=f"A rebuild of {index_name} is already {current.status}.")
+            rebuild = IndexRebuild(
+                self.client,
+                index_name,
+                service,
+                layout,
+                write_options=self.write_options,
+                wait_timeout_s=self.wait_timeout_s,
+            )
+            self._rebuilds[index_name] = rebuild
+        rebuild.prepare()
+        return rebuild
+
+    def get(self, index_name: str) -> IndexRebuild:
+        if (rebuild := self.current(index_name)) is None:
+            raise RebuildNotFoundError
+        return rebuild
+
+    def current(self, index_name: str) -> IndexRebuild | None:
+        """The latest rebuild of ``index_name``, finished or not."""
+        with self._lock:
+            return self._rebuilds.get(index_name)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {name: rebuild.status for name, rebuild in self._rebuilds.items()}
+
+
+class RebuildMirroredVectorStore(VectorStoreABC):
+    """Forward to the live index's store, repeating writes on the shadow of a rebuild in progress.
+
+    Writes and deletes that reach the live index during a rebuild would otherwise be
+    lost when the shadow is swapped in. Embedder removal and reads only go to the live
+    index.
+    """
+
+    def __init__(self, inner: VectorStoreABC, rebuilds: RebuildManager, index_name: str) -> None:
+        self.inner = inner
+        self.rebuilds = rebuilds
+        self.index_name = index_name
+
+    @contextmanager
+    def _live_write(self) -> Iterator[IndexRebuild | None]:
+        rebuild = self.rebuilds.current(self.index_name)
+        if rebuild is None:
+            yield None
+            return
+        with rebuild.live_write() as mirrored:
+            yield rebuild if mirrored else None
+
+    def add_texts(self, documents: list[VectorisedDocument]) -> None:
+        with self._live_write() as rebuild:
+            self.inner.add_texts(documents)
+            if rebuild is not None:
+                rebuild.mirror_texts(documents)
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        with self._live_write() as rebuild:
+            self.inner.delete_documents(document_ids)
+            if rebuild is not None:
+                rebuild.mirror_delete(document_ids)
+
+    def hybrid_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+    ) -> dict[str, Any]:
+        return self.inner.hybrid_search(query, vector)
+
+    def similarity_search(
+        self,
+        request: SimilarityRequestDataClass,
+    ) -> dict[str, Any]:
+        return self.inner.similarity_search(request)
+
+    def similarity_search_batch(
+        self,
+        requests: list[SimilarityRequestDataClass],
+    ) -> list[dict[str, Any]]:
+        return self.inner.similarity_search_batch(requests)
+
+    @property
+    def supports_document_vectors(self) -> bool:
+        return self.inner.supports_document_vectors
+
+    def add_document_vectors(self, documents: list[VectorisedDocument]) -> None:
+        with self._live_write() as rebuild:
+            self.inner.add_document_vectors(documents)
+            if rebuild is not None and rebuild.shadow_store.supports_document_vectors:
+                rebuild.shadow_store.add_document_vectors(documents)
+
+    def hierarchical_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+        candidates: int,
+    ) -> dict[str, Any]:
+        return self.inner.hierarchical_search(query, vector, candidates)
+
+    def remove_embedder(self, embedder_name: str) -> None:
+        self.inner.remove_embedder(embedder_name)
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[VectorisedDocument]]:
+        return self.inner.iter_documents(batch_size)
+
+    def get_documents_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        return self.inner.get_documents_by_ids(ids)
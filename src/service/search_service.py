@@ -1,10 +1,16 @@
-from typing import Any
+import json
+import time
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, NoReturn
 
 from langchain_core.embeddings import Embeddings
 from langchain_core.exceptions import LangChainException
 
-from src.domain.chunk import chunk_paragraphs
+from src.domain.chunk import ChunkingEngine
 from src.domain.dataclasses.dataclasses import (
+    Chunk,
     Document,
     SearchRequestDataClass,
     SimilarityRequestDataClass,
@@ -12,79 +18,548 @@ from src.domain.dataclasses.dataclasses import (
 )
 from src.exceptions.exceptions import (
     ConversationalSearchError,
+    DeadlineExceededError,
     EmbedderError,
+    InvalidFilterError,
 )
 from src.infrastructure.llms.base import LLMABC
 from src.infrastructure.logger import setup_logger
+from src.infrastructure.profiling import profiled
 from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.workloads import bind_workload
+from src.service.dead_letters import DeadLetter, DeadLetterQueue
+from src.service.deadline import Deadline, StageBudgets, call_with_timeout
+from src.service.deduplication import ChunkDeduplicator, DeduplicationPlan
+from src.service.document_vectors import DocumentVectorBuilder, document_vectors
+from src.service.sessions import SessionStore
+from src.service.singleflight import SingleFlight
 
 logger = setup_logger(name="logger")
 
 
+@dataclass
+class _PendingDocument:
+    """A document on its way into the store, with its chunks as (position, chunk, content hash)."""
+
+    document: Document
+    chunks: list[tuple[int, Chunk, str | None]]
+    vectorised: list[VectorisedDocument] | None = None
+    error: Exception | None = None
+    attempts: int = 0
+
+
+@profiled
 class SearchService:
     def __init__(
         self,
         embedder: Embeddings,
         vectorstore: VectorStoreABC,
         llm: LLMABC,
+        chunker: ChunkingEngine | None = None,
+        embedding_concurrency: int = 1,
+        coalescer: SingleFlight | None = None,
+        deduplicator: ChunkDeduplicator | None = None,
+        stage_budgets: StageBudgets | None = None,
+        document_candidates: int = 0,
+        shadow_embedder: tuple[str, Embeddings] | None = None,
+        dead_letters: DeadLetterQueue | None = None,
+        document_retries: int = 0,
+        retry_delay_s: float = 1.0,
+        sessions: SessionStore | None = None,
+        stage_executor: ThreadPoolExecutor | None = None,
     ) -> None:
         self.embedder = embedder
         self.vectorstore = vectorstore
         self.llm = llm
+        self.chunker = chunker or ChunkingEngine()
+        self.embedding_concurrency = embedding_concurrency
+        self.coalescer = coalescer
+        self.deduplicator = deduplicator
+        self.stage_budgets = stage_budgets or StageBudgets()
+        # Above zero, searches pre-select this many documents by their document vectors.
+        self.document_candidates = document_candidates
+        # While migrating embedders, stored chunks are also embedded under this (name, embedder).
+        self.shadow_embedder = shadow_embedder
+        # Documents that still fail to index after ``document_retries`` retries are kept here.
+        self.dead_letters = dead_letters
+        self.document_retries = document_retries
+        self.retry_delay_s = retry_delay_s
+        self.sessions = sessions
+        # Stage calls with a deadline run here; see `deadline.stage_executor`.
+        self.stage_executor = stage_executor
+
+    @property
+    def uses_document_vectors(self) -> bool:
+        """Whether chunks get document vectors and searches pre-select by them."""
+        return self.document_candidates > 0 and self.vectorstore.supports_document_vectors
+
+    def index_documents(self, documents: list[Document]) -> list[str]:
+        """Index a document: create embeddings + store them.
+
+        Documents are embedded and stored independently. One that fails is retried up
+        to ``document_retries`` times with exponential backoff while the others are
+        stored, then goes to the dead-letter queue with the reason and any vectors
+        already computed. Without a queue its error is raised instead, once the other
+        documents are stored.
+
+        Returns the ids of the chunks stored.
+        """
+        chunked_documents = self.chunker.chunk_many([document.body for document in documents])
+        kept_chunks, plan = self._deduplicate(documents, chunked_documents)
+        stored, failed = self._index_with_retries(
+            [_PendingDocument(document, chunks) for document, chunks in zip(documents, kept_chunks, strict=True)],
+        )
+        if failed and plan is not None:
+            plan, orphaned = plan.without({item.document.id for item in failed})
+            self._report_orphans(orphaned)
+        self._store_document_vectors(stored)
+        self._commit_deduplication(plan)
+        self._dead_letter(failed)
+        return [chunk.id for chunk in stored]
+
+    def retry_dead_letters(self) -> list[str]:
+        """Re-drive the dead-lettered documents; those embedded before they failed are not embedded again.
+
+        Returns the ids of the chunks stored.
+        """
+        if self.dead_letters is None:
+            return []
+        # The letters stay queued until the retry has finished, so an error or crash loses none.
+        with self.dead_letters.take() as letters:
+            logger.info("Retrying %d dead-lettered documents", len(letters))
+            unembedded = [letter.document for letter in letters if letter.chunks is None]
+            stored_ids = self.index_documents(unembedded) if unembedded else []
+
+            stored, failed = self._index_with_retries(
+                [
+                    _PendingDocument(letter.document, [], letter.chunks, attempts=letter.attempts)
+                    for letter in letters
+                    if letter.chunks is not None
+                ],
+            )
+            self._store_document_vectors(stored)
+            if self.deduplicator is not None and stored:
+                plan = self.deduplicator.plan(
+                    [(chunk.id, chunk.doc_id or "", chunk.chunk, chunk.token_count or 0) for chunk in stored],
+                    replacing={chunk.doc_id for chunk in stored if chunk.doc_id is not None},
+                )
+                self._commit_deduplication(plan)
+            self._dead_letter(failed)
+        return stored_ids + [chunk.id for chunk in stored]
+
+    def replace_documents(self, documents: list[Document]) -> None:
+        """Swap the stored chunks of each document for a freshly embedded version.
+
+        Embedding happens before the old chunks are deleted, so the document is only
+        missing for the time between the two Meilisearch tasks.
+        """
+        vectorised_documents, plan = self._vectorise_documents(documents)
+        self.vectorstore.delete_documents([document.id for document in documents])
+        self.vectorstore.add_texts(vectorised_documents)
+        self._store_document_vectors(vectorised_documents)
+        self._commit_deduplication(plan)
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        self.vectorstore.delete_documents(document_ids)
+        if self.deduplicator is not None:
+            self._report_orphans(self.deduplicator.forget(document_ids))
+
+    def _store_document_vectors(self, chunks: list[VectorisedDocument]) -> None:
+        if self.uses_document_vectors and chunks:
+            self.vectorstore.add_document_vectors(document_vectors(chunks))
+
+    def build_document_vectors(self, batch_size: int = 1000) -> int:
+        """Derive document vectors from every stored chunk, e.g. after enabling hierarchical search.
 
-    def index_documents(self, documents: list[Document]) -> None:
-        """Index a document: create embeddings + store them."""
+        Returns the number of documents given a vector.
+        """
+        builder = DocumentVectorBuilder()
+        for chunks in self.vectorstore.iter_documents(batch_size):
+            builder.add(chunks)
+        vectors = builder.build()
+        for start in range(0, len(vectors), batch_size):
+            self.vectorstore.add_document_vectors(vectors[start : start + batch_size])
+        logger.info("Stored %d document vectors", len(vectors))
+        return len(vectors)
+
+    def _vectorise_documents(
+        self,
+        documents: list[Document],
+    ) -> tuple[list[VectorisedDocument], DeduplicationPlan | None]:
+        """Chunk and embed documents, skipping chunks the deduplicator has already seen.
+
+        Skipped chunks keep their position in the chunk numbering, so the ids of the
+        chunks that are stored don't depend on what was deduplicated.
+        """
+        chunked_documents = self.chunker.chunk_many([document.body for document in documents])
+        kept_chunks, plan = self._deduplicate(documents, chunked_documents)
+        pending = [_PendingDocument(document, chunks) for document, chunks in zip(documents, kept_chunks, strict=True)]
+        self._embed_pending(pending)
+        for item in pending:
+            if item.error is not None:
+                self._raise_indexing_error(item.error)
+        return [chunk for item in pending for chunk in item.vectorised or []], plan
+
+    def _index_with_retries(
+        self,
+        pending: list[_PendingDocument],
+    ) -> tuple[list[VectorisedDocument], list[_PendingDocument]]:
+        """Embed and store documents, retrying the failures; returns the chunks stored and the documents that failed."""
+        stored: list[VectorisedDocument] = []
+        for attempt in range(self.document_retries + 1):
+            if attempt:
+                delay = self.retry_delay_s * 2 ** (attempt - 1)
+                logger.warning(
+                    "Retrying %d documents in %.1fs: %s",
+                    len(pending),
+                    delay,
+                    [item.document.id for item in pending],
+                )
+                time.sleep(delay)
+            for item in pending:
+                item.attempts += 1
+            self._embed_pending([item for item in pending if item.vectorised is None])
+            stored.extend(self._store_pending([item for item in pending if item.vectorised is not None]))
+            pending = [item for item in pending if item.error is not None]
+            if not pending:
+                break
+        return stored, pending
+
+    def _embed_pending(self, pending: list[_PendingDocument]) -> None:
+        """Embed each document's chunks, recording a failure on the document rather than raising it."""
+
+        def embed(item: _PendingDocument) -> None:
+            texts = [chunk.text for _, chunk, _ in item.chunks]
+            try:
+                vectors = self.embedder.embed_documents(texts) if texts else []
+                shadow_vectors = (
+                    self.shadow_embedder[1].embed_documents(texts) if self.shadow_embedder and texts else []
+                )
+            except Exception as e:  # noqa: BLE001
+                # Any embedder failure is recorded on its document, to be retried or dead-lettered.
+                item.error = e
+                return
+            item.error = None
+            item.vectorised = [
+                VectorisedDocument(
+                    id=f"{item.document.id}::{i}",
+                    vector=vector,
+                    chunk=chunk.text,
+                    url=item.document.url,
+                    token_count=chunk.token_count,
+                    doc_id=item.document.id,
+                    metadata=item.document.metadata,
+                    content_hash=chunk_hash,
+                )
+                for vector, (i, chunk, chunk_hash) in zip(vectors, item.chunks, strict=True)
+            ]
+            if self.shadow_embedder is not None:
+                for vectorised, vector in zip(item.vectorised, shadow_vectors, strict=True):
+                    vectorised.vectors[self.shadow_embedder[0]] = vector
+
+        self._map_documents(embed, pending)
+
+    def _store_pending(self, pending: list[_PendingDocument]) -> list[VectorisedDocument]:
+        """Store embedded documents; if the batch fails, store them one at a time to find the culprits."""
+        chunks = [chunk for item in pending for chunk in item.vectorised or []]
         try:
-            vectorized_documents: list[VectorisedDocument] = []
-            for document in documents:
-                chunked_text = chunk_paragraphs(document.body)
-                embeddings = self.embedder.embed_documents(chunked_text)
-
-                for i, (embedding, chunk) in enumerate(
-                    zip(embeddings, chunked_text, strict=True),
-                ):
-                    vectorized_documents.append(
-                        VectorisedDocument(
-                            id=f"{document.id}::{i}",
-                            vector=embedding,
-                            chunk=chunk,
-                            url=document.url,
-                        ),
-                    )
-            self.vectorstore.add_texts(vectorized_documents)
+            if chunks:
+                self.vectorstore.add_texts(chunks)
+        except Exception as e:  # noqa: BLE001
+            # Any store failure is narrowed down to its documents, which are retried or dead-lettered.
+            if len(pending) == 1:
+                pending[0].error = e
+                return []
+            logger.warning("Storing %d documents failed (%s); storing them one at a time", len(pending), e)
+            return [chunk for item in pending for chunk in self._store_pending([item])]
+        for item in pending:
+            item.error = None
+        return chunks
+
+    def _dead_letter(self, failed: list[_PendingDocument]) -> None:
+        if not failed:
+            return
+        if self.dead_letters is None:
+            assert failed[0].error is not None
+            self._raise_indexing_error(failed[0].error)
+        self.dead_letters.add(
+            [
+                DeadLetter(
+                    item.document,
+                    reason=f"{type(item.error).__name__}: {item.error}",
+                    chunks=item.vectorised,
+                    attempts=item.attempts,
+                )
+                for item in failed
+            ],
+        )
 
-        except LangChainException as e:
+    @staticmethod
+    def _raise_indexing_error(error: Exception) -> NoReturn:
+        if isinstance(error, LangChainException):
             error_message = "Failed to index documents. Check if the embedder is configured correctly."
-            raise EmbedderError(message=error_message) from e
+            raise EmbedderError(message=error_message) from error
+        raise error
 
-    def semantic_search(self, request: SearchRequestDataClass) -> dict[str, Any]:
-        embedded_query = self.embedder.embed_query(request.query)
-        return self.vectorstore.hybrid_search(query=request, vector=embedded_query)
+    def _deduplicate(
+        self,
+        documents: list[Document],
+        chunked_documents: list[list[Chunk]],
+    ) -> tuple[list[list[tuple[int, Chunk, str | None]]], DeduplicationPlan | None]:
+        """Return each document's chunks to embed as (position, chunk, content hash)."""
+        if self.deduplicator is None:
+            return [[(i, chunk, None) for i, chunk in enumerate(chunks)] for chunks in chunked_documents], None
+
+        plan = self.deduplicator.plan(
+            [
+                (f"{document.id}::{i}", document.id, chunk.text, chunk.token_count)
+                for document, chunks in zip(documents, chunked_documents, strict=True)
+                for i, chunk in enumerate(chunks)
+            ],
+            replacing={document.id for document in documents},
+        )
+        flags = iter(zip(plan.keep, plan.hashes, strict=True))
+        kept_chunks: list[list[tuple[int, Chunk, str | None]]] = []
+        for chunks in chunked_documents:
+            kept: list[tuple[int, Chunk, str | None]] = []
+            for i, chunk in enumerate(chunks):
+                keep, chunk_hash = next(flags)
+                if keep:
+                    kept.append((i, chunk, chunk_hash))
+            kept_chunks.append(kept)
+        return kept_chunks, plan
 
-    def conversational_search(self, request: SearchRequestDataClass) -> dict[str, Any]:
+    def _commit_deduplication(self, plan: DeduplicationPlan | None) -> None:
+        if self.deduplicator is not None and plan is not None:
+            self._report_orphans(self.deduplicator.commit(plan))
+
+    @staticmethod
+    def _report_orphans(orphaned: set[str]) -> None:
+        if orphaned:
+            logger.warning(
+                "Documents %s linked duplicate chunks to content that is no longer stored; re-index them.",
+                sorted(orphaned),
+            )
+
+    def _map_documents[T, R](self, func: Callable[[T], R], items: list[T]) -> list[R]:
+        """Apply ``func`` to each document, running up to ``embedding_concurrency`` calls at once."""
+        workers = min(self.embedding_concurrency, len(items))
+        if workers < 2:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as executor:
+            return list(executor.map(bind_workload(func), items))
+
+    def semantic_search(self, request: SearchRequestDataClass, deadline: Deadline | None = None) -> dict[str, Any]:
+        if deadline is None:
+            return self._coalesce("semantic", request, lambda: self._semantic_search(request))
+        return self._coalesce(
+            "semantic",
+            request,
+            lambda: self._within(deadline, lambda: self._semantic_search(request)),
+            deadline,
+        )
+
+    def conversational_search(
+        self,
+        request: SearchRequestDataClass,
+        deadline: Deadline | None = None,
+    ) -> dict[str, Any]:
+        if request.session_id is not None and self.sessions is not None:
+            # Session turns depend on the session's state, so they are never shared.
+            return self._session_search(request, request.session_id, self.sessions, deadline)
+        return self._coalesce(
+            "conversational",
+            request,
+            lambda: self._conversational_search(request, deadline),
+            deadline,
+        )
+
+    def _session_search(
+        self,
+        request: SearchRequestDataClass,
+        session_id: str,
+        sessions: SessionStore,
+        deadline: Deadline | None,
+    ) -> dict[str, Any]:
+        """Answer a conversation turn, reusing the hits of earlier turns where `SessionStore.route` allows."""
+        session = sessions.get(session_id)
+        with session.lock:
+            try:
+                vector = self.embedder.embed_query(request.query)
+            except Exception as e:
+                raise ConversationalSearchError from e
+            retrieval = sessions.route(session, request.query, vector, request.filter)
+            if retrieval == "full":
+                # The question is already embedded for routing, so retrieval searches with that vector.
+                response = self._conversational_search(request, deadline, query_vector=vector)
+                sessions.record(session, request.query, vector, response["sources"])
+                return {**response, "session_id": session_id, "retrieval": retrieval}
+
+            degraded: list[str] = []
+            if retrieval == "incremental":
+                follow_up = replace(request, query=f"{session.questions[-1]} {request.query}")
+                follow_up_vector = session.follow_up_vector(vector)
+                try:
+                    results = (
+                        self._retrieve(follow_up, follow_up_vector)
+                        if deadline is None
+                        else self._within(deadline, lambda: self._retrieve(follow_up, follow_up_vector))
+                    )
+                except (InvalidFilterError, DeadlineExceededError):
+                    raise
+                except Exception as e:
+                    raise ConversationalSearchError from e
+                hits = results["hits"]
+            else:
+                hits = []
+            summary_query = session.contextual_query(request.query)
+            sessions.record(session, request.query, vector, hits)
+            sources = session.context(request.limit)
+            summary = self._summarise(summary_query, {"hits": sources}, deadline, degraded)
+        return {
+            "summary": summary,
+            "sources": sources,
+            "degraded": bool(degraded),
+            "degraded_stages": degraded,
+            "session_id": session_id,
+            "retrieval": retrieval,
+        }
+
+    def _within[T](self, deadline: Deadline, func: Callable[[], T], limit_s: float | None = None) -> T:
         try:
-            keywords = self.llm.extract_keywords(request.query)
+            return call_with_timeout(func, deadline.budget(limit_s), self.stage_executor)
+        except TimeoutError as e:
+            raise DeadlineExceededError from e
+
+    def _coalesce(
+        self,
+        operation: str,
+        request: SearchRequestDataClass,
+        func: Callable[[], dict[str, Any]],
+        deadline: Deadline | None = None,
+    ) -> dict[str, Any]:
+        """Share one in-flight computation between identical concurrent requests."""
+        if self.coalescer is None:
+            return func()
+        # Vector store handles are shared per index, so the handle identifies the index searched.
+        # Followers get the leader's answer, degraded stages and all, so only requests with the
+        # same time budget are shared.
+        budget = deadline.timeout_s if deadline is not None else None
+        key: Hashable = (operation, id(self.vectorstore), budget, *self._request_key(request))
+        return self.coalescer.do(key, func)
+
+    @staticmethod
+    def _request_key(request: SearchRequestDataClass) -> tuple[Hashable, ...]:
+        filter_key = json.dumps(request.filter) if request.filter else None
+        return (
+            " ".join(request.query.casefold().split()),
+            request.limit,
+            filter_key,
+            request.hierarchical,
+            request.session_id,
+        )
+
+    def _semantic_search(self, request: SearchRequestDataClass) -> dict[str, Any]:
+        embedded_query = self.embedder.embed_query(request.query)
+        return self._retrieve(request, embedded_query)
+
+    def _retrieve(self, request: SearchRequestDataClass, vector: list[float]) -> dict[str, Any]:
+        """Search chunks directly, or through document pre-selection when it is enabled."""
+        if self.uses_document_vectors and request.hierarchical is not False:
+            return self.vectorstore.hierarchical_search(request, vector, self.document_candidates)
+        return self.vectorstore.hybrid_search(query=request, vector=vector)
 
-            logger.info("Keywords: %s", keywords)
+    def _conversational_search(
+        self,
+        request: SearchRequestDataClass,
+        deadline: Deadline | None = None,
+        query_vector: list[float] | None = None,
+    ) -> dict[str, Any]:
+        """Extract keywords, retrieve sources and summarise them within ``deadline``.
 
-            embedded_query = self.embedder.embed_query(keywords)
+        Only retrieval is essential. Keyword extraction falls back to the raw query when
+        it fails or overruns its budget, and the summary is dropped when it fails or the
+        deadline leaves no room for it; either way the response is marked ``degraded``.
+        A ``query_vector`` already computed for the question is searched with instead of
+        embedding the keywords.
+        """
+        degraded: list[str] = []
+        try:
+            keywords = self._extract_keywords(request.query, deadline, degraded)
 
             cleaned_query = SearchRequestDataClass(
                 query=keywords,
                 limit=request.limit,
-            )
-            results = self.vectorstore.hybrid_search(
-                query=cleaned_query,
-                vector=embedded_query,
+                filter=request.filter,
+                hierarchical=request.hierarchical,
             )
 
-            summary = self.llm.summarise(request.query, results)
+            def retrieve() -> dict[str, Any]:
+                vector = query_vector if query_vector is not None else self.embedder.embed_query(keywords)
+                return self._retrieve(cleaned_query, vector)
 
-            return {"summary": summary, "sources": results["hits"]}
+            results = retrieve() if deadline is None else self._within(deadline, retrieve)
+        except (InvalidFilterError, DeadlineExceededError):
+            raise
         except Exception as e:
             raise ConversationalSearchError from e
 
+        summary = self._summarise(request.query, results, deadline, degraded)
+        return {
+            "summary": summary,
+            "sources": results["hits"],
+            "degraded": bool(degraded),
+            "degraded_stages": degraded,
+        }
+
+    def _extract_keywords(self, query: str, deadline: Deadline | None, degraded: list[str]) -> str:
+        try:
+            if deadline is None:
+                keywords = self.llm.extract_keywords(query)
+            else:
+                keywords = self._within(
+                    deadline,
+                    lambda: self.llm.extract_keywords(query),
+                    self.stage_budgets.keyword_extraction_s,
+                )
+        except DeadlineExceededError:
+            logger.warning("Keyword extraction ran out of time; searching with the raw query")
+            degraded.append("keyword_extraction")
+            return query
+        except Exception:
+            # Keywords only refine the query, so any failure falls back to the raw query.
+            logger.exception("Keyword extraction failed; searching with the raw query")
+            degraded.append("keyword_extraction")
+            return query
+        logger.info("Keywords: %s", keywords)
+        return keywords
+
+    def _summarise(
+        self,
+        query: str,
+        results: dict[str, Any],
+        deadline: Deadline | None,
+        degraded: list[str],
+    ) -> str | None:
+        try:
+            if deadline is None:
+                return self.llm.summarise(query, results)
+            if deadline.remaining() < self.stage_budgets.min_summary_s:
+                logger.warning("No time left to summarise; returning sources only")
+                degraded.append("summary")
+                return None
+            return self._within(deadline, lambda: self.llm.summarise(query, results))
+        except DeadlineExceededError:
+            logger.warning("Summary ran out of time; returning sources only")
+        except Exception:
+            logger.exception("Summary failed; returning sources only")
+        degraded.append("summary")
+        return None
+
     def similar_search(self, request: SimilarityRequestDataClass) -> dict[str, Any]:
         return self.vectorstore.similarity_search(
             request,
         )
+
+    def similar_search_batch(self, requests: list[SimilarityRequestDataClass]) -> list[dict[str, Any]]:
+        return self.vectorstore.similarity_search_batch(requests)
@@ -0,0 +1,162 @@
+import json
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import numpy as np
+
+from src.domain.dataclasses.dataclasses import Filter
+
+type Retrieval = Literal["reused", "incremental", "full"]
+
+# Words that point back at something said earlier, e.g. "what did he say next?".
+_REFERRING_WORDS = frozenset(
+    {"he", "she", "it", "they", "him", "her", "them", "his", "hers", "its", "their", "this", "that", "these", "those"},
+)
+_WORD = re.compile(r"[a-z']+")
+
+
+def _unit(vector: list[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+@dataclass
+class ConversationSession:
+    """The questions of one conversation, their query embeddings and the hits retrieved for them."""
+
+    session_id: str
+    filter_key: Hashable = None
+    questions: list[str] = field(default_factory=list)
+    vectors: list[np.ndarray] = field(default_factory=list)
+    hits: OrderedDict[str, dict[str, Any]] = field(default_factory=OrderedDict)
+    last_used: float = field(default_factory=time.monotonic)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def similarity(self, vector: list[float]) -> float:
+        """Cosine similarity of ``vector`` to the closest earlier question."""
+        if not self.vectors:
+            return 0.0
+        query = _unit(vector)
+        return max(float(query @ previous) for previous in self.vectors)
+
+    def follow_up_vector(self, vector: list[float]) -> list[float]:
+        """Blend the follow-up with the last question, so "what did he say next?" keeps its subject."""
+        return ((_unit(vector) + self.vectors[-1]) / 2).tolist()
+
+    def contextual_query(self, query: str) -> str:
+        return f"Previous question: {self.questions[-1]}\nFollow-up question: {query}" if self.questions else query
+
+    def context(self, limit: int) -> list[dict[str, Any]]:
+        """The most recently retrieved hits, newest first."""
+        return list(reversed(self.hits.values()))[:limit]
+
+    def record(
+        self,
+        query: str,
+        vector: list[float],
+        hits: list[dict[str, Any]],
+        max_turns: int,
+        max_hits: int,
+    ) -> None:
+        self.questions = [*self.questions, query][-max_turns:]
+        self.vectors = [*self.vectors, _unit(vector)][-max_turns:]
+        # Re-inserting moves a hit to the end, so the freshest hits survive trimming.
+        for hit in reversed(hits):
+            self.hits.pop(str(hit.get("id")), None)
+            self.hits[str(hit.get("id"))] = hit
+        while len(self.hits) > max_hits:
+            self.hits.popitem(last=False)
+
+    def reset(self, filter_key: Hashable) -> None:
+        self.filter_key = filter_key
+        self.questions, self.vectors = [], []
+        self.hits.clear()
+
+
+class SessionStore:
+    """A bounded, TTL-evicted store of conversation sessions.
+
+    `route` decides how much of a follow-up question can be answered from the session:
+
+    * ``reused``: the question is close to an earlier one, so the cached hits are
+      summarised again without a search;
+    * ``incremental``: the question follows on from the last one (it is similar, or
+      refers back with a pronoun), so one search with a blended query vector is merged
+      into the cached hits;
+    * ``full``: anything else runs the whole pipeline and starts the context afresh.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl_s: float = 1800.0,
+        max_turns: int = 10,
+        max_hits: int = 50,
+        reuse_similarity: float = 0.9,
+        follow_up_similarity: float = 0.6,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self.max_turns = max_turns
+        self.max_hits = max_hits
+        self.reuse_similarity = reuse_similarity
+        self.follow_up_similarity = follow_up_similarity
+        self._sessions: OrderedDict[str, ConversationSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self.retrievals: Counter[str] = Counter()
+
+    def get(self, session_id: str) -> ConversationSession:
+        """Return the live session with this id, starting a new one if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = ConversationSession(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            session.last_used = now
+            return session
+
+    def _evict_expired(self, now: float) -> None:
+        # Sessions are kept in last-used order, so expired ones are at the front.
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used < self.ttl_s:
+                return
+            self._sessions.popitem(last=False)
+
+    def route(self, session: ConversationSession, query: str, vector: list[float], filter_: Filter | None) -> Retrieval:
+        filter_key = json.dumps(filter_) if filter_ else None
+        if not session.hits or filter_key != session.filter_key:
+            retrieval: Retrieval = "full"
+        else:
+            similarity = session.similarity(vector)
+            if similarity >= self.reuse_similarity:
+                retrieval = "reused"
+            elif similarity >= self.follow_up_similarity or _REFERRING_WORDS & set(_WORD.findall(query.casefold())):
+                retrieval = "incremental"
+            else:
+                retrieval = "full"
+        if retrieval == "full":
+            session.reset(filter_key)
+        with self._lock:
+            self.retrievals[retrieval] += 1
+        return retrieval
+
+    def record(self, session: ConversationSession, query: str, vector: list[float], hits: list[dict[str, Any]]) -> None:
+        session.record(query, vector, hits, self.max_turns, self.max_hits)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                **{retrieval: self.retrievals[retrieval] for retrieval in ("reused", "incremental", "full")},
+            }
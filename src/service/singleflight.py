@@ -0,0 +1,66 @@
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; everyone who arrives while it is in
+    flight waits for, and receives, the same result (or exception). Results are shared
+    objects and must not be mutated by callers.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, Future[Any]] = {}
+        self._lock = threading.Lock()
+        self.executed_count = 0
+        self.coalesced_count = 0
+
+    def do[T](self, key: Hashable, func: Callable[[], T]) -> T:
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        return self._lead(key, future, func)
+
+    def _join(self, key: Hashable) -> tuple[Future[Any], bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced_count += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.executed_count += 1
+            return future, True
+
+    def _lead[T](self, key: Hashable, future: Future[Any], func: Callable[[], T]) -> T:
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._forget(key)
+
+    def _forget(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self.executed_count,
+                "coalesced": self.coalesced_count,
+                "in_flight": len(self._calls),
+            }
+
+
+@lru_cache
+def get_search_coalescer() -> SingleFlight:
+    return SingleFlight()
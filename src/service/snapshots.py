@@ -0,0 +1,177 @@
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.domain.dataclasses.dataclasses import VectorisedDocument
+from src.exceptions.exceptions import SnapshotMismatchError
+from src.infrastructure.logger import setup_logger
+from src.infrastructure.vectorstores.base import VectorStoreABC
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = setup_logger(name="logger")
+
+SNAPSHOT_FORMAT_VERSION = "1"
+
+
+def _pyarrow() -> Any:
+    # pyarrow is only needed for snapshots, so it is an optional dependency.
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Vector snapshots need pyarrow: install the 'snapshots' extra.") from e
+    return pa
+
+
+def _schema(embedder_name: str | None) -> "pa.Schema":
+    pa = _pyarrow()
+    vector = pa.list_(pa.float32())
+    return pa.schema(
+        [
+            pa.field("id", pa.string(), nullable=False),
+            pa.field("chunk", pa.string(), nullable=False),
+            pa.field("url", pa.string()),
+            pa.field("token_count", pa.int32()),
+            pa.field("doc_id", pa.string()),
+            pa.field("content_hash", pa.string()),
+            # Metadata values vary in type from document to document, so they are kept as JSON.
+            pa.field("metadata", pa.string()),
+            pa.field("vector", vector, nullable=False),
+            pa.field("vectors", pa.map_(pa.string(), vector)),
+        ],
+        metadata={"format_version": SNAPSHOT_FORMAT_VERSION, "embedder": embedder_name or ""},
+    )
+
+
+def _to_batch(documents: list[VectorisedDocument], schema: "pa.Schema") -> "pa.RecordBatch":
+    pa = _pyarrow()
+    return pa.RecordBatch.from_pydict(
+        {
+            "id": [document.id for document in documents],
+            "chunk": [document.chunk for document in documents],
+            "url": [document.url for document in documents],
+            "token_count": [document.token_count for document in documents],
+            "doc_id": [document.doc_id for document in documents],
+            "content_hash": [document.content_hash for document in documents],
+            "metadata": [json.dumps(document.metadata) if document.metadata else None for document in documents],
+            "vector": [document.vector for document in documents],
+            "vectors": [list(document.vectors.items()) for document in documents],
+        },
+        schema=schema,
+    )
+
+
+def _from_batch(batch: "pa.RecordBatch") -> list[VectorisedDocument]:
+    columns = batch.to_pydict()
+    return [
+        VectorisedDocument(
+            vector=vector,
+            id=document_id,
+            chunk=chunk,
+            url=url,
+            token_count=token_count,
+            doc_id=doc_id,
+            metadata=json.loads(metadata) if metadata else {},
+            content_hash=content_hash,
+            vectors=dict(vectors or []),
+        )
+        for document_id, chunk, url, token_count, doc_id, content_hash, metadata, vector, vectors in zip(
+            columns["id"],
+            columns["chunk"],
+            columns["url"],
+            columns["token_count"],
+            columns["doc_id"],
+            columns["content_hash"],
+            columns["metadata"],
+            columns["vector"],
+            columns["vectors"],
+            strict=True,
+        )
+    ]
+
+
+def _is_parquet(path: Path) -> bool:
+    return path.suffix == ".parquet"
+
+
+def export_snapshot(
+    vectorstore: VectorStoreABC,
+    path: Path,
+    embedder_name: str | None = None,
+    batch_size: int = 1000,
+) -> int:
+    """Write every stored chunk and its vectors to ``path``, returning the number of chunks.
+
+    A ``.parquet`` path gets a compressed Parquet file; anything else an Arrow IPC file,
+    which `import_snapshot` memory-maps. Vectors are float32, as Meilisearch stores them,
+    so nothing is lost. The file is written next to ``path`` and renamed into place.
+    """
+    pa = _pyarrow()
+    schema = _schema(embedder_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_name(f"{path.name}.partial")
+    exported = 0
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        writer: Any = pq.ParquetWriter(staging, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(staging, schema)
+    try:
+        for documents in vectorstore.iter_documents(batch_size):
+            writer.write_batch(_to_batch(documents, schema))
+            exported += len(documents)
+            logger.info("Exported %d chunks to %s", exported, path)
+    finally:
+        writer.close()
+    staging.replace(path)
+    return exported
+
+
+def _read_batches(path: Path, batch_size: int) -> tuple["pa.Schema", Iterator["pa.RecordBatch"]]:
+    pa = _pyarrow()
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        return parquet.schema_arrow, parquet.iter_batches(batch_size=batch_size)
+
+    reader = pa.ipc.open_file(pa.memory_map(str(path)))
+
+    def batches() -> Iterator["pa.RecordBatch"]:
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for offset in range(0, batch.num_rows, batch_size):
+                yield batch.slice(offset, batch_size)
+
+    return reader.schema, batches()
+
+
+def import_snapshot(
+    vectorstore: VectorStoreABC,
+    path: Path,
+    embedder_name: str | None = None,
+    batch_size: int = 1000,
+) -> int:
+    """Store the chunks in the snapshot at ``path`` with their vectors, returning how many.
+
+    Chunks are read and written ``batch_size`` at a time through ``add_texts``, so a
+    restore never calls the embedder. Raises `SnapshotMismatchError` if the snapshot's
+    vectors came from a different embedder than ``embedder_name``.
+    """
+    schema, batches = _read_batches(path, batch_size)
+    metadata = {key.decode(): value.decode() for key, value in (schema.metadata or {}).items()}
+    snapshot_embedder = metadata.get("embedder")
+    if embedder_name and snapshot_embedder and snapshot_embedder != embedder_name:
+        raise SnapshotMismatchError(
+            message=f"The snapshot holds {snapshot_embedder} vectors, not {embedder_name} vectors.",
+        )
+    imported = 0
+    for batch in batches:
+        documents = _from_batch(batch)
+        vectorstore.add_texts(documents)
+        imported += len(documents)
+        logger.info("Imported %d chunks from %s", imported, path)
+    return imported
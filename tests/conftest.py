@@ -0,0 +1,13 @@
+import os
+
+# Required settings have no defaults; give the app enough to start without a .env file.
+for name, value in {
+    "MODEL_ID": "test-model",
+    "EMBEDDER_NAME": "test_embedder",
+    "MEILISEARCH_URL": "http://127.0.0.1:7700",
+    "MEILI_MASTER_KEY": "test-key",
+    "AWS_ACCESS_KEY_ID": "test-key-id",
+    "AWS_SECRET_ACCESS_KEY": "test-secret",
+    "REGION": "eu-west-2",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,59 @@
+import pytest
+
+from src.domain.chunk import (
+    ChunkingEngine,
+    close_chunking_engines,
+    count_tokens,
+    get_chunking_engine,
+    get_text_splitter,
+)
+
+paragraph = "The quick brown fox jumps over the lazy dog, again and again."
+
+
+def test_count_tokens() -> None:
+    assert count_tokens("Hello, world!") == 4
+
+
+def test_get_text_splitter_is_reused() -> None:
+    assert get_text_splitter(100, 10, "tokens") is get_text_splitter(100, 10, "tokens")
+    assert get_text_splitter(100, 10, "tokens") is not get_text_splitter(100, 10, "characters")
+
+
+def test_chunk_records_token_counts() -> None:
+    engine = ChunkingEngine(chunk_size=20, chunk_overlap=0, length_unit="tokens")
+    text = "\n\n".join([paragraph] * 5)
+
+    chunks = engine.chunk(text)
+
+    assert len(chunks) > 1
+    assert all(0 < chunk.token_count <= 20 for chunk in chunks)
+    assert all(chunk.token_count == count_tokens(chunk.text) for chunk in chunks)
+
+
+def test_chunk_many_parallel_matches_serial() -> None:
+    texts = ["\n\n".join([paragraph] * n) for n in range(1, 6)]
+    serial = ChunkingEngine(chunk_size=100, chunk_overlap=10)
+    parallel = ChunkingEngine(chunk_size=100, chunk_overlap=10, max_workers=2, parallel_threshold=0)
+
+    try:
+        assert parallel.chunk_many(texts) == serial.chunk_many(texts)
+    finally:
+        parallel.close()
+
+
+def test_close_chunking_engines_stops_their_worker_processes() -> None:
+    engine = get_chunking_engine(
+        chunk_size=100, chunk_overlap=10, length_unit="characters", max_workers=2, parallel_threshold=0
+    )
+    engine.chunk_many([paragraph, paragraph])
+    assert engine._executor is not None
+
+    close_chunking_engines()
+
+    assert engine._executor is None
+
+
+def test_overlap_must_be_smaller_than_chunk_size() -> None:
+    with pytest.raises(ValueError):
+        ChunkingEngine(chunk_size=10, chunk_overlap=10)
@@ -1,4 +1,6 @@
-from collections.abc import Mapping
+import json
+from collections.abc import Iterator, Mapping
+from types import SimpleNamespace
 from typing import (
     Any,
     NoReturn,
@@ -11,6 +13,8 @@ from langchain_core.language_models.fake_chat_models import FakeMessagesListChat
 from langchain_core.messages import (
     AIMessage,
 )
+from meilisearch.errors import MeilisearchApiError
+from requests import Response
 
 from src.domain.dataclasses.dataclasses import (
     SearchRequestDataClass,
@@ -18,13 +22,17 @@ from src.domain.dataclasses.dataclasses import (
     VectorisedDocument,
 )
 from src.exceptions.exceptions import (
+    DeletionError,
+    DocumentFetchError,
     KeywordExtractionError,
     SemanticSearchError,
     SimilarSearchError,
     SummarisationError,
+    VectorDatabaseError,
 )
 from src.infrastructure.llms.bedrock import LangchainLLM
 from src.infrastructure.vectorstores.base import VectorStoreABC
+from src.infrastructure.vectorstores.meilisearch import sanitise_identifier
 
 fake_results = {
     "hits": [
@@ -74,11 +82,23 @@ class FakeEmbedder(Embeddings):
 class FakeVectorStore(VectorStoreABC):
     def __init__(self) -> None:
         self.texts: list[VectorisedDocument] = []
+        self.document_vectors: list[VectorisedDocument] = []
         self.last_query = None
         self.last_vector = None
+        self.last_candidates: int | None = None
+        self.removed_embedders: list[str] = []
 
     def add_texts(self, documents: list[VectorisedDocument]) -> None:
-        self.texts.extend(documents)
+        positions = {text.id: i for i, text in enumerate(self.texts)}
+        for document in documents:
+            if document.id in positions:
+                self.texts[positions[document.id]] = document
+            else:
+                positions[document.id] = len(self.texts)
+                self.texts.append(document)
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        self.texts = [text for text in self.texts if text.doc_id not in document_ids]
 
     def hybrid_search(
         self,
@@ -89,12 +109,45 @@ class FakeVectorStore(VectorStoreABC):
         self.last_vector = vector
         return fake_results
 
+    @property
+    def supports_document_vectors(self) -> bool:
+        return True
+
+    def add_document_vectors(self, documents: list[VectorisedDocument]) -> None:
+        self.document_vectors.extend(documents)
+
+    def hierarchical_search(
+        self,
+        query: SearchRequestDataClass,
+        vector: list[float],
+        candidates: int,
+    ) -> dict[str, Any]:
+        self.last_candidates = candidates
+        return self.hybrid_search(query, vector)
+
+    def remove_embedder(self, embedder_name: str) -> None:
+        self.removed_embedders.append(embedder_name)
+        for text in self.texts:
+            text.vectors.pop(embedder_name, None)
+
     def similarity_search(
         self,
         request: SimilarityRequestDataClass,
     ) -> dict[str, Any]:
         return fake_results
 
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[list[VectorisedDocument]]:
+        for start in range(0, len(self.texts), batch_size):
+            yield self.texts[start : start + batch_size]
+
+    def get_documents_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        wanted = set(ids)
+        return [
+            {"id": sanitise_identifier(text.id), "chunk": text.chunk, "url": text.url, "doc_id": text.doc_id}
+            for text in self.texts
+            if sanitise_identifier(text.id) in wanted
+        ]
+
 
 class FailingEmbedder(Embeddings):
     def embed_documents(self, texts: list[str]) -> NoReturn:  # noqa: ARG002
@@ -108,6 +161,9 @@ class FailingVectorStore(VectorStoreABC):
     def add_texts(self, documents: list[VectorisedDocument]) -> NoReturn:
         raise Exception("add_texts failed")
 
+    def delete_documents(self, document_ids: list[str]) -> NoReturn:
+        raise DeletionError("delete_documents failed")
+
     def hybrid_search(
         self,
         query: SearchRequestDataClass,
@@ -121,6 +177,15 @@ class FailingVectorStore(VectorStoreABC):
     ) -> NoReturn:
         raise SimilarSearchError("similarity_search failed")
 
+    def remove_embedder(self, embedder_name: str) -> NoReturn:
+        raise VectorDatabaseError("remove_embedder failed")
+
+    def iter_documents(self, batch_size: int = 1000) -> NoReturn:
+        raise DocumentFetchError("iter_documents failed")
+
+    def get_documents_by_ids(self, ids: list[str]) -> NoReturn:
+        raise DocumentFetchError("get_documents_by_ids failed")
+
 
 class FakeFailingLangchainLLM(LangchainLLM):
     def __init__(self) -> None:
@@ -143,11 +208,73 @@ class FakeFailingLangchainLLM(LangchainLLM):
         raise SummarisationError("Keyword extraction failed")
 
 
+class FakeTaskLog:
+    """Meilisearch's task history: uids are global and outlive the indexes they name."""
+
+    def __init__(self) -> None:
+        self.tasks: list[SimpleNamespace] = []
+
+    def add(self, index_uid: str, status: str = "succeeded") -> SimpleNamespace:
+        task = SimpleNamespace(uid=len(self.tasks) + 1, index_uid=index_uid, status=status, error=None)
+        self.tasks.append(task)
+        return SimpleNamespace(task_uid=task.uid)
+
+    def get(self, uid: int) -> SimpleNamespace:
+        return self.tasks[uid - 1]
+
+    def get_tasks(self, parameters: Mapping[str, Any]) -> SimpleNamespace:
+        """Newest first, paged with ``from`` and ``limit`` like ``GET /tasks``."""
+        matching = [
+            task
+            for task in reversed(self.tasks)
+            if task.index_uid in parameters.get("indexUids", [task.index_uid])
+            and task.status in parameters.get("statuses", [task.status])
+        ]
+        if "from" in parameters:
+            matching = [task for task in matching if task.uid <= parameters["from"]]
+        limit = parameters.get("limit", 20)
+        page, rest = matching[:limit], matching[limit:]
+        return SimpleNamespace(total=len(matching), results=page, next_=rest[0].uid if rest else None)
+
+    def swap(self, first: str, second: str) -> None:
+        # Swapping indexes swaps their task histories too.
+        for task in self.tasks:
+            if task.index_uid in (first, second):
+                task.index_uid = second if task.index_uid == first else first
+
+
 class FakeMeiliIndex:
     """A fake MeiliSearch index for testing purposes."""
 
-    def __init__(self) -> None:
+    def __init__(self, uid: str = "documents", task_log: FakeTaskLog | None = None) -> None:
+        self.uid = uid
+        self.task_log = task_log or FakeTaskLog()
         self.documents = {}
+        self.settings_updates: list[dict[str, Any]] = []
+        self.deleted_filters: list[str] = []
+        self.search_params: list[Mapping[str, Any]] = []
+        self.batches: list[bytes] = []
+        self.pending_tasks: list[int] = []
+        self.unfinished_tasks: set[int] = set()
+        # Batches holding one of these ids fail their task, like documents Meilisearch rejects.
+        self.rejected_ids: set[str] = set()
+        # Errors the next batch tasks fail with, one per task.
+        self.task_errors: list[dict[str, Any]] = []
+
+    def _task(self) -> SimpleNamespace:
+        return self.task_log.add(self.uid)
+
+    def fail_task(self) -> None:
+        self.task_log.add(self.uid, "failed")
+
+    def get_task(self, uid: int) -> SimpleNamespace:
+        if uid in self.unfinished_tasks:
+            return SimpleNamespace(uid=uid, status="processing", error=None)
+        return self.task_log.get(uid)
+
+    def update_settings(self, body: dict[str, Any]) -> SimpleNamespace:
+        self.settings_updates.append(body)
+        return self._task()
 
     def add_documents(
         self,
@@ -159,16 +286,110 @@ class FakeMeiliIndex:
                 raise ValueError("Document must have an 'id' field.")
             self.documents[doc_id] = doc
 
+    def add_documents_ndjson(self, str_documents: bytes) -> SimpleNamespace:
+        self.batches.append(str_documents)
+        documents = [json.loads(line) for line in str_documents.splitlines()]
+        if self.task_errors:
+            return self._failed_task(self.task_errors.pop(0))
+        if rejected := self.rejected_ids & {document["id"] for document in documents}:
+            return self._failed_task({"type": "invalid_request", "message": f"invalid documents {sorted(rejected)}"})
+        self.add_documents(documents)
+        return self._task()
+
+    def _failed_task(self, error: dict[str, Any]) -> SimpleNamespace:
+        task_info = self.task_log.add(self.uid, "failed")
+        self.task_log.get(task_info.task_uid).error = error
+        return task_info
+
+    def get_tasks(self, parameters: Mapping[str, Any] | None = None) -> SimpleNamespace:
+        if "failed" in (parameters or {}).get("statuses", []):
+            return self.task_log.get_tasks({**(parameters or {}), "indexUids": [self.uid]})
+        pending = self.pending_tasks.pop(0) if self.pending_tasks else 0
+        return SimpleNamespace(total=pending, results=[])
+
+    def get_stats(self) -> SimpleNamespace:
+        return SimpleNamespace(number_of_documents=len(self.documents))
+
     def get_document(self, doc_id: str) -> dict[str, Any] | None:
         return self.documents.get(doc_id)
 
+    def get_documents(self, parameters: Mapping[str, Any]) -> SimpleNamespace:
+        documents = list(self.documents.values())
+        if "ids" in parameters:
+            documents = [doc for doc in documents if doc["id"] in parameters["ids"]]
+        offset = parameters.get("offset", 0)
+        page = documents[offset : offset + parameters.get("limit", 20)]
+        results = []
+        for doc in page:
+            fields = {key: value for key, value in doc.items() if key != "_vectors"}
+            if parameters.get("retrieveVectors"):
+                # Meilisearch returns stored vectors wrapped like this.
+                fields["_vectors"] = {
+                    name: {"embeddings": [vector], "regenerate": False} for name, vector in doc["_vectors"].items()
+                }
+            results.append(SimpleNamespace(**fields))
+        return SimpleNamespace(results=results)
+
+    def delete_documents(self, filter: str) -> SimpleNamespace:
+        self.deleted_filters.append(filter)
+        return self._task()
+
     def search(
         self,
         query: SearchRequestDataClass,
         opt_params: Mapping[str, Any] | None = None,
     ) -> dict[str, Any]:
+        self.search_params.append(opt_params or {})
         return fake_results
 
+    def get_similar_documents(self, parameters: Mapping[str, Any]) -> dict[str, Any]:
+        self.search_params.append(parameters)
+        return {**fake_results, "id": parameters["id"]}
+
+
+class FakeTaskHandler:
+    http = None
+
+
+class FakeMeiliClient:
+    """A fake MeiliSearch client that keeps its indexes in memory."""
+
+    def __init__(self) -> None:
+        self.indexes: dict[str, FakeMeiliIndex] = {}
+        self.task_log = FakeTaskLog()
+        self.http = None
+
+    def get_raw_index(self, uid: str) -> dict[str, Any]:
+        if uid not in self.indexes:
+            response = Response()
+            response.status_code = 404
+            raise MeilisearchApiError("index not found", response)
+        return {"uid": uid}
+
+    def create_index(self, uid: str, options: Mapping[str, Any] | None = None) -> SimpleNamespace:
+        self.indexes[uid] = FakeMeiliIndex(uid, self.task_log)
+        return self.task_log.add(uid)
+
+    def delete_index(self, uid: str) -> SimpleNamespace:
+        # Like Meilisearch, deleting a missing index enqueues a task that fails.
+        return self.task_log.add(uid, "succeeded" if self.indexes.pop(uid, None) else "failed")
+
+    def swap_indexes(self, parameters: list[Mapping[str, list[str]]]) -> SimpleNamespace:
+        # Handles keep their index object, so swap what the objects hold rather than the objects.
+        for swap in parameters:
+            first, second = (self.indexes[uid] for uid in swap["indexes"])
+            first.documents, second.documents = second.documents, first.documents
+            self.task_log.swap(first.uid, second.uid)
+        return self.task_log.add(parameters[0]["indexes"][0])
+
+    def wait_for_task(self, uid: int, timeout_in_ms: int = 5000) -> SimpleNamespace:
+        return self.task_log.get(uid)
+
+    def index(self, uid: str) -> FakeMeiliIndex:
+        index = self.indexes.setdefault(uid, FakeMeiliIndex(uid, self.task_log))
+        index.task_handler = FakeTaskHandler()  # type: ignore
+        return index
+
 
 class FakeLangchainLLM(LangchainLLM):
     def __init__(self) -> None:
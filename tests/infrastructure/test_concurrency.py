@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from langchain_core.exceptions import LangChainException
+
+from src.infrastructure.llms.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    AdaptiveEmbeddings,
+    is_throttling_error,
+)
+from tests.fakes import FakeEmbedder
+
+
+def throttling_error() -> ClientError:
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+
+
+class ThrottlingEmbedder(FakeEmbedder):
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.calls = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise throttling_error()
+        return super().embed_documents(texts)
+
+
+def test_is_throttling_error_follows_cause() -> None:
+    wrapped = ValueError("wrapped")
+    wrapped.__cause__ = throttling_error()
+
+    assert is_throttling_error(wrapped)
+    assert not is_throttling_error(ValueError("other"))
+
+
+def test_limit_grows_while_latency_is_healthy() -> None:
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+
+    for _ in range(20):
+        limiter.on_success(latency_s=0.01)
+
+    assert limiter.limit == 4
+
+
+def test_limit_backs_off_on_throttling_and_slow_calls() -> None:
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=8, latency_target_s=1.0, decrease_cooldown_s=0)
+
+    limiter.on_throttle()
+    assert limiter.limit == 4
+
+    limiter.on_success(latency_s=2.0)
+    assert limiter.limit == 2
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.stats()["slow_calls"] == 1
+
+
+def test_burst_of_throttles_only_decreases_once() -> None:
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=8, decrease_cooldown_s=60)
+
+    for _ in range(5):
+        limiter.on_throttle()
+
+    assert limiter.limit == 4
+
+
+def test_acquire_caps_in_flight_calls() -> None:
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    peak = 0
+    lock = threading.Lock()
+
+    def work() -> None:
+        nonlocal peak
+        with limiter.acquire():
+            with lock:
+                peak = max(peak, limiter.stats()["in_flight"])
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+
+
+def test_throttled_calls_are_retried() -> None:
+    embedder = ThrottlingEmbedder(failures=2)
+    limiter = AdaptiveConcurrencyLimiter(decrease_cooldown_s=0)
+    adaptive = AdaptiveEmbeddings(embedder, limiter, base_delay_s=0)
+
+    assert adaptive.embed_documents(["a", "b"]) == [[0.0] * 3, [1.0] * 3]
+    assert embedder.calls == 3
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_gives_up_after_max_retries() -> None:
+    adaptive = AdaptiveEmbeddings(
+        ThrottlingEmbedder(failures=10),
+        AdaptiveConcurrencyLimiter(),
+        max_retries=2,
+        base_delay_s=0,
+    )
+
+    with pytest.raises(LangChainException):
+        adaptive.embed_documents(["a"])
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.infrastructure.llms.bedrock import LangchainLLM
+from src.infrastructure.llms.hedging import Hedger, LatencyTracker
+
+
+def _sleep_then(delay_s: float, value: str):
+    def call() -> str:
+        time.sleep(delay_s)
+        return value
+
+    return call
+
+
+def test_latency_tracker_percentile() -> None:
+    tracker = LatencyTracker(window=100)
+    for latency in range(1, 101):
+        tracker.record(latency / 100)
+
+    assert tracker.percentile(0.95) == pytest.approx(0.96)
+    assert LatencyTracker().percentile(0.95) is None
+
+
+def test_fast_primary_is_not_hedged() -> None:
+    hedger = Hedger(min_delay_s=0.1, default_delay_s=0.1)
+
+    assert hedger.run("op", _sleep_then(0, "primary"), _sleep_then(0, "hedge")) == "primary"
+    assert hedger.hedges_fired == 0
+
+
+def test_slow_primary_loses_to_hedge() -> None:
+    hedger = Hedger(min_delay_s=0.05, default_delay_s=0.05)
+
+    start = time.monotonic()
+    result = hedger.run("op", _sleep_then(1.0, "primary"), _sleep_then(0, "hedge"))
+
+    assert result == "hedge"
+    assert time.monotonic() - start < 0.5
+    assert (hedger.hedges_fired, hedger.hedges_won) == (1, 1)
+
+
+def test_failed_hedge_falls_back_to_primary() -> None:
+    hedger = Hedger(min_delay_s=0.05, default_delay_s=0.05)
+
+    def failing() -> str:
+        raise RuntimeError("hedge failed")
+
+    assert hedger.run("op", _sleep_then(0.2, "primary"), failing) == "primary"
+    assert hedger.hedges_won == 0
+
+
+def test_budget_caps_hedges() -> None:
+    hedger = Hedger(min_delay_s=0.01, default_delay_s=0.01, budget_ratio=0.0)
+
+    for _ in range(3):
+        hedger.run("op", _sleep_then(0.05, "primary"), _sleep_then(0, "hedge"))
+
+    assert hedger.hedges_fired == 1
+    assert hedger.hedges_denied == 2
+
+
+def test_delay_follows_observed_percentile() -> None:
+    hedger = Hedger(percentile=0.5, min_delay_s=0.0, default_delay_s=5.0, min_samples=3)
+    for _ in range(3):
+        hedger.run("op", _sleep_then(0.02, "primary"), _sleep_then(0, "hedge"))
+
+    assert 0.02 <= hedger.delay_for("op") < 0.2
+    assert hedger.delay_for("other") == 5.0
+
+
+def test_langchain_llm_hedges_to_fast_model() -> None:
+    release = threading.Event()
+
+    class StuckModel(FakeListChatModel):
+        def _call(self, *args, **kwargs) -> str:  # type: ignore[no-untyped-def]
+            release.wait(timeout=2)
+            return "slow"
+
+    llm = LangchainLLM(
+        chat_model=StuckModel(responses=["slow"]),
+        hedge_model=FakeListChatModel(responses=["fast keywords"]),
+        hedger=Hedger(min_delay_s=0.05, default_delay_s=0.05),
+    )
+
+    try:
+        assert llm.extract_keywords("query") == "fast keywords"
+    finally:
+        release.set()
@@ -1,10 +1,22 @@
+import json
+from typing import Any, NoReturn
+
 import pytest
+from meilisearch.errors import MeilisearchApiError
+from requests import Response
 
 from src.domain.dataclasses.dataclasses import (
     SearchRequestDataClass,
+    SimilarityRequestDataClass,
     VectorisedDocument,
 )
-from src.infrastructure.vectorstores.meilisearch import MeiliVectorStore
+from src.exceptions.exceptions import IndexingError, InvalidFilterError, SemanticSearchError
+from src.infrastructure.vectorstores.meilisearch import (
+    MeiliVectorStore,
+    WriteOptions,
+    batch_by_size,
+    index_settings,
+)
 from tests.fakes import FakeMeiliIndex, fake_results
 
 
@@ -23,6 +35,9 @@ def test_add_texts(service: MeiliVectorStore) -> None:
         url="http://localhost:8000/docs",
         chunk="a chunk of text",
         vector=vector_data,
+        token_count=4,
+        doc_id="parent",
+        metadata={"site": "bbc", "year": 2005},
     )
 
     expected = {
@@ -30,6 +45,10 @@ def test_add_texts(service: MeiliVectorStore) -> None:
         "url": document.url,
         "chunk": document.chunk,
         "_vectors": {service.embedder_name: document.vector},
+        "token_count": document.token_count,
+        "doc_id": "parent",
+        "metadata": {"site": "bbc", "year": 2005},
+        "content_hash": None,
     }
 
     service.add_texts([document])
@@ -46,3 +65,276 @@ def test_hybrid_search(service: MeiliVectorStore) -> None:
         vector=[0.0, 0.0, 0.0],
     )
     assert result == fake_results
+
+
+def test_delete_documents_uses_one_filter(service: MeiliVectorStore) -> None:
+    service.delete_documents(["1", 'quote"d', "back\\slash"])
+
+    assert service.index.deleted_filters == [  # type: ignore
+        'doc_id IN ["1", "quote\\"d", "back\\\\slash"]',
+    ]
+
+
+def _api_error(code: str, status_code: int = 400) -> MeilisearchApiError:
+    response = Response()
+    response.status_code = status_code
+    response._content = json.dumps({"message": "bad request", "code": code}).encode()
+    return MeilisearchApiError("bad request", response)
+
+
+def test_metadata_is_filterable() -> None:
+    assert "metadata" in index_settings("test_embedder")["filterableAttributes"]
+
+
+def test_extra_embedders_are_registered() -> None:
+    embedders = index_settings("v1", 1024, extra_embedders=(("v2", 256),))["embedders"]
+
+    assert embedders["v1"]["dimensions"] == 1024
+    assert embedders["v2"] == {"source": "userProvided", "dimensions": 256}
+
+
+def test_vectors_from_other_embedders_round_trip(service: MeiliVectorStore) -> None:
+    service.add_texts([VectorisedDocument(id="1", vector=[1.0], chunk="text", vectors={"v2": [2.0, 2.0]})])
+
+    assert service.index.get_document("1")["_vectors"] == {"test_embedder": [1.0], "v2": [2.0, 2.0]}  # type: ignore
+    [[document]] = service.iter_documents()
+    assert document.vector == [1.0]
+    assert document.vectors == {"v2": [2.0, 2.0]}
+
+
+def test_remove_embedder(service: MeiliVectorStore) -> None:
+    service.remove_embedder("v1")
+
+    assert service.index.settings_updates == [{"embedders": {"v1": None}}]  # type: ignore
+
+
+def test_filters_are_passed_through(service: MeiliVectorStore) -> None:
+    service.hybrid_search(
+        query=SearchRequestDataClass(query="q", limit=5, filter='metadata.site = "bbc"'),
+        vector=[0.0],
+    )
+    service.similarity_search(SimilarityRequestDataClass(id="1", limit=5, filter=["metadata.year > 2004"]))
+    service.hybrid_search(query=SearchRequestDataClass(query="q", limit=5), vector=[0.0])
+
+    params = service.index.search_params  # type: ignore
+    assert params[0]["filter"] == 'metadata.site = "bbc"'
+    assert params[1]["filter"] == ["metadata.year > 2004"]
+    assert "filter" not in params[2]
+
+
+@pytest.mark.parametrize(
+    ("code", "expected"),
+    [("invalid_search_filter", InvalidFilterError), ("internal", SemanticSearchError)],
+)
+def test_rejected_filter_is_a_client_error(
+    service: MeiliVectorStore,
+    monkeypatch: pytest.MonkeyPatch,
+    code: str,
+    expected: type[Exception],
+) -> None:
+    def reject(*args: Any, **kwargs: Any) -> NoReturn:
+        raise _api_error(code)
+
+    monkeypatch.setattr(service.index, "search", reject)
+
+    with pytest.raises(expected):
+        service.hybrid_search(query=SearchRequestDataClass(query="q", limit=5, filter="nope"), vector=[0.0])
+
+
+def _chunks(count: int) -> list[VectorisedDocument]:
+    return [VectorisedDocument(vector=[0.5] * 8, id=f"doc::{i}", chunk=f"chunk {i}") for i in range(count)]
+
+
+def _store(**options: Any) -> MeiliVectorStore:
+    options = {"retry_delay_s": 0.0, "queue_poll_s": 0.0, **options}
+    return MeiliVectorStore(
+        index=FakeMeiliIndex(),  # type: ignore
+        embedder_name="test_embedder",
+        write_options=WriteOptions(**options),
+    )
+
+
+def test_batch_by_size_bounds_each_batch() -> None:
+    lines = [b"x" * 30 for _ in range(10)] + [b"y" * 500]
+
+    batches = batch_by_size(lines, max_bytes=100)
+
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1, 1]
+    assert all(len(b"\n".join(batch)) <= 100 for batch in batches[:-1])
+    assert [line for batch in batches for line in batch] == lines
+
+
+def test_add_texts_splits_writes_by_payload_size() -> None:
+    store = _store(max_batch_bytes=1_000, max_parallel_batches=3)
+
+    store.add_texts(_chunks(40))
+
+    assert len(store.index.batches) > 1
+    assert all(len(batch) <= 1_000 for batch in store.index.batches)
+    assert len(store.index.documents) == 40
+
+
+def test_add_texts_waits_for_task_queue() -> None:
+    store = _store(max_pending_tasks=5)
+    store.index.pending_tasks = [9, 7, 5, 2]
+
+    store.add_texts(_chunks(3))
+
+    assert store.index.pending_tasks == []
+    assert len(store.index.documents) == 3
+
+
+def test_failed_batch_is_retried_alone(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = _store(max_batch_bytes=1_000, max_parallel_batches=1)
+    add = store.index.add_documents_ndjson
+    failures = iter([_api_error("internal", 503)])
+
+    def flaky(str_documents: bytes) -> Any:
+        if len(store.index.batches) == 1 and (error := next(failures, None)):
+            raise error
+        return add(str_documents)
+
+    monkeypatch.setattr(store.index, "add_documents_ndjson", flaky)
+
+    store.add_texts(_chunks(40))
+
+    assert len(store.index.documents) == 40
+
+
+def test_oversized_batch_is_split(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = _store(max_batch_bytes=10_000_000)
+    add = store.index.add_documents_ndjson
+
+    def limited(str_documents: bytes) -> Any:
+        if str_documents.count(b"\n") >= 10:
+            raise _api_error("payload_too_large", 413)
+        return add(str_documents)
+
+    monkeypatch.setattr(store.index, "add_documents_ndjson", limited)
+
+    store.add_texts(_chunks(40))
+
+    assert len(store.index.documents) == 40
+    assert all(batch.count(b"\n") < 10 for batch in store.index.batches)
+
+
+def test_both_halves_of_a_split_batch_are_written(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = _store(max_batch_bytes=10_000_000, max_retries=0)
+    add = store.index.add_documents_ndjson
+
+    def limited(str_documents: bytes) -> Any:
+        if str_documents.count(b"\n") >= 1:
+            raise _api_error("payload_too_large", 413)
+        if b'"doc__0"' in str_documents:
+            raise _api_error("invalid_document_id", 400)
+        return add(str_documents)
+
+    monkeypatch.setattr(store.index, "add_documents_ndjson", limited)
+
+    with pytest.raises(IndexingError, match="1 of 4 documents failed"):
+        store.add_texts(_chunks(4))
+
+    assert sorted(store.index.documents) == ["doc__1", "doc__2", "doc__3"]
+
+
+def test_batches_that_keep_failing_are_reported(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = _store(max_batch_bytes=1_000, max_parallel_batches=1, max_retries=2)
+    add = store.index.add_documents_ndjson
+    attempts: list[int] = []
+
+    def reject_first_batch(str_documents: bytes) -> Any:
+        if b'"doc__0"' in str_documents:
+            attempts.append(1)
+            raise _api_error("internal", 500)
+        return add(str_documents)
+
+    monkeypatch.setattr(store.index, "add_documents_ndjson", reject_first_batch)
+
+    with pytest.raises(IndexingError, match="of 40 documents failed"):
+        store.add_texts(_chunks(40))
+
+    assert len(attempts) == 3
+    assert 0 < len(store.index.documents) < 40
+
+
+def test_batch_whose_task_fails_is_retried() -> None:
+    store = _store(max_batch_bytes=1_000, max_parallel_batches=1)
+    store.index.task_errors = [{"type": "internal", "message": "index is locked"}]
+
+    store.add_texts(_chunks(40))
+
+    assert len(store.index.documents) == 40
+
+
+def test_batch_whose_task_rejects_documents_is_split_until_they_are_isolated() -> None:
+    store = _store(max_batch_bytes=10_000_000)
+    store.index.rejected_ids = {"doc__5"}
+
+    with pytest.raises(IndexingError, match="1 of 8 documents failed"):
+        store.add_texts(_chunks(8))
+
+    assert sorted(store.index.documents) == [f"doc__{i}" for i in range(8) if i != 5]
+
+
+@pytest.fixture
+def hierarchical() -> MeiliVectorStore:
+    return MeiliVectorStore(
+        index=FakeMeiliIndex("news"),  # type: ignore
+        embedder_name="test_embedder",
+        document_index=FakeMeiliIndex("news__docs"),  # type: ignore
+    )
+
+
+def test_hierarchical_search_ranks_chunks_of_preselected_documents(
+    hierarchical: MeiliVectorStore,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    assert hierarchical.document_store is not None
+    documents = hierarchical.document_store.index
+    monkeypatch.setattr(
+        documents,
+        "search",
+        lambda query, opt_params: {"hits": [{"id": "a", "doc_id": "a"}, {"id": "b", "doc_id": "b"}]},
+    )
+
+    hierarchical.hierarchical_search(
+        SearchRequestDataClass(query="q", limit=5, filter='metadata.site = "bbc"'),
+        vector=[0.0],
+        candidates=2,
+    )
+
+    params = hierarchical.index.search_params[-1]
+    assert params["filter"] == ['doc_id IN ["a", "b"]', 'metadata.site = "bbc"']
+    assert params["limit"] == 5
+
+
+def test_hierarchical_search_falls_back_to_flat(
+    hierarchical: MeiliVectorStore,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    assert hierarchical.document_store is not None
+    monkeypatch.setattr(hierarchical.document_store.index, "search", lambda query, opt_params: {"hits": []})
+
+    hierarchical.hierarchical_search(SearchRequestDataClass(query="q", limit=5), vector=[0.0], candidates=2)
+
+    assert "filter" not in hierarchical.index.search_params[-1]
+
+
+def test_document_vectors_are_stored_and_deleted_with_their_chunks(hierarchical: MeiliVectorStore) -> None:
+    assert hierarchical.document_store is not None
+    hierarchical.add_document_vectors([VectorisedDocument(id="a", vector=[1.0], chunk="lead", doc_id="a")])
+    hierarchical.delete_documents(["a"])
+
+    assert set(hierarchical.document_store.index.documents) == {"a"}
+    assert hierarchical.document_store.index.deleted_filters == ['doc_id IN ["a"]']
+    assert hierarchical.index.deleted_filters == ['doc_id IN ["a"]']
+
+
+def test_store_without_document_vectors_searches_flat_and_skips_them() -> None:
+    store = _store()
+    store.add_document_vectors([VectorisedDocument(id="a", vector=[1.0], chunk="lead", doc_id="a")])
+
+    store.hierarchical_search(SearchRequestDataClass(query="q", limit=5), vector=[0.0], candidates=2)
+
+    assert store.index.batches == []  # type: ignore
+    assert "filter" not in store.index.search_params[-1]  # type: ignore
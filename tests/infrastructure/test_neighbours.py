@@ -0,0 +1,121 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.domain.dataclasses.dataclasses import SimilarityRequestDataClass, VectorisedDocument
+from src.infrastructure.vectorstores.neighbours import NeighbourCachedVectorStore, NeighbourTable
+from tests.fakes import FakeVectorStore, fake_results
+
+
+def _documents(count: int, seed: int = 0, prefix: str = "") -> list[VectorisedDocument]:
+    vectors = np.random.default_rng(seed).normal(size=(count, 8))
+    return [
+        VectorisedDocument(vector=vector.tolist(), id=f"{prefix}{i}::0", chunk=f"chunk {i}", doc_id=f"{prefix}{i}")
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def _brute_force(documents: list[VectorisedDocument], position: int, k: int) -> list[str]:
+    vectors = np.asarray([document.vector for document in documents])
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = vectors @ vectors[position]
+    scores[position] = -np.inf
+    return [f"{i}__0" for i in np.argsort(-scores)[:k]]
+
+
+@pytest.fixture
+def table() -> NeighbourTable:
+    table = NeighbourTable(k=5, batch_size=16)
+    table.rebuild([_documents(60)])
+    return table
+
+
+def test_rebuild_matches_brute_force(table: NeighbourTable) -> None:
+    documents = _documents(60)
+
+    for position in (0, 17, 59):
+        neighbours = table.neighbours_of(f"{position}__0", 5)
+        assert [chunk_id for chunk_id, _ in neighbours or []] == _brute_force(documents, position, 5)
+
+
+def test_incremental_upsert_matches_rebuild(table: NeighbourTable) -> None:
+    extra = _documents(20, seed=1, prefix="x")
+    table.upsert(extra)
+
+    rebuilt = NeighbourTable(k=5)
+    rebuilt.rebuild([_documents(60), extra])
+
+    for chunk_id in ("0__0", "33__0", "x5__0"):
+        assert table.neighbours_of(chunk_id, 5) is not None
+        assert [c for c, _ in table.neighbours_of(chunk_id, 5) or []] == [
+            c for c, _ in rebuilt.neighbours_of(chunk_id, 5) or []
+        ]
+
+
+def test_lookups_do_not_wait_for_an_upsert_to_score() -> None:
+    answers: list[list[tuple[str, float]] | None] = []
+
+    class ReadDuringScoring(NeighbourTable):
+        def _merge_into_other_rows(self, changed: np.ndarray) -> None:
+            reader = threading.Thread(target=lambda: answers.append(self.neighbours_of("0__0", 5)))
+            reader.start()
+            reader.join(5)
+            super()._merge_into_other_rows(changed)
+
+    table = ReadDuringScoring(k=5, batch_size=16)
+    table.rebuild([_documents(60)])
+    table.upsert(_documents(5, seed=2, prefix="y"))
+
+    assert len(answers) == 1
+    assert answers[0] is not None
+
+
+def test_incomplete_table_does_not_answer() -> None:
+    table = NeighbourTable(k=5)
+    table.upsert(_documents(10))
+
+    assert table.neighbours_of("0__0", 5) is None
+
+
+def test_removed_documents_are_not_returned(table: NeighbourTable) -> None:
+    nearest = (table.neighbours_of("0__0", 5) or [])[0][0]
+
+    table.remove_documents([nearest.removesuffix("__0")])
+
+    assert nearest not in table
+    assert table.neighbours_of(nearest, 5) is None
+    assert nearest not in [chunk_id for chunk_id, _ in table.neighbours_of("0__0", 4) or []]
+
+
+def test_save_and_load_round_trip(tmp_path: Path) -> None:
+    table = NeighbourTable(k=5, path=tmp_path / "documents.npz")
+    table.rebuild([_documents(30)])
+    table.save()
+
+    loaded = NeighbourTable.load(tmp_path / "documents.npz")
+
+    assert loaded.neighbours_of("3__0", 5) == table.neighbours_of("3__0", 5)
+    assert loaded.vectors.dtype == np.float16
+
+
+def test_store_serves_batches_from_table_and_falls_back() -> None:
+    inner = FakeVectorStore()
+    inner.add_texts(_documents(30))
+    store = NeighbourCachedVectorStore(inner, NeighbourTable(k=5))
+    store.rebuild()
+
+    results = store.similarity_search_batch(
+        [
+            SimilarityRequestDataClass(id="1__0", limit=3),
+            SimilarityRequestDataClass(id="2__0", limit=3),
+            SimilarityRequestDataClass(id="unknown", limit=3),
+            SimilarityRequestDataClass(id="3__0", limit=3, filter="metadata.site = bbc"),
+        ],
+    )
+
+    assert [hit["id"] for hit in results[0]["hits"]] == _brute_force(_documents(30), 1, 3)
+    assert results[1]["hits"][0]["chunk"].startswith("chunk")
+    assert results[2] == fake_results
+    assert results[3] == fake_results
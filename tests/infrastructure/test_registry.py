@@ -0,0 +1,65 @@
+import pytest
+
+from src.exceptions.exceptions import IndexNotFoundError
+from src.infrastructure.vectorstores.registry import IndexRegistry
+from tests.fakes import FakeMeiliClient
+
+
+def test_get_returns_the_same_handle_for_hot_indexes() -> None:
+    client = FakeMeiliClient()
+    registry = IndexRegistry(client, embedder_name="test_embedder")  # type: ignore
+
+    first = registry.get("news", create=True)
+    second = registry.get("news")
+
+    assert first is second
+    assert first.index.uid == "news"
+    assert "news" in client.indexes
+
+
+def test_settings_are_applied_once_per_index() -> None:
+    client = FakeMeiliClient()
+    registry = IndexRegistry(client, embedder_name="test_embedder", max_handles=1)  # type: ignore
+
+    registry.get("news", create=True)
+    registry.get("sport", create=True)
+    registry.get("news")
+
+    assert len(client.indexes["news"].settings_updates) == 1
+    assert len(client.indexes["sport"].settings_updates) == 1
+
+
+def test_least_recently_used_handles_are_evicted() -> None:
+    registry = IndexRegistry(FakeMeiliClient(), embedder_name="test_embedder", max_handles=2)  # type: ignore
+
+    registry.get("a", create=True)
+    registry.get("b", create=True)
+    registry.get("a", create=True)
+    registry.get("c", create=True)
+
+    assert "a" in registry
+    assert "b" not in registry
+    assert "c" in registry
+
+
+def test_reads_do_not_create_indexes() -> None:
+    client = FakeMeiliClient()
+    registry = IndexRegistry(client, embedder_name="test_embedder", document_vectors=True)  # type: ignore
+
+    with pytest.raises(IndexNotFoundError):
+        registry.get("made_up")
+
+    assert client.indexes == {}
+    assert "made_up" not in registry
+
+
+def test_configured_indexes_are_bounded() -> None:
+    client = FakeMeiliClient()
+    registry = IndexRegistry(client, embedder_name="test_embedder", max_handles=1, max_configured=2)  # type: ignore
+
+    for name in ["a", "b", "c"]:
+        registry.get(name, create=True)
+    registry.get("a")
+
+    assert len(registry._configured) == 2
+    assert len(client.indexes["a"].settings_updates) == 2
@@ -0,0 +1,127 @@
+from collections.abc import Mapping
+from typing import Any
+
+import pytest
+
+from src.domain.dataclasses.dataclasses import SearchRequestDataClass, VectorisedDocument
+from src.exceptions.exceptions import InvalidFilterError
+from src.infrastructure.vectorstores.meilisearch import MeiliVectorStore
+from src.infrastructure.vectorstores.replicas import Replica, ReplicaPool, ReplicatedVectorStore
+from tests.fakes import FakeMeiliIndex, fake_results
+
+
+class BrokenMeiliIndex(FakeMeiliIndex):
+    def search(self, query: Any, opt_params: Mapping[str, Any] | None = None) -> dict[str, Any]:
+        raise ConnectionError("replica down")
+
+
+def _store(index: FakeMeiliIndex | None = None) -> MeiliVectorStore:
+    return MeiliVectorStore(index=index or FakeMeiliIndex(), embedder_name="test_embedder")  # type: ignore
+
+
+def _query() -> SearchRequestDataClass:
+    return SearchRequestDataClass(query="news", limit=5)
+
+
+def _replicated(*replicas: MeiliVectorStore, healthy: bool = True) -> ReplicatedVectorStore:
+    pool = ReplicaPool(
+        [Replica(f"replica{i}", store) for i, store in enumerate(replicas)],
+        max_strikes=2,
+        ejection_s=0.0,
+        health_check=lambda replica: healthy,
+    )
+    return ReplicatedVectorStore(_store(), pool, pin_check_interval_s=0.0)
+
+
+def _searches(store: MeiliVectorStore) -> int:
+    return len(store.index.search_params)  # type: ignore
+
+
+def test_least_outstanding_replica_is_picked() -> None:
+    pool = ReplicaPool([Replica("a", _store()), Replica("b", _store())])
+
+    first = pool.acquire()
+    second = pool.acquire()
+
+    assert first is not None and second is not None
+    assert {first.name, second.name} == {"a", "b"}
+    pool.release(first, 0.01)
+    assert pool.acquire() is first
+
+
+def test_searches_go_to_replicas_not_the_primary() -> None:
+    replicas = [_store(), _store()]
+    store = _replicated(*replicas)
+
+    for _ in range(4):
+        assert store.hybrid_search(_query(), [0.0]) == fake_results
+
+    assert _searches(store.primary) == 0
+    assert sum(_searches(replica) for replica in replicas) == 4
+
+
+def test_failing_replica_falls_back_to_primary_and_is_ejected() -> None:
+    store = _replicated(_store(BrokenMeiliIndex()), healthy=False)
+
+    for _ in range(3):
+        assert store.hybrid_search(_query(), [0.0]) == fake_results
+
+    assert _searches(store.primary) == 3
+    stats = store.pool.stats()["replica0"]
+    assert stats["ejected"]
+    assert stats["requests"] == 2
+
+
+def test_slow_replicas_are_ejected() -> None:
+    pool = ReplicaPool([Replica("a", _store())], max_strikes=2, slow_threshold_s=0.5)
+
+    for _ in range(2):
+        replica = pool.acquire()
+        assert replica is not None
+        pool.release(replica, 1.0)
+
+    assert pool.acquire() is None
+
+
+def test_ejected_replica_returns_after_a_health_check() -> None:
+    replica = _store()
+    store = _replicated(replica)
+    [entry] = store.pool.replicas
+    entry.strikes, entry.ejected_until = 2, 1.0
+
+    store.hybrid_search(_query(), [0.0])
+
+    assert _searches(replica) == 1
+    assert not store.pool.stats()["replica0"]["ejected"]
+
+
+def test_reads_stay_on_primary_until_the_write_task_finishes() -> None:
+    replica = _store()
+    store = _replicated(replica)
+
+    store.add_texts([VectorisedDocument(vector=[0.0], id="1::0", chunk="fresh")])
+    task_uid = store.primary.latest_task_uid()
+    assert task_uid is not None
+    store.primary.index.unfinished_tasks.add(task_uid)  # type: ignore
+
+    store.hybrid_search(_query(), [0.0])
+    assert (_searches(store.primary), _searches(replica)) == (1, 0)
+
+    store.primary.index.unfinished_tasks.clear()  # type: ignore
+    store.hybrid_search(_query(), [0.0])
+    assert (_searches(store.primary), _searches(replica)) == (1, 1)
+
+
+def test_invalid_filters_are_not_held_against_the_replica(monkeypatch: pytest.MonkeyPatch) -> None:
+    replica = _store()
+    store = _replicated(replica)
+
+    def reject(query: SearchRequestDataClass, vector: list[float]) -> dict[str, Any]:
+        raise InvalidFilterError
+
+    monkeypatch.setattr(replica, "hybrid_search", reject)
+
+    for _ in range(3):
+        with pytest.raises(InvalidFilterError):
+            store.hybrid_search(_query(), [0.0])
+    assert not store.pool.stats()["replica0"]["ejected"]
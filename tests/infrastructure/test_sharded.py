@@ -0,0 +1,98 @@
+import threading
+from collections.abc import Mapping
+from typing import Any
+
+import pytest
+
+from src.domain.dataclasses.dataclasses import (
+    SearchRequestDataClass,
+    SimilarityRequestDataClass,
+    VectorisedDocument,
+)
+from src.infrastructure.vectorstores.meilisearch import MeiliVectorStore
+from src.infrastructure.vectorstores.sharded import ConsistentHashRing, ShardedVectorStore
+from tests.fakes import FakeMeiliIndex
+
+
+class RankedFakeMeiliIndex(FakeMeiliIndex):
+    """Returns every stored document as a hit, scored by the number stored in its ``url`` field."""
+
+    def search(self, query: Any, opt_params: Mapping[str, Any] | None = None) -> dict[str, Any]:
+        hits = [{**doc, "_rankingScore": float(doc["url"])} for doc in self.documents.values()]
+        return {"hits": hits, "query": query, "processingTimeMs": 1, "estimatedTotalHits": len(hits)}
+
+
+@pytest.fixture
+def store() -> ShardedVectorStore:
+    shards = [MeiliVectorStore(index=RankedFakeMeiliIndex(), embedder_name="test_embedder") for _ in range(3)]  # type: ignore
+    return ShardedVectorStore(shards)
+
+
+def _documents(count: int) -> list[VectorisedDocument]:
+    return [VectorisedDocument(vector=[0.0], id=f"{i}::0", chunk="chunk", url=str(i / count)) for i in range(count)]
+
+
+def test_ring_is_deterministic_and_balanced() -> None:
+    ring = ConsistentHashRing(3)
+    owners = [ring.get_node(str(i)) for i in range(3000)]
+
+    assert owners == [ConsistentHashRing(3).get_node(str(i)) for i in range(3000)]
+    assert all(owners.count(node) > 600 for node in range(3))
+
+
+def test_ring_growth_moves_few_keys() -> None:
+    before, after = ConsistentHashRing(4), ConsistentHashRing(5)
+    moved = sum(before.get_node(str(i)) != after.get_node(str(i)) for i in range(5000))
+
+    assert moved < 5000 * 0.35
+
+
+def test_add_texts_routes_each_document_to_one_shard(store: ShardedVectorStore) -> None:
+    store.add_texts(_documents(50))
+
+    stored = [shard.index.documents for shard in store.shards]  # type: ignore
+    assert sum(len(documents) for documents in stored) == 50
+    assert all(documents for documents in stored)
+    assert "7__0" in store.shard_for("7::0").index.documents  # type: ignore
+
+
+def test_hybrid_search_merges_by_ranking_score(store: ShardedVectorStore) -> None:
+    store.add_texts(_documents(20))
+
+    result = store.hybrid_search(SearchRequestDataClass(query="q", limit=5), vector=[0.0])
+
+    scores = [hit["_rankingScore"] for hit in result["hits"]]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == 19 / 20
+    assert len(scores) == 5
+    assert result["estimatedTotalHits"] == 20
+
+
+def test_similarity_search_goes_to_owning_shard(store: ShardedVectorStore) -> None:
+    result = store.similarity_search(SimilarityRequestDataClass(id="3__0", limit=5))
+
+    assert result["id"] == "3__0"
+
+
+def test_blocked_writes_do_not_hold_up_searches(monkeypatch: pytest.MonkeyPatch) -> None:
+    shards = [MeiliVectorStore(index=RankedFakeMeiliIndex(), embedder_name="test_embedder") for _ in range(3)]  # type: ignore
+    store = ShardedVectorStore(shards, read_concurrency=3, write_concurrency=3)
+    started, release, written = threading.Semaphore(0), threading.Event(), threading.Event()
+
+    def blocked_write(documents: list[VectorisedDocument]) -> None:
+        started.release()
+        release.wait(5)
+        written.set()
+
+    for shard in shards:
+        monkeypatch.setattr(shard, "add_texts", blocked_write)
+    writer = threading.Thread(target=store.add_texts, args=(_documents(30),))
+    writer.start()
+    assert all(started.acquire(timeout=5) for _ in shards)
+
+    result = store.hybrid_search(SearchRequestDataClass(query="q", limit=5), vector=[0.0])
+
+    assert not written.is_set()
+    assert result["hits"] == []
+    release.set()
+    writer.join()
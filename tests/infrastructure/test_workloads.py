@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import pytest
+import requests
+from meilisearch.config import Config
+
+from src.exceptions.exceptions import WorkloadSaturatedError
+from src.infrastructure.llms.concurrency import AdaptiveConcurrencyLimiter, AdaptiveEmbeddings
+from src.infrastructure.vectorstores.meilisearch import PooledHttpRequests
+from src.infrastructure.workloads import WorkloadScheduler, bind_workload, current_workload, workload
+from tests.fakes import FakeEmbedder
+
+
+def _blocked(scheduler: WorkloadScheduler, name: str, release: threading.Event) -> Future[None]:
+    started = threading.Event()
+
+    def block() -> None:
+        started.set()
+        release.wait(5)
+
+    future = scheduler.submit(name, block)  # type: ignore
+    assert started.wait(5)
+    return future
+
+
+def test_jobs_run_as_their_workload_class() -> None:
+    scheduler = WorkloadScheduler()
+
+    assert scheduler.submit("ingest", current_workload).result(5) == "ingest"
+    assert scheduler.submit("query", current_workload).result(5) == "query"
+    assert current_workload() == "query"
+
+
+def test_bound_functions_keep_the_callers_class_on_other_threads() -> None:
+    results: list[str] = []
+    with workload("ingest"):
+        bound = bind_workload(lambda: results.append(current_workload()))
+    thread = threading.Thread(target=bound)
+    thread.start()
+    thread.join()
+
+    assert results == ["ingest"]
+
+
+def test_ingest_waits_while_searches_are_queued() -> None:
+    scheduler = WorkloadScheduler(query_concurrency=1, ingest_concurrency=1)
+    release_query = threading.Event()
+    _blocked(scheduler, "query", release_query)
+
+    queued_query = scheduler.submit("query", lambda: None)
+    ingest = scheduler.submit("ingest", lambda: scheduler.classes["query"].queued)
+    assert scheduler.stats()["ingest"]["queued"] == 1
+
+    release_query.set()
+    queued_query.result(5)
+    assert ingest.result(5) == 0
+
+
+def test_ingest_is_not_starved_past_its_yield_limit() -> None:
+    scheduler = WorkloadScheduler(query_concurrency=1, ingest_max_yield_s=0.05)
+    release_query = threading.Event()
+    _blocked(scheduler, "query", release_query)
+    scheduler.submit("query", lambda: None)
+
+    assert scheduler.submit("ingest", lambda: "done").result(5) == "done"
+    release_query.set()
+    assert scheduler.join(5)
+
+
+def test_full_queue_is_rejected_and_counted() -> None:
+    scheduler = WorkloadScheduler(ingest_concurrency=1, ingest_queue=1)
+    release = threading.Event()
+    _blocked(scheduler, "ingest", release)
+    scheduler.submit("ingest", lambda: None)
+
+    with pytest.raises(WorkloadSaturatedError):
+        scheduler.submit("ingest", lambda: None)
+
+    release.set()
+    assert scheduler.join(5)
+    stats = scheduler.stats()["ingest"]
+    assert (stats["completed"], stats["rejected"], stats["queued"], stats["in_flight"]) == (2, 1, 0, 0)
+    assert stats["wait_ms_p95"] > 0
+
+
+def test_cancelled_waiters_leave_the_queue() -> None:
+    scheduler = WorkloadScheduler(ingest_concurrency=1)
+    release = threading.Event()
+    _blocked(scheduler, "ingest", release)
+
+    async def give_up() -> None:
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(scheduler.run("ingest", lambda: None), 0.05)
+
+    asyncio.run(give_up())
+
+    assert scheduler.stats()["ingest"]["queued"] == 0
+    release.set()
+    assert scheduler.join(5)
+
+
+def test_ingest_uses_its_own_connection_pool() -> None:
+    query_session, ingest_session = requests.Session(), requests.Session()
+    http = PooledHttpRequests(Config("http://127.0.0.1:7700"), query_session, ingest_session)
+
+    assert http._session() is query_session
+    with workload("ingest"):
+        assert http._session() is ingest_session
+
+
+def test_ingest_embeds_under_its_own_limit() -> None:
+    query_limiter, ingest_limiter = AdaptiveConcurrencyLimiter(), AdaptiveConcurrencyLimiter()
+    embeddings = AdaptiveEmbeddings(FakeEmbedder(), query_limiter, ingest_limiter=ingest_limiter)
+
+    embeddings.embed_query("news")
+    with workload("ingest"):
+        embeddings.embed_documents(["a", "b"])
+
+    assert (query_limiter.success_count, ingest_limiter.success_count) == (1, 1)
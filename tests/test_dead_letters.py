@@ -0,0 +1,129 @@
+from pathlib import Path
+
+import pytest
+from langchain_core.exceptions import LangChainException
+
+from src.domain.dataclasses.dataclasses import Document, VectorisedDocument
+from src.exceptions.exceptions import EmbedderError, IndexingError
+from src.service.dead_letters import DeadLetter, DeadLetterQueue
+from src.service.search_service import SearchService
+from tests.fakes import FakeEmbedder, FakeLangchainLLM, FakeVectorStore
+
+
+class PoisonEmbedder(FakeEmbedder):
+    """Fails on any text containing ``poison``, ``failures`` times (forever by default)."""
+
+    def __init__(self, failures: int = -1) -> None:
+        self.failures = failures
+        self.calls: list[list[str]] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        if self.failures != 0 and any("poison" in text for text in texts):
+            self.failures -= 1
+            raise LangChainException("input rejected")
+        return super().embed_documents(texts)
+
+
+class PickyVectorStore(FakeVectorStore):
+    """Rejects writes containing chunks of document ``bad`` until ``accepting`` is set."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.accepting = False
+
+    def add_texts(self, documents: list[VectorisedDocument]) -> None:
+        if not self.accepting and any(document.doc_id == "bad" for document in documents):
+            raise IndexingError(message="payload rejected")
+        super().add_texts(documents)
+
+
+@pytest.fixture
+def queue(tmp_path: Path) -> DeadLetterQueue:
+    return DeadLetterQueue(tmp_path / "news.jsonl")
+
+
+def _service(embedder: FakeEmbedder, store: FakeVectorStore, queue: DeadLetterQueue | None) -> SearchService:
+    return SearchService(embedder, store, FakeLangchainLLM(), dead_letters=queue, document_retries=2, retry_delay_s=0)
+
+
+def test_failing_document_is_dead_lettered_and_the_rest_stored(queue: DeadLetterQueue) -> None:
+    store = FakeVectorStore()
+    service = _service(PoisonEmbedder(), store, queue)
+
+    stored = service.index_documents([Document(id="good", body="fine text"), Document(id="bad", body="poison")])
+
+    assert stored == ["good::0"]
+    assert {text.doc_id for text in store.texts} == {"good"}
+    [letter] = queue.read()
+    assert letter.document.id == "bad"
+    assert letter.attempts == 3
+    assert letter.chunks is None
+    assert "input rejected" in letter.reason
+
+
+def test_transient_failures_are_retried(queue: DeadLetterQueue) -> None:
+    store = FakeVectorStore()
+    service = _service(PoisonEmbedder(failures=1), store, queue)
+
+    service.index_documents([Document(id="flaky", body="poison once")])
+
+    assert [text.doc_id for text in store.texts] == ["flaky"]
+    assert queue.read() == []
+
+
+def test_retry_stores_embedded_chunks_without_re_embedding(queue: DeadLetterQueue) -> None:
+    store = PickyVectorStore()
+    embedder = PoisonEmbedder()
+    service = _service(embedder, store, queue)
+    service.index_documents([Document(id="good", body="fine text"), Document(id="bad", body="also fine")])
+
+    [letter] = queue.read()
+    assert letter.chunks is not None
+    assert [text.doc_id for text in store.texts] == ["good"]
+
+    store.accepting = True
+    calls = len(embedder.calls)
+    assert service.retry_dead_letters() == ["bad::0"]
+
+    assert len(embedder.calls) == calls
+    assert {text.doc_id for text in store.texts} == {"good", "bad"}
+    assert queue.read() == []
+
+
+def test_without_a_queue_the_failure_is_raised_after_storing_the_rest() -> None:
+    store = FakeVectorStore()
+    service = _service(PoisonEmbedder(), store, None)
+
+    with pytest.raises(EmbedderError):
+        service.index_documents([Document(id="good", body="fine text"), Document(id="bad", body="poison")])
+
+    assert {text.doc_id for text in store.texts} == {"good"}
+
+
+def test_letters_survive_a_retry_that_fails(queue: DeadLetterQueue, monkeypatch: pytest.MonkeyPatch) -> None:
+    service = _service(PoisonEmbedder(), FakeVectorStore(), queue)
+    service.index_documents([Document(id="bad", body="poison")])
+
+    def crash(documents: list[Document]) -> list[str]:
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(service, "index_documents", crash)
+    with pytest.raises(RuntimeError):
+        service.retry_dead_letters()
+
+    assert [letter.document.id for letter in queue.read()] == ["bad"]
+    assert not queue.claim_path.exists()
+
+
+def test_claim_left_by_a_crash_is_retried(queue: DeadLetterQueue) -> None:
+    queue.add([DeadLetter(Document(id="old", body="text"), reason="store down")])
+    queue.path.replace(queue.claim_path)
+    queue.add([DeadLetter(Document(id="new", body="text"), reason="store down")])
+
+    restarted = DeadLetterQueue(queue.path)
+    with restarted.take() as letters:
+        assert [letter.document.id for letter in letters] == ["old", "new"]
+        assert [letter.document.id for letter in restarted.read()] == ["old", "new"]
+
+    assert restarted.read() == []
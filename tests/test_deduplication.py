@@ -0,0 +1,174 @@
+from pathlib import Path
+
+from src.conf.settings import Settings
+from src.domain.chunk import ChunkingEngine
+from src.domain.dataclasses.dataclasses import Document
+from src.service.deduplication import ChunkDeduplicator, content_hash, normalised_words, simhash
+from src.service.search_service import SearchService
+from tests.fakes import FakeEmbedder, FakeLangchainLLM, FakeVectorStore
+
+STORY = (
+    "The chancellor confirmed on Tuesday that the budget will include new measures to support "
+    "small businesses, with tax relief for firms investing in training and equipment. Business "
+    "groups welcomed the announcement but warned that rising energy costs and staff shortages "
+    "would continue to weigh on growth throughout the year. Opposition MPs said the plans did "
+    "not go far enough and called for a wider review of business rates before the next election."
+)
+REWORDED = STORY.replace("Tuesday", "Wednesday").replace("warned", "cautioned")
+OTHER = (
+    "Chelsea extended their lead at the top of the league after a late winner at Stamford Bridge "
+    "left the visitors with nothing to show for an hour of pressure."
+)
+
+
+def _chunk(chunk_id: str, doc_id: str, text: str) -> tuple[str, str, str, int]:
+    return chunk_id, doc_id, text, len(text.split())
+
+
+def _distance(first: str, second: str) -> int:
+    return (simhash(normalised_words(first)) ^ simhash(normalised_words(second))).bit_count()
+
+
+def test_signatures() -> None:
+    assert content_hash(normalised_words("Hello,  World!")) == content_hash(normalised_words("hello world"))
+    assert _distance(STORY, REWORDED) <= 6
+    assert _distance(STORY, OTHER) > 12
+
+
+def test_plan_skips_exact_and_near_duplicates() -> None:
+    deduplicator = ChunkDeduplicator()
+    deduplicator.commit(deduplicator.plan([_chunk("a::0", "a", STORY)]))
+
+    plan = deduplicator.plan(
+        [
+            _chunk("b::0", "b", STORY.upper()),
+            _chunk("b::1", "b", REWORDED),
+            _chunk("b::2", "b", OTHER),
+            _chunk("b::3", "b", OTHER),
+        ],
+    )
+
+    assert plan.keep == [False, False, True, False]
+    assert plan.links == {"b::0": ("b", "a::0"), "b::1": ("b", "a::0"), "b::3": ("b", "b::2")}
+    assert plan.report.exact_duplicates == 2
+    assert plan.report.near_duplicates == 1
+    assert plan.report.embeddings_saved == 3
+
+
+def test_replaced_documents_do_not_match_themselves() -> None:
+    deduplicator = ChunkDeduplicator()
+    deduplicator.commit(deduplicator.plan([_chunk("a::0", "a", STORY)]))
+
+    plan = deduplicator.plan([_chunk("a::0", "a", STORY)], replacing={"a"})
+
+    assert plan.keep == [True]
+
+
+def test_forgetting_a_canonical_document_reports_orphans() -> None:
+    deduplicator = ChunkDeduplicator()
+    deduplicator.commit(deduplicator.plan([_chunk("a::0", "a", STORY)]))
+    deduplicator.commit(deduplicator.plan([_chunk("b::0", "b", STORY)]))
+
+    assert deduplicator.forget(["a"]) == {"b"}
+    assert deduplicator.plan([_chunk("c::0", "c", STORY)]).keep == [True]
+
+
+def test_signatures_survive_restart(tmp_path: Path) -> None:
+    deduplicator = ChunkDeduplicator(path=tmp_path / "documents.json")
+    deduplicator.commit(deduplicator.plan([_chunk("a::0", "a", STORY), _chunk("b::0", "b", STORY)]))
+    deduplicator.save()
+
+    restored = ChunkDeduplicator(path=tmp_path / "documents.json")
+    restored.load()
+
+    assert restored.plan([_chunk("c::0", "c", REWORDED)]).keep == [False]
+    assert restored.links == {"b::0": ("b", "a::0")}
+
+
+def test_commits_survive_a_crash_before_save(tmp_path: Path) -> None:
+    deduplicator = ChunkDeduplicator(path=tmp_path / "documents.json")
+    deduplicator.commit(deduplicator.plan([_chunk("a::0", "a", STORY)]))
+    deduplicator.save()
+    deduplicator.commit(deduplicator.plan([_chunk("b::0", "b", STORY), _chunk("b::1", "b", OTHER)]))
+    deduplicator.forget(["a"])
+
+    restored = ChunkDeduplicator(path=tmp_path / "documents.json")
+    restored.load()
+
+    assert set(restored.signatures) == {"b::1"}
+    assert restored.links == {}
+
+
+def test_journal_is_folded_into_the_saved_index(tmp_path: Path) -> None:
+    deduplicator = ChunkDeduplicator(path=tmp_path / "documents.json", compact_every=2)
+    deduplicator.commit(deduplicator.plan([_chunk("a::0", "a", STORY)]))
+    assert deduplicator.journal_path is not None and deduplicator.journal_path.exists()
+
+    deduplicator.commit(deduplicator.plan([_chunk("b::0", "b", OTHER)]))
+
+    assert not deduplicator.journal_path.exists()
+    restored = ChunkDeduplicator(path=tmp_path / "documents.json")
+    restored.load()
+    assert set(restored.signatures) == {"a::0", "b::0"}
+
+
+class CountingEmbedder(FakeEmbedder):
+    def __init__(self) -> None:
+        self.texts = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+def test_search_service_skips_duplicate_chunks_before_embedding() -> None:
+    embedder = CountingEmbedder()
+    vectorstore = FakeVectorStore()
+    service = SearchService(
+        embedder,
+        vectorstore,
+        FakeLangchainLLM(),
+        ChunkingEngine(chunk_size=460, chunk_overlap=0),
+        deduplicator=ChunkDeduplicator(),
+    )
+
+    service.index_documents([Document(id="1", body=f"{STORY}\n\n{OTHER}")])
+    service.index_documents([Document(id="2", body=f"{OTHER}\n\n{REWORDED}\n\nA genuinely new closing paragraph.")])
+
+    assert embedder.texts == 3
+    assert [text.id for text in vectorstore.texts] == ["1::0", "1::1", "2::2"]
+    assert all(text.content_hash for text in vectorstore.texts)
+    assert service.deduplicator is not None
+    assert service.deduplicator.stats()["embeddings_saved"] == 2
+
+
+def _index_shared_chunk() -> tuple[SearchService, FakeVectorStore]:
+    """Index two documents that share the OTHER chunk, with the default settings."""
+    assert not Settings.model_fields["dedup_enabled"].default
+    vectorstore = FakeVectorStore()
+    service = SearchService(
+        FakeEmbedder(),
+        vectorstore,
+        FakeLangchainLLM(),
+        ChunkingEngine(chunk_size=460, chunk_overlap=0),
+    )
+    service.index_documents([Document(id="1", body=f"{STORY}\n\n{OTHER}", url="https://example.com/1")])
+    service.index_documents([Document(id="2", body=f"{OTHER}\n\n{REWORDED}", url="https://example.com/2")])
+    return service, vectorstore
+
+
+def test_shared_chunk_is_found_through_the_second_documents_filter() -> None:
+    _, vectorstore = _index_shared_chunk()
+
+    # What `doc_id = "2"` and `url = "https://example.com/2"` filters match.
+    matched = [text.chunk for text in vectorstore.texts if text.doc_id == "2" and text.url == "https://example.com/2"]
+    assert OTHER in matched
+
+
+def test_deleting_the_first_document_keeps_the_shared_chunk() -> None:
+    service, vectorstore = _index_shared_chunk()
+
+    service.delete_documents(["1"])
+
+    assert {text.doc_id for text in vectorstore.texts} == {"2"}
+    assert OTHER in [text.chunk for text in vectorstore.texts]
@@ -0,0 +1,134 @@
+from pathlib import Path
+
+import pytest
+
+from src.domain.dataclasses.dataclasses import Document, VectorisedDocument
+from src.exceptions.exceptions import MigrationConflictError
+from src.service.document_vectors import document_vectors
+from src.service.migration import EmbedderLayout, EmbeddingMigration
+from src.service.search_service import SearchService
+from tests.fakes import FakeEmbedder, FakeLangchainLLM, FakeVectorStore
+
+
+class CountingEmbedder(FakeEmbedder):
+    def __init__(self) -> None:
+        self.embedded: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded.extend(texts)
+        return [[9.0, 9.0] for _ in texts]
+
+
+def _store(count: int) -> FakeVectorStore:
+    store = FakeVectorStore()
+    store.add_texts(
+        [VectorisedDocument(id=f"doc{i}__0", vector=[1.0], chunk=f"chunk {i}", doc_id=f"doc{i}") for i in range(count)],
+    )
+    return store
+
+
+def test_new_chunks_are_embedded_with_both_models() -> None:
+    store = FakeVectorStore()
+    service = SearchService(FakeEmbedder(), store, FakeLangchainLLM(), shadow_embedder=("v2", CountingEmbedder()))
+
+    service.index_documents([Document(id="a", body="some text to index")])
+
+    assert store.texts[0].vectors == {"v2": [9.0, 9.0]}
+
+
+def test_backfill_embeds_only_missing_chunks(tmp_path: Path) -> None:
+    store = _store(5)
+    store.texts[0].vectors["v2"] = [1.0, 1.0]
+    embedder = CountingEmbedder()
+    migration = EmbeddingMigration("v1", "v2", path=tmp_path / "news.json", batch_size=2, max_chunks_per_s=1000)
+
+    migration.backfill(store, embedder)
+
+    assert embedder.embedded == ["chunk 1", "chunk 2", "chunk 3", "chunk 4"]
+    assert all(text.vectors["v2"] for text in store.texts)
+    assert migration.status()["coverage"] == 1.0
+    assert migration.complete
+
+    resumed = EmbeddingMigration("v1", "v2", path=tmp_path / "news.json")
+    resumed.load()
+    assert resumed.complete
+    assert resumed.embedded == 4
+
+
+def test_backfill_skips_chunks_replaced_meanwhile() -> None:
+    store = _store(2)
+    migration = EmbeddingMigration("v1", "v2", max_chunks_per_s=1000)
+
+    class ReplacingEmbedder(CountingEmbedder):
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            store.texts[0] = VectorisedDocument(id="doc0__0", vector=[2.0], chunk="new text", vectors={"v2": [3.0]})
+            return super().embed_documents(texts)
+
+    migration.backfill(store, ReplacingEmbedder())
+
+    assert store.texts[0].chunk == "new text"
+    assert store.texts[0].vectors == {"v2": [3.0]}
+    assert store.texts[1].vectors == {"v2": [9.0, 9.0]}
+
+
+def test_backfill_rebuilds_document_vectors_with_both_models() -> None:
+    store = _store(2)
+    store.add_texts([VectorisedDocument(id="doc0__1", vector=[3.0], chunk="more", doc_id="doc0")])
+    migration = EmbeddingMigration("v1", "v2", max_chunks_per_s=1000)
+
+    migration.backfill(store, CountingEmbedder(), document_vectors=True)
+
+    documents = {document.id: document for document in store.document_vectors}
+    assert sorted(documents) == ["doc0", "doc1"]
+    assert documents["doc0"].vector == [2.0]
+    assert documents["doc0"].vectors == {"v2": [9.0, 9.0]}
+
+
+def test_document_vectors_carry_the_shadow_vectors() -> None:
+    chunks = [
+        VectorisedDocument(id="a::0", vector=[1.0], chunk="x", doc_id="a", vectors={"v2": [2.0]}),
+        VectorisedDocument(id="a::1", vector=[3.0], chunk="y", doc_id="a", vectors={"v2": [4.0]}),
+        VectorisedDocument(id="b::0", vector=[1.0], chunk="z", doc_id="b", vectors={"v2": [2.0]}),
+        VectorisedDocument(id="b::1", vector=[1.0], chunk="w", doc_id="b"),
+    ]
+
+    vectors = {document.id: document.vectors for document in document_vectors(chunks)}
+
+    # b is only half migrated, so it gets no v2 vector rather than a skewed one.
+    assert vectors == {"a": {"v2": [3.0]}, "b": {}}
+
+
+def test_backfill_is_throttled(monkeypatch: pytest.MonkeyPatch) -> None:
+    migration = EmbeddingMigration("v1", "v2", batch_size=2, max_chunks_per_s=4)
+    waits: list[float] = []
+    monkeypatch.setattr(migration._stop, "wait", lambda delay: waits.append(delay))
+
+    migration.backfill(_store(4), CountingEmbedder())
+
+    assert len(waits) == 2
+    assert waits[1] == pytest.approx(1.0, abs=0.1)
+
+
+def test_reads_switch_only_after_full_coverage() -> None:
+    migration = EmbeddingMigration("v1", "v2", read_target=True, max_chunks_per_s=1000)
+    assert migration.layout() == EmbedderLayout("v1", shadow="v2")
+
+    migration.backfill(_store(1), CountingEmbedder())
+
+    assert migration.reads_target()
+    assert migration.layout() == EmbedderLayout("v2", shadow="v1")
+
+
+def test_cleanup_removes_the_source_vectors() -> None:
+    store = _store(1)
+    migration = EmbeddingMigration("v1", "v2", max_chunks_per_s=1000)
+    migration.backfill(store, CountingEmbedder())
+
+    with pytest.raises(MigrationConflictError):
+        migration.cleanup(store)
+
+    migration.read_target = True
+    migration.cleanup(store)
+
+    assert store.removed_embedders == ["v1"]
+    assert migration.layout() == EmbedderLayout("v2")
@@ -0,0 +1,53 @@
+from src.infrastructure.llms.cache import CachedEmbeddings, QueryEmbeddingCache
+from src.service.prewarm import Prewarmer
+from src.service.query_log import QueryLog
+from src.service.search_service import SearchService
+from tests.fakes import FailingVectorStore, FakeEmbedder, FakeLangchainLLM, FakeVectorStore
+
+
+def _query_log() -> QueryLog:
+    query_log = QueryLog(sample_rate=1.0)
+    query_log.record("documents", "chelsea", 5)
+    query_log.record("news", "election", 3)
+    return query_log
+
+
+def test_prewarm_replays_top_queries_into_caches() -> None:
+    cache = QueryEmbeddingCache()
+    services: dict[str, SearchService] = {}
+
+    def service_factory(index_name: str) -> SearchService:
+        embedder = CachedEmbeddings(FakeEmbedder(), cache)
+        return services.setdefault(index_name, SearchService(embedder, FakeVectorStore(), FakeLangchainLLM()))
+
+    prewarmer = Prewarmer(_query_log(), service_factory, max_qps=1000)
+    prewarmer.run()
+
+    assert cache.get("chelsea") is not None
+    assert cache.get("election") is not None
+    news_store: FakeVectorStore = services["news"].vectorstore  # type: ignore
+    assert news_store.last_query.query == "election"  # type: ignore
+    assert prewarmer.stats()["warmed"] == 2
+
+
+def test_prewarm_failures_are_counted_not_raised() -> None:
+    prewarmer = Prewarmer(
+        _query_log(),
+        lambda _: SearchService(FakeEmbedder(), FailingVectorStore(), FakeLangchainLLM()),
+        max_qps=1000,
+    )
+
+    prewarmer.run()
+
+    assert prewarmer.stats()["failures"] == 2
+
+
+def test_cached_embeddings_only_embeds_once() -> None:
+    cache = QueryEmbeddingCache(max_entries=1)
+    embedder = CachedEmbeddings(FakeEmbedder(), cache)
+
+    embedder.embed_query("a")
+    embedder.embed_query("a")
+    embedder.embed_query("b")
+
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
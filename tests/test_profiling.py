@@ -0,0 +1,129 @@
+import time
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.app import app
+from src.dependencies.index_dependencies import get_profiler
+from src.infrastructure.profiling import Profile, Profiler, ProfilingMiddleware, _active_profile, profiled
+from src.service.deadline import call_with_timeout
+
+TOKEN = "admin-secret"
+
+
+@profiled
+class Pipeline:
+    def run(self) -> str:
+        time.sleep(0.02)
+        return self._step()
+
+    def _step(self) -> str:
+        time.sleep(0.03)
+        return "done"
+
+
+def _profiled_app(profiler: Profiler) -> FastAPI:
+    profiled_app = FastAPI()
+    profiled_app.add_middleware(ProfilingMiddleware, profiler_factory=lambda: profiler)
+
+    @profiled_app.get("/work")
+    def work() -> dict[str, str]:
+        return {"result": Pipeline().run()}
+
+    return profiled_app
+
+
+def test_spans_record_total_and_self_time() -> None:
+    profile = Profile("GET", "/work")
+    token = _active_profile.set(profile)
+    try:
+        Pipeline().run()
+    finally:
+        _active_profile.reset(token)
+
+    functions = {function["function"]: function for function in profile.functions()}
+    assert functions["Pipeline.run"]["calls"] == 1
+    assert functions["Pipeline.run"]["total_ms"] >= 50
+    assert 15 <= functions["Pipeline.run"]["self_ms"] < functions["Pipeline.run"]["total_ms"]
+    assert functions["Pipeline._step"]["self_ms"] >= 30
+
+
+def test_pooled_threads_stop_being_sampled_when_their_call_returns() -> None:
+    profile = Profile("GET", "/work")
+    token = _active_profile.set(profile)
+    try:
+        assert call_with_timeout(lambda: Pipeline().run(), timeout_s=5) == "done"
+    finally:
+        _active_profile.reset(token)
+
+    assert profile.functions()[0]["function"] == "Pipeline.run"
+    assert profile._threads == set()
+
+
+def test_instrumented_methods_are_untouched_without_profile() -> None:
+    assert Pipeline().run() == "done"
+    assert Pipeline.run.__name__ == "run"
+
+
+def test_header_profiles_and_stores_request() -> None:
+    profiler = Profiler(admin_token=TOKEN, interval_s=0.002)
+    client = TestClient(_profiled_app(profiler))
+
+    response = client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": TOKEN})
+
+    profile = profiler.get(response.headers["X-Profile-Id"])
+    assert profile is not None
+    result = profile.to_dict()
+    assert result["status"] == 200
+    assert [function["function"] for function in result["functions"]] == ["Pipeline.run", "Pipeline._step"]
+    assert result["samples"] > 0
+    assert any("Pipeline" in stack for stack in result["stacks"])
+
+
+def test_header_without_valid_token_is_ignored() -> None:
+    profiler = Profiler(admin_token=TOKEN)
+    client = TestClient(_profiled_app(profiler))
+
+    response = client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "wrong"})
+
+    assert "X-Profile-Id" not in response.headers
+    assert profiler.profiles() == []
+
+
+def test_sampled_requests_are_aggregated() -> None:
+    profiler = Profiler(admin_token=TOKEN, sample_every=2)
+    client = TestClient(_profiled_app(profiler))
+
+    for _ in range(4):
+        client.get("/work")
+
+    hot = profiler.hot_functions()
+    assert hot["sampled_requests"] == 2
+    assert hot["functions"][0]["function"] == "Pipeline._step"
+    assert hot["functions"][0]["calls"] == 2
+    assert profiler.profiles() == []
+
+
+@pytest.fixture
+def admin_client() -> Generator[tuple[TestClient, Profiler], Any]:
+    profiler = Profiler(admin_token=TOKEN)
+    app.dependency_overrides[get_profiler] = lambda: profiler
+    with TestClient(app) as client:
+        yield client, profiler
+    app.dependency_overrides.clear()
+
+
+def test_admin_routes_require_token(admin_client: tuple[TestClient, Profiler]) -> None:
+    client, _ = admin_client
+
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": TOKEN}).json() == {"profiles": []}
+    assert client.get("/admin/profiles/missing", headers={"X-Admin-Token": TOKEN}).status_code == 404
+
+
+def test_admin_routes_disabled_by_default() -> None:
+    with TestClient(app) as client:
+        assert client.get("/admin/profiles/hot", headers={"X-Admin-Token": TOKEN}).status_code == 409
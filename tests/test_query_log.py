@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from src.service.query_log import QueryLog
+
+
+def test_record_counts_normalised_queries() -> None:
+    query_log = QueryLog(sample_rate=1.0)
+
+    query_log.record("documents", "chelsea  news", 5)
+    query_log.record("documents", "chelsea news", 5)
+    query_log.record("documents", "election", 5)
+
+    assert query_log.top(1) == [("documents", "chelsea news", 5)]
+
+
+def test_sampling_skips_queries() -> None:
+    query_log = QueryLog(sample_rate=0.0)
+
+    query_log.record("documents", "chelsea", 5)
+
+    assert len(query_log) == 0
+
+
+def test_least_frequent_queries_are_evicted() -> None:
+    query_log = QueryLog(max_entries=10, sample_rate=1.0)
+    for _ in range(3):
+        query_log.record("documents", "popular", 5)
+
+    for i in range(20):
+        query_log.record("documents", f"rare {i}", 5)
+
+    assert len(query_log) <= 10
+    assert query_log.top(1) == [("documents", "popular", 5)]
+
+
+def test_save_and_load_round_trip(tmp_path: Path) -> None:
+    path = str(tmp_path / "queries.json")
+    query_log = QueryLog(sample_rate=1.0, path=path)
+    query_log.record("documents", "chelsea", 5)
+    query_log.record("documents", "chelsea", 5)
+    query_log.record("news", "election", 3)
+    query_log.save()
+
+    restored = QueryLog(path=path)
+    restored.load()
+
+    assert restored.top(2) == [("documents", "chelsea", 5), ("news", "election", 3)]
@@ -0,0 +1,245 @@
+import pytest
+
+from src.domain.dataclasses.dataclasses import Document
+from src.exceptions.exceptions import RebuildConflictError, RebuildNotFoundError
+from src.infrastructure.vectorstores.meilisearch import WriteOptions
+from src.infrastructure.vectorstores.registry import IndexRegistry
+from src.service.deduplication import ChunkDeduplicator
+from src.service.migration import EmbedderLayout
+from src.service.rebuild import RebuildManager, RebuildMirroredVectorStore
+from src.service.search_service import SearchService
+from tests.fakes import FakeEmbedder, FakeLangchainLLM, FakeMeiliClient
+
+LAYOUT = EmbedderLayout("test_embedder")
+
+
+@pytest.fixture
+def client() -> FakeMeiliClient:
+    return FakeMeiliClient()
+
+
+@pytest.fixture
+def service(client: FakeMeiliClient) -> SearchService:
+    registry = IndexRegistry(client, embedder_name="test_embedder")  # type: ignore
+    service = SearchService(
+        embedder=FakeEmbedder(),
+        vectorstore=registry.get("news", create=True),
+        llm=FakeLangchainLLM(),
+        deduplicator=ChunkDeduplicator(),
+    )
+    service.index_documents([Document(id="old", body="the old corpus")])
+    return service
+
+
+@pytest.fixture
+def manager(client: FakeMeiliClient) -> RebuildManager:
+    return RebuildManager(client, write_options=WriteOptions(queue_poll_s=0.0, retry_delay_s=0.0))  # type: ignore
+
+
+def _documents(count: int) -> list[Document]:
+    return [Document(id=f"new{i}", body=f"fresh story number {i} about the election") for i in range(count)]
+
+
+def test_rebuild_swaps_a_fully_loaded_shadow_index(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    rebuild = manager.start("news", service, LAYOUT)
+    shadow = client.indexes["news__rebuild"]
+    assert shadow.settings_updates
+
+    assert rebuild.add_documents(_documents(3)) == 3
+    assert set(client.indexes["news"].documents) == {"old__0"}
+
+    rebuild.begin_swap()
+    rebuild.swap()
+
+    assert rebuild.status == "completed"
+    assert set(client.indexes["news"].documents) == {"new0__0", "new1__0", "new2__0"}
+    assert "news__rebuild" not in client.indexes
+    assert service.deduplicator is not None
+    assert {signature.doc_id for signature in service.deduplicator.signatures.values()} == {"new0", "new1", "new2"}
+
+
+def test_live_writes_during_a_rebuild_survive_the_swap(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    live = SearchService(
+        FakeEmbedder(), RebuildMirroredVectorStore(service.vectorstore, manager, "news"), FakeLangchainLLM()
+    )
+    rebuild = manager.start("news", live, LAYOUT)
+    rebuild.add_documents(_documents(3))
+
+    live.index_documents([Document(id="late", body="a story written mid-rebuild")])
+    live.delete_documents(["new1"])
+    shadow = client.indexes["news__rebuild"]
+    assert shadow.deleted_filters == ['doc_id IN ["new1"]']
+    # The fake records delete filters without applying them.
+    del shadow.documents["new1__0"]
+
+    rebuild.begin_swap()
+    rebuild.swap()
+    live.index_documents([Document(id="after", body="a story written after the swap")])
+
+    assert rebuild.status == "completed"
+    assert set(client.indexes["news"].documents) == {"new0__0", "new2__0", "late__0", "after__0"}
+
+
+def test_swap_is_refused_when_counts_disagree(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    rebuild = manager.start("news", service, LAYOUT)
+    rebuild.add_documents(_documents(3))
+    client.indexes["news__rebuild"].documents.popitem()
+
+    rebuild.begin_swap()
+    rebuild.swap()
+
+    assert rebuild.status == "failed"
+    assert rebuild.error is not None
+    assert "expected 3" in rebuild.error
+    assert set(client.indexes["news"].documents) == {"old__0"}
+
+
+def test_ids_that_collide_once_sanitised_count_once(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    rebuild = manager.start("news", service, LAYOUT)
+    rebuild.add_documents([Document(id="Story", body="first draft"), Document(id="story", body="final copy")])
+
+    rebuild.begin_swap()
+    rebuild.swap()
+
+    assert rebuild.status == "completed"
+    assert set(client.indexes["news"].documents) == {"story__0"}
+
+
+def test_swap_is_refused_after_failed_tasks(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    rebuild = manager.start("news", service, LAYOUT)
+    rebuild.add_documents(_documents(2))
+    client.indexes["news__rebuild"].fail_task()
+
+    rebuild.begin_swap()
+    rebuild.swap()
+
+    assert rebuild.status == "failed"
+    assert set(client.indexes["news"].documents) == {"old__0"}
+
+
+def test_swap_goes_ahead_after_a_failed_batch_task_was_retried(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    rebuild = manager.start("news", service, LAYOUT)
+    client.indexes["news__rebuild"].task_errors = [{"type": "internal", "message": "index is locked"}]
+    rebuild.add_documents(_documents(2))
+
+    rebuild.begin_swap()
+    rebuild.swap()
+
+    assert rebuild.status == "completed"
+    assert set(client.indexes["news"].documents) == {"new0__0", "new1__0"}
+
+
+def test_first_rebuild_ignores_the_failed_delete_of_a_missing_shadow(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    rebuild = manager.start("news", service, LAYOUT)
+    rebuild.add_documents(_documents(1))
+    assert client.task_log.get_tasks({"indexUids": ["news__rebuild"], "statuses": ["failed"]}).total == 1
+
+    rebuild.begin_swap()
+    rebuild.swap()
+
+    assert rebuild.status == "completed"
+
+
+def test_second_rebuild_ignores_failures_of_earlier_ones(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    first = manager.start("news", service, LAYOUT)
+    first.add_documents(_documents(2))
+    client.indexes["news__rebuild"].fail_task()
+    first.begin_swap()
+    first.swap()
+    assert first.status == "failed"
+    first.abort()
+
+    second = manager.start("news", service, LAYOUT)
+    second.add_documents(_documents(2))
+    second.begin_swap()
+    second.swap()
+
+    assert second.status == "completed"
+    assert set(client.indexes["news"].documents) == {"new0__0", "new1__0"}
+
+    third = manager.start("news", service, LAYOUT)
+    third.add_documents(_documents(1))
+    third.begin_swap()
+    third.swap()
+
+    assert third.status == "completed"
+    assert set(client.indexes["news"].documents) == {"new0__0"}
+
+
+def test_one_rebuild_per_index(service: SearchService, manager: RebuildManager) -> None:
+    rebuild = manager.start("news", service, LAYOUT)
+
+    with pytest.raises(RebuildConflictError):
+        manager.start("news", service, LAYOUT)
+
+    rebuild.begin_swap()
+    with pytest.raises(RebuildConflictError):
+        rebuild.add_documents(_documents(1))
+
+
+def test_abort_drops_the_shadow_index(
+    client: FakeMeiliClient,
+    service: SearchService,
+    manager: RebuildManager,
+) -> None:
+    rebuild = manager.start("news", service, LAYOUT)
+    rebuild.add_documents(_documents(1))
+
+    rebuild.abort()
+
+    assert rebuild.status == "aborted"
+    assert "news__rebuild" not in client.indexes
+    assert manager.start("news", service, LAYOUT).status == "loading"
+
+
+def test_unknown_rebuild(manager: RebuildManager) -> None:
+    with pytest.raises(RebuildNotFoundError):
+        manager.get("news")
+
+
+def test_document_vector_index_is_swapped_alongside(client: FakeMeiliClient, manager: RebuildManager) -> None:
+    registry = IndexRegistry(client, embedder_name="test_embedder", document_vectors=True)  # type: ignore
+    service = SearchService(
+        FakeEmbedder(), registry.get("news", create=True), FakeLangchainLLM(), document_candidates=5
+    )
+
+    rebuild = manager.start("news", service, LAYOUT)
+    rebuild.add_documents(_documents(2))
+    rebuild.begin_swap()
+    rebuild.swap()
+
+    assert rebuild.status == "completed"
+    assert set(client.indexes["news__docs"].documents) == {"new0", "new1"}
+    assert "news__rebuild__docs" not in client.indexes
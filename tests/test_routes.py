@@ -6,9 +6,24 @@ import pytest
 from fastapi.testclient import TestClient
 
 from src.app import app
-from src.dependencies.index_dependencies import get_dependencies
+from src.dependencies.index_dependencies import (
+    get_dependencies,
+    get_embedder_layout,
+    get_indexing_dependencies,
+    get_migration,
+    get_prewarmer,
+    get_query_log,
+    get_rebuild_manager,
+    get_runtime_stats,
+    get_workloads,
+)
 from src.domain.schemas.requests import IndexRequest, SearchRequest
 from src.exceptions.exceptions import AppError
+from src.infrastructure.workloads import WorkloadScheduler
+from src.service.migration import EmbedderLayout, EmbeddingMigration
+from src.service.prewarm import Prewarmer
+from src.service.query_log import QueryLog
+from src.service.rebuild import RebuildManager
 from src.service.search_service import SearchService
 
 
@@ -23,8 +38,33 @@ def mock_search_service() -> MagicMock:
 
 
 @pytest.fixture
-def client(mock_search_service: MagicMock) -> Generator[TestClient, Any]:
+def mock_prewarmer() -> MagicMock:
+    return MagicMock(spec=Prewarmer)
+
+
+@pytest.fixture
+def query_log() -> QueryLog:
+    return QueryLog(sample_rate=1.0)
+
+
+@pytest.fixture
+def workloads() -> WorkloadScheduler:
+    return WorkloadScheduler(query_concurrency=2, ingest_concurrency=1)
+
+
+@pytest.fixture
+def client(
+    mock_search_service: MagicMock,
+    mock_prewarmer: MagicMock,
+    query_log: QueryLog,
+    workloads: WorkloadScheduler,
+) -> Generator[TestClient, Any]:
     app.dependency_overrides[get_dependencies] = lambda: mock_search_service
+    app.dependency_overrides[get_indexing_dependencies] = lambda: mock_search_service
+    app.dependency_overrides[get_workloads] = lambda: workloads
+    app.dependency_overrides[get_prewarmer] = lambda: mock_prewarmer
+    app.dependency_overrides[get_query_log] = lambda: query_log
+    app.dependency_overrides[get_runtime_stats] = lambda: {"embedding": {"limit": 4}}
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -45,6 +85,47 @@ def test_index_documents(client: TestClient) -> None:
     assert response.json() == {"status": "success"}
 
 
+def test_index_documents_schedules_prewarm(
+    client: TestClient,
+    mock_prewarmer: MagicMock,
+    workloads: WorkloadScheduler,
+) -> None:
+    payload = [IndexRequest(id="1", body="body").model_dump()]
+
+    client.post("/index/document", json=payload)
+    workloads.join(timeout_s=5)
+    mock_prewarmer.start.assert_called_once()
+
+
+def test_indexing_runs_as_ingest_work(
+    client: TestClient,
+    mock_search_service: MagicMock,
+    workloads: WorkloadScheduler,
+) -> None:
+    client.post("/index/document", json=[IndexRequest(id="1", body="body").model_dump()])
+    client.post("/search/semantic", json={"query": "news", "limit": 3})
+    workloads.join(timeout_s=5)
+
+    mock_search_service.index_documents.assert_called_once()
+    stats = workloads.stats()
+    assert (stats["ingest"]["completed"], stats["query"]["completed"]) == (1, 1)
+
+
+def test_full_ingest_queue_is_rejected(client: TestClient, workloads: WorkloadScheduler) -> None:
+    workloads.classes["ingest"].max_queue = 0
+
+    response = client.post("/index/document", json=[IndexRequest(id="1", body="body").model_dump()])
+    assert response.status_code == 503
+    assert response.json()["error"]["code"] == "overloaded"
+
+
+def test_search_queries_are_recorded(client: TestClient, query_log: QueryLog) -> None:
+    client.post("search/semantic?index=news", json={"query": "latest  news", "limit": 3})
+    client.post("search/conversational", json={"query": "latest news", "limit": 3})
+
+    assert query_log.top(2) == [("news", "latest news", 3), ("documents", "latest news", 3)]
+
+
 def test_index_multiple_documents(client: TestClient) -> None:
     payload = [
         IndexRequest(
@@ -60,6 +141,38 @@ def test_index_multiple_documents(client: TestClient) -> None:
     assert response.json() == {"status": "success"}
 
 
+def test_replace_documents(
+    client: TestClient,
+    mock_search_service: MagicMock,
+    workloads: WorkloadScheduler,
+) -> None:
+    payload = [IndexRequest(id="1", body="new body").model_dump()]
+
+    response = client.put("/index/document", json=payload)
+    assert response.status_code == 202
+    workloads.join(timeout_s=5)
+    mock_search_service.replace_documents.assert_called_once()
+
+
+def test_delete_document(client: TestClient, mock_search_service: MagicMock) -> None:
+    response = client.delete("/index/document/1")
+    assert response.status_code == 202
+    mock_search_service.delete_documents.assert_called_once_with(["1"])
+
+
+def test_bulk_delete_documents(client: TestClient, mock_search_service: MagicMock) -> None:
+    ids = [str(i) for i in range(1000)]
+
+    response = client.post("/index/document/delete", json={"ids": ids})
+    assert response.status_code == 202
+    mock_search_service.delete_documents.assert_called_once_with(ids)
+
+
+def test_bulk_delete_requires_ids(client: TestClient) -> None:
+    response = client.post("/index/document/delete", json={"ids": []})
+    assert response.status_code == 422
+
+
 def test_semantic_search_limit_zero(client: TestClient) -> None:
     payload = {"query": "test", "limit": 0}
     response = client.post("search/semantic", json=payload)
@@ -100,3 +213,93 @@ def test_error_handling(client: TestClient, mock_search_service: MagicMock) -> N
     assert response.json() == {
         "error": {"code": "internal_error", "message": "Invalid query"},
     }
+
+
+def test_stats(client: TestClient) -> None:
+    response = client.get("/stats")
+    assert response.status_code == 200
+    assert response.json() == {"embedding": {"limit": 4}}
+
+
+def test_similar_search_batch(client: TestClient, mock_search_service: MagicMock) -> None:
+    mock_search_service.similar_search_batch.return_value = [{"hits": []}, {"hits": []}]
+
+    response = client.post("/search/similar/batch", json={"ids": ["1__0", 2], "limit": 3})
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"hits": []}, {"hits": []}]}
+    requests = mock_search_service.similar_search_batch.call_args.args[0]
+    assert [request.id for request in requests] == ["1__0", 2]
+
+
+def test_rebuild_neighbours_requires_feature(client: TestClient, mock_search_service: MagicMock) -> None:
+    mock_search_service.vectorstore = MagicMock()
+
+    response = client.post("/index/neighbours")
+    assert response.status_code == 409
+
+
+def test_search_filter_reaches_service(client: TestClient, mock_search_service: MagicMock) -> None:
+    client.post("/search/semantic", json={"query": "news", "limit": 3, "filter": 'metadata.site = "bbc"'})
+
+    request = mock_search_service.semantic_search.call_args.kwargs["request"]
+    assert request.filter == 'metadata.site = "bbc"'
+
+
+def test_index_documents_accepts_metadata(client: TestClient, mock_search_service: MagicMock) -> None:
+    payload = [{"id": "1", "body": "body", "metadata": {"site": "bbc", "tags": ["uk"]}}]
+
+    client.post("/index/document", json=payload)
+
+    documents = mock_search_service.index_documents.call_args.args[0]
+    assert documents[0].metadata == {"site": "bbc", "tags": ["uk"]}
+
+
+def test_timeout_header_shortens_deadline(client: TestClient, mock_search_service: MagicMock) -> None:
+    client.post("/search/conversational", json={"query": "news"}, headers={"X-Request-Timeout-Ms": "1500"})
+
+    deadline = mock_search_service.conversational_search.call_args.kwargs["deadline"]
+    assert deadline.timeout_s == 1.5
+
+
+def test_rebuild_needs_an_unsharded_store(client: TestClient) -> None:
+    app.dependency_overrides[get_rebuild_manager] = lambda: None
+
+    response = client.post("/index/rebuild")
+    assert response.status_code == 409
+
+
+def test_rebuild_uses_the_indexs_embedder_layout(client: TestClient) -> None:
+    manager = MagicMock(spec=RebuildManager)
+    manager.start.return_value.summary.return_value = {"status": "loading"}
+    layout = EmbedderLayout("v2", 768, shadow="v1", shadow_dimensions=1024)
+    app.dependency_overrides[get_rebuild_manager] = lambda: manager
+    app.dependency_overrides[get_embedder_layout] = lambda: layout
+
+    response = client.post("/index/rebuild?index=news")
+
+    assert response.status_code == 201
+    assert manager.start.call_args.args[0] == "news"
+    assert manager.start.call_args.args[2] == layout
+
+
+def test_document_vectors_need_hierarchical_search(client: TestClient, mock_search_service: MagicMock) -> None:
+    mock_search_service.uses_document_vectors = False
+
+    response = client.post("/index/document-vectors")
+    assert response.status_code == 409
+
+
+def test_backfill_needs_dual_writes(client: TestClient, mock_search_service: MagicMock) -> None:
+    app.dependency_overrides[get_migration] = lambda: EmbeddingMigration("v1", "v2")
+    mock_search_service.shadow_embedder = None
+
+    assert client.get("/index/migration").json()["reads"] == "v1"
+    response = client.post("/index/migration/backfill")
+    assert response.status_code == 409
+    assert response.json()["error"]["code"] == "migration_conflict"
+
+
+def test_dead_letters_need_a_queue(client: TestClient, mock_search_service: MagicMock) -> None:
+    mock_search_service.dead_letters = None
+
+    assert client.get("/index/dead-letters").status_code == 409
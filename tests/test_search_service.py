@@ -1,14 +1,21 @@
+import time
+from typing import Any
+
 import pytest
 from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
 from langchain_core.messages import AIMessage
 
-from src.domain.dataclasses.dataclasses import Document, SearchRequestDataClass
+from src.domain.chunk import ChunkingEngine
+from src.domain.dataclasses.dataclasses import Document, SearchRequestDataClass, VectorisedDocument
 from src.exceptions.exceptions import (
     ConversationalSearchError,
+    DeadlineExceededError,
     EmbedderError,
     SemanticSearchError,
 )
 from src.infrastructure.llms.bedrock import LangchainLLM
+from src.infrastructure.vectorstores.meilisearch import MeiliVectorStore
+from src.service.deadline import Deadline, StageBudgets
 from src.service.search_service import SearchService
 from tests.fakes import (
     FailingEmbedder,
@@ -16,6 +23,7 @@ from tests.fakes import (
     FakeEmbedder,
     FakeFailingLangchainLLM,
     FakeLangchainLLM,
+    FakeMeiliIndex,
     FakeVectorStore,
     fake_results,
 )
@@ -68,6 +76,67 @@ def test_index_documents(service: SearchService) -> None:
     assert isinstance(vectorstore.texts[0].vector, list)
 
 
+def test_index_documents_records_parent_id(service: SearchService) -> None:
+    service.index_documents([Document(id="parent", body="Some body", url="http://example.com")])
+
+    vectorstore: FakeVectorStore = service.vectorstore  # type: ignore
+    assert {text.doc_id for text in vectorstore.texts} == {"parent"}
+
+
+def test_index_documents_stores_metadata_on_every_chunk() -> None:
+    chunker = ChunkingEngine(chunk_size=10, chunk_overlap=0)
+    service = SearchService(FakeEmbedder(), FakeVectorStore(), FakeLangchainLLM(), chunker)
+    service.index_documents([Document(id="1", body="one two three four five six", metadata={"site": "bbc"})])
+
+    vectorstore: FakeVectorStore = service.vectorstore  # type: ignore
+    assert len(vectorstore.texts) > 1
+    assert all(text.metadata == {"site": "bbc"} for text in vectorstore.texts)
+
+
+def test_conversational_search_keeps_filter(service: SearchService) -> None:
+    service.conversational_search(SearchRequestDataClass(query="What is AI?", limit=1, filter="metadata.site = bbc"))
+
+    vectorstore: FakeVectorStore = service.vectorstore  # type: ignore
+    assert vectorstore.last_query is not None
+    assert vectorstore.last_query.filter == "metadata.site = bbc"
+
+
+def test_filters_are_part_of_the_coalescing_key() -> None:
+    unfiltered = SearchService._request_key(SearchRequestDataClass(query="news", limit=5))
+    filtered = SearchService._request_key(SearchRequestDataClass(query="news", limit=5, filter="metadata.a = 1"))
+
+    assert unfiltered != filtered
+
+
+def test_replace_documents_drops_stale_chunks(service: SearchService) -> None:
+    vectorstore: FakeVectorStore = service.vectorstore  # type: ignore
+    service.index_documents([Document(id="1", body="one\n\ntwo"), Document(id="2", body="other")])
+    vectorstore.texts.append(VectorisedDocument(vector=[0.0], id="1::9", chunk="stale", doc_id="1"))
+
+    service.replace_documents([Document(id="1", body="new body")])
+
+    assert sorted((text.doc_id, text.chunk) for text in vectorstore.texts) == [("1", "new body"), ("2", "other")]
+
+
+def test_index_documents_embeds_concurrently() -> None:
+    service = SearchService(FakeEmbedder(), FakeVectorStore(), FakeLangchainLLM(), embedding_concurrency=4)
+    documents = [Document(id=str(i), body=f"body {i}") for i in range(10)]
+
+    service.index_documents(documents)
+
+    vectorstore: FakeVectorStore = service.vectorstore  # type: ignore
+    assert [text.doc_id for text in vectorstore.texts] == [str(i) for i in range(10)]
+
+
+def test_delete_documents(service: SearchService) -> None:
+    vectorstore: FakeVectorStore = service.vectorstore  # type: ignore
+    service.index_documents([Document(id="1", body="one"), Document(id="2", body="two")])
+
+    service.delete_documents(["1"])
+
+    assert [text.doc_id for text in vectorstore.texts] == ["2"]
+
+
 def test_semantic_search(service: SearchService):
     request = SearchRequestDataClass(query="hello", limit=1)
     result = service.semantic_search(request)
@@ -107,8 +176,130 @@ def test_semantic_search_fails_with_error(failing_vector_db_service: SearchServi
         failing_vector_db_service.semantic_search(request)
 
 
-def test_conversational_search_fails_with_llm_error(failing_llm_service: SearchService):
+def test_conversational_search_degrades_on_llm_error(failing_llm_service: SearchService):
     request = SearchRequestDataClass(query="What's up?", limit=1)
 
+    result = failing_llm_service.conversational_search(request)
+
+    assert result["summary"] is None
+    assert result["sources"] == fake_results["hits"]
+    assert result["degraded"] is True
+    assert result["degraded_stages"] == ["keyword_extraction", "summary"]
+    vectorstore: FakeVectorStore = failing_llm_service.vectorstore  # type: ignore
+    assert vectorstore.last_query is not None
+    assert vectorstore.last_query.query == "What's up?"
+
+
+def test_conversational_search_fails_when_retrieval_fails(failing_vector_db_service: SearchService):
     with pytest.raises(ConversationalSearchError):
-        failing_llm_service.conversational_search(request)
+        failing_vector_db_service.conversational_search(SearchRequestDataClass(query="What's up?", limit=1))
+
+
+class SlowLLM(FakeLangchainLLM):
+    def __init__(self, keyword_delay_s: float, summary_delay_s: float) -> None:
+        super().__init__()
+        self.keyword_delay_s = keyword_delay_s
+        self.summary_delay_s = summary_delay_s
+
+    def extract_keywords(self, query: str) -> str:
+        time.sleep(self.keyword_delay_s)
+        return "keywords"
+
+    def summarise(self, query: str, results: dict[str, Any]) -> str:
+        time.sleep(self.summary_delay_s)
+        return "summary"
+
+
+def test_slow_stages_are_skipped_within_the_deadline() -> None:
+    service = SearchService(
+        FakeEmbedder(),
+        FakeVectorStore(),
+        SlowLLM(keyword_delay_s=0.5, summary_delay_s=0.5),
+        stage_budgets=StageBudgets(keyword_extraction_s=0.05, min_summary_s=0.01),
+    )
+
+    start = time.monotonic()
+    result = service.conversational_search(SearchRequestDataClass(query="q", limit=1), deadline=Deadline(0.2))
+
+    assert time.monotonic() - start < 0.4
+    assert result["summary"] is None
+    assert result["sources"] == fake_results["hits"]
+    assert result["degraded_stages"] == ["keyword_extraction", "summary"]
+
+
+def test_fast_stages_complete_within_the_deadline() -> None:
+    service = SearchService(FakeEmbedder(), FakeVectorStore(), SlowLLM(0, 0))
+
+    result = service.conversational_search(SearchRequestDataClass(query="q", limit=1), deadline=Deadline(5))
+
+    assert result["summary"] == "summary"
+    assert result["degraded"] is False
+
+
+def test_semantic_search_raises_when_deadline_passes() -> None:
+    class SlowEmbedder(FakeEmbedder):
+        def embed_query(self, text: str) -> list[float]:
+            time.sleep(0.3)
+            return super().embed_query(text)
+
+    service = SearchService(SlowEmbedder(), FakeVectorStore(), FakeLangchainLLM())
+
+    with pytest.raises(DeadlineExceededError):
+        service.semantic_search(SearchRequestDataClass(query="q", limit=1), deadline=Deadline(0.05))
+
+
+def test_hierarchical_mode_stores_document_vectors_and_preselects() -> None:
+    store = FakeVectorStore()
+    service = SearchService(
+        FakeEmbedder(),
+        store,
+        FakeLangchainLLM(),
+        chunker=ChunkingEngine(chunk_size=20, chunk_overlap=0),
+        document_candidates=7,
+    )
+
+    service.index_documents([Document(id="a", body="first part of a. second part of a.")])
+    service.semantic_search(SearchRequestDataClass(query="q", limit=3))
+
+    assert [document.id for document in store.document_vectors] == ["a"]
+    assert store.document_vectors[0].chunk == store.texts[0].chunk
+    assert store.last_candidates == 7
+
+
+def test_hierarchical_mode_can_be_bypassed_per_request() -> None:
+    store = FakeVectorStore()
+    service = SearchService(FakeEmbedder(), store, FakeLangchainLLM(), document_candidates=7)
+
+    service.semantic_search(SearchRequestDataClass(query="q", limit=3, hierarchical=False))
+
+    assert store.last_candidates is None
+    assert store.last_query is not None
+
+
+def test_stores_without_document_vectors_search_flat() -> None:
+    store = MeiliVectorStore(index=FakeMeiliIndex(), embedder_name="test_embedder")  # type: ignore
+    service = SearchService(FakeEmbedder(), store, FakeLangchainLLM(), document_candidates=7)
+
+    service.index_documents([Document(id="a", body="some text")])
+    service.semantic_search(SearchRequestDataClass(query="q", limit=3))
+
+    assert not service.uses_document_vectors
+    assert store.index.search_params  # type: ignore
+
+
+def test_build_document_vectors_from_stored_chunks() -> None:
+    store = FakeVectorStore()
+    store.add_texts(
+        [
+            VectorisedDocument(id="a::1", vector=[3.0, 0.0], chunk="later", doc_id="a"),
+            VectorisedDocument(id="a::0", vector=[1.0, 2.0], chunk="lead", doc_id="a"),
+            VectorisedDocument(id="b::0", vector=[0.0, 1.0], chunk="only", doc_id="b"),
+        ],
+    )
+    service = SearchService(FakeEmbedder(), store, FakeLangchainLLM(), document_candidates=5)
+
+    assert service.build_document_vectors(batch_size=2) == 2
+    vectors = {document.id: document for document in store.document_vectors}
+    assert vectors["a"].vector == [2.0, 1.0]
+    assert vectors["a"].chunk == "lead"
+    assert vectors["b"].vector == [0.0, 1.0]
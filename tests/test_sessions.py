@@ -0,0 +1,119 @@
+from typing import Any, ClassVar
+
+import pytest
+
+from src.domain.dataclasses.dataclasses import SearchRequestDataClass
+from src.service.search_service import SearchService
+from src.service.sessions import SessionStore
+from tests.fakes import FakeEmbedder, FakeLangchainLLM, FakeVectorStore
+
+
+class TopicEmbedder(FakeEmbedder):
+    """Embeds queries by topic: chelsea and mourinho questions are close, weather is unrelated."""
+
+    vectors: ClassVar[dict[str, list[float]]] = {
+        "chelsea": [1.0, 0.0, 0.0],
+        "mourinho": [0.8, 0.6, 0.0],
+        "weather": [0.0, 0.0, 1.0],
+    }
+
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+
+    def embed_query(self, text: str) -> list[float]:
+        self.queries.append(text)
+        return next((vector for topic, vector in self.vectors.items() if topic in text.casefold()), [0.0, 1.0, 0.0])
+
+
+class CountingVectorStore(FakeVectorStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.searches: list[SearchRequestDataClass] = []
+
+    def hybrid_search(self, query: SearchRequestDataClass, vector: list[float]) -> dict[str, Any]:
+        self.searches.append(query)
+        return {"hits": [{"id": f"{len(self.searches)}__{i}", "chunk": query.query} for i in range(2)]}
+
+
+@pytest.fixture
+def store() -> CountingVectorStore:
+    return CountingVectorStore()
+
+
+@pytest.fixture
+def service(store: CountingVectorStore) -> SearchService:
+    return SearchService(TopicEmbedder(), store, FakeLangchainLLM(), sessions=SessionStore())
+
+
+def _ask(service: SearchService, query: str, session_id: str | None = "s1", **kwargs: Any) -> dict[str, Any]:
+    return service.conversational_search(SearchRequestDataClass(query=query, limit=4, session_id=session_id, **kwargs))
+
+
+def test_repeated_question_reuses_the_cached_sources(service: SearchService, store: CountingVectorStore) -> None:
+    first = _ask(service, "Tell me about Chelsea")
+    again = _ask(service, "Tell me more about Chelsea")
+
+    assert (first["retrieval"], again["retrieval"]) == ("full", "reused")
+    assert len(store.searches) == 1
+    assert again["sources"] == first["sources"]
+    assert again["summary"]
+
+
+def test_a_turn_embeds_the_question_once(service: SearchService) -> None:
+    embedder = service.embedder
+    assert isinstance(embedder, TopicEmbedder)
+
+    _ask(service, "Tell me about Chelsea")
+    _ask(service, "Will the weather improve")
+
+    assert embedder.queries == ["Tell me about Chelsea", "Will the weather improve"]
+
+
+def test_follow_up_is_searched_incrementally_and_merged(service: SearchService, store: CountingVectorStore) -> None:
+    _ask(service, "Tell me about Chelsea")
+    follow_up = _ask(service, "what did he say next?")
+
+    assert follow_up["retrieval"] == "incremental"
+    assert store.searches[-1].query == "Tell me about Chelsea what did he say next?"
+    assert [hit["id"] for hit in follow_up["sources"]] == ["2__0", "2__1", "1__0", "1__1"]
+
+
+def test_related_question_is_incremental(service: SearchService) -> None:
+    _ask(service, "Tell me about Chelsea")
+
+    assert _ask(service, "How did Mourinho react")["retrieval"] == "incremental"
+
+
+def test_topic_change_runs_the_full_pipeline(service: SearchService, store: CountingVectorStore) -> None:
+    _ask(service, "Tell me about Chelsea")
+    changed = _ask(service, "Will the weather improve")
+
+    assert changed["retrieval"] == "full"
+    assert [hit["id"] for hit in changed["sources"]] == ["2__0", "2__1"]
+
+
+def test_a_new_filter_starts_the_context_afresh(service: SearchService) -> None:
+    _ask(service, "Tell me about Chelsea")
+
+    assert _ask(service, "Tell me about Chelsea", filter='metadata.site = "bbc"')["retrieval"] == "full"
+
+
+def test_sessions_are_separate_and_expire(service: SearchService) -> None:
+    _ask(service, "Tell me about Chelsea")
+
+    assert _ask(service, "Tell me about Chelsea", session_id="s2")["retrieval"] == "full"
+    assert "session_id" not in _ask(service, "Tell me about Chelsea", session_id=None)
+
+    assert service.sessions is not None
+    service.sessions.ttl_s = 0
+    assert _ask(service, "Tell me about Chelsea")["retrieval"] == "full"
+
+
+def test_store_is_bounded() -> None:
+    sessions = SessionStore(max_sessions=2)
+    first = sessions.get("a")
+    sessions.get("b")
+    sessions.get("c")
+
+    assert sessions.stats()["sessions"] == 2
+    assert sessions.get("a") is not first
@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.domain.dataclasses.dataclasses import SearchRequestDataClass
+from src.service.deadline import Deadline
+from src.service.search_service import SearchService
+from src.service.singleflight import SingleFlight
+from tests.fakes import FakeEmbedder, FakeLangchainLLM, FakeVectorStore
+
+
+class SlowCountingEmbedder(FakeEmbedder):
+    def __init__(self) -> None:
+        self.query_calls = 0
+
+    def embed_query(self, text: str) -> list[float]:
+        self.query_calls += 1
+        time.sleep(0.1)
+        return super().embed_query(text)
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    singleflight = SingleFlight()
+    calls = 0
+    release = threading.Event()
+
+    def compute() -> int:
+        nonlocal calls
+        calls += 1
+        release.wait(timeout=1)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(singleflight.do, "key", compute) for _ in range(8)]
+        time.sleep(0.05)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == [42] * 8
+    assert calls == 1
+    assert singleflight.stats() == {"executed": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_exceptions_are_shared_and_key_is_released() -> None:
+    singleflight = SingleFlight()
+
+    def fail() -> int:
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        singleflight.do("key", fail)
+
+    assert singleflight.do("key", lambda: 1) == 1
+
+
+def test_search_service_coalesces_equivalent_queries() -> None:
+    embedder = SlowCountingEmbedder()
+    service = SearchService(embedder, FakeVectorStore(), FakeLangchainLLM(), coalescer=SingleFlight())
+    queries = ["Chelsea news", "  chelsea   NEWS "] * 4
+
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        list(executor.map(lambda q: service.semantic_search(SearchRequestDataClass(query=q, limit=5)), queries))
+
+    assert embedder.query_calls == 1
+
+
+def test_requests_with_different_time_budgets_are_not_coalesced() -> None:
+    embedder = SlowCountingEmbedder()
+    service = SearchService(embedder, FakeVectorStore(), FakeLangchainLLM(), coalescer=SingleFlight())
+    timeouts = [5.0, 10.0] * 4
+
+    with ThreadPoolExecutor(max_workers=len(timeouts)) as executor:
+        list(
+            executor.map(
+                lambda timeout_s: service.semantic_search(
+                    SearchRequestDataClass(query="Chelsea news", limit=5), deadline=Deadline(timeout_s)
+                ),
+                timeouts,
+            )
+        )
+
+    assert embedder.query_calls == 2
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pytest
+
+from src.domain.dataclasses.dataclasses import VectorisedDocument
+from src.exceptions.exceptions import SnapshotMismatchError
+from src.service.snapshots import export_snapshot, import_snapshot
+from tests.fakes import FakeVectorStore
+
+pa = pytest.importorskip("pyarrow")
+
+
+class CountingVectorStore(FakeVectorStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes: list[int] = []
+
+    def add_texts(self, documents: list[VectorisedDocument]) -> None:
+        self.writes.append(len(documents))
+        super().add_texts(documents)
+
+
+def _store() -> FakeVectorStore:
+    store = FakeVectorStore()
+    store.add_texts(
+        [
+            VectorisedDocument(
+                vector=[0.5, -0.25, 1.0],
+                id=f"{i}::0",
+                chunk=f"chunk {i}",
+                url=f"https://example.com/{i}" if i % 2 else None,
+                token_count=3,
+                doc_id=str(i),
+                metadata={"site": "bbc", "year": 2005} if i % 2 else {},
+                content_hash=f"hash{i}",
+                vectors={"v2": [0.125, 0.75]} if i == 0 else {},
+            )
+            for i in range(5)
+        ],
+    )
+    return store
+
+
+@pytest.mark.parametrize("name", ["snapshot.arrow", "snapshot.parquet"])
+def test_round_trip_restores_every_field(tmp_path: Path, name: str) -> None:
+    source = _store()
+    path = tmp_path / name
+
+    assert export_snapshot(source, path, "test_embedder", batch_size=2) == 5
+
+    restored = FakeVectorStore()
+    assert import_snapshot(restored, path, "test_embedder") == 5
+    assert restored.texts == source.texts
+    assert not path.with_name(f"{name}.partial").exists()
+
+
+def test_vectors_are_stored_as_float32(tmp_path: Path) -> None:
+    path = tmp_path / "snapshot.arrow"
+    export_snapshot(_store(), path)
+
+    schema = pa.ipc.open_file(path).schema
+    assert schema.field("vector").type == pa.list_(pa.float32())
+
+
+def test_import_writes_in_batches(tmp_path: Path) -> None:
+    path = tmp_path / "snapshot.arrow"
+    export_snapshot(_store(), path, batch_size=4)
+
+    restored = CountingVectorStore()
+    import_snapshot(restored, path, batch_size=2)
+    assert restored.writes == [2, 2, 1]
+
+
+def test_snapshot_from_another_embedder_is_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "snapshot.parquet"
+    export_snapshot(_store(), path, "old_embedder")
+
+    restored = FakeVectorStore()
+    with pytest.raises(SnapshotMismatchError):
+        import_snapshot(restored, path, "new_embedder")
+    assert restored.texts == []
@@ -0,0 +1,107 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.infrastructure import tracing
+from src.infrastructure.tracing import TraceMiddleware, TraceRecorder, request_shape
+
+
+def _traced_app(recorder: TraceRecorder | None) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TraceMiddleware, recorder_factory=lambda: recorder)
+
+    @app.post("/search/{kind}")
+    def search(kind: str, body: dict[str, object]) -> dict[str, object]:
+        return {"kind": kind, "body": body}
+
+    return app
+
+
+def test_request_shape_keeps_sizes_only() -> None:
+    assert request_shape(b'{"query": "tell me about chelsea", "limit": 5}') == {
+        "query_chars": 21,
+        "query_words": 4,
+        "limit": 5,
+    }
+    assert request_shape(b'[{"id": "1", "body": "abc"}, {"id": "2", "body": "de"}]') == {
+        "documents": 2,
+        "document_chars": 5,
+    }
+    assert request_shape(b'{"ids": ["a", "b", "c"]}') == {"ids": 3}
+    assert request_shape(b"not json") == {}
+
+
+def test_middleware_records_anonymised_trace(tmp_path: Path) -> None:
+    recorder = TraceRecorder(tmp_path / "traces.jsonl")
+    client = TestClient(_traced_app(recorder))
+
+    response = client.post("/search/semantic?index=private", json={"query": "secret words", "limit": 3})
+
+    assert response.json()["body"] == {"query": "secret words", "limit": 3}
+    content = (tmp_path / "traces.jsonl").read_text(encoding="utf-8")
+    assert "secret" not in content
+    assert "private" not in content
+    trace = json.loads(content)
+    assert trace["path"] == "/search/{kind}"
+    assert trace["method"] == "POST"
+    assert trace["status"] == 200
+    assert trace["named_index"] is True
+    assert trace["query_words"] == 2
+    assert trace["limit"] == 3
+    assert trace["duration_ms"] >= 0
+
+
+def test_oversized_bodies_are_marked_truncated(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(tracing, "MAX_CAPTURED_BODY_BYTES", 10)
+    recorder = TraceRecorder(tmp_path / "traces.jsonl")
+    client = TestClient(_traced_app(recorder))
+
+    client.post("/search/semantic", json={"query": "far more than ten bytes", "limit": 3})
+
+    trace = json.loads((tmp_path / "traces.jsonl").read_text(encoding="utf-8"))
+    assert trace["truncated"] == 1
+    assert "query_words" not in trace
+
+
+def test_middleware_is_inert_without_recorder(tmp_path: Path) -> None:
+    client = TestClient(_traced_app(None))
+
+    response = client.post("/search/semantic", json={"query": "q"})
+
+    assert response.status_code == 200
+    assert not list(tmp_path.iterdir())
+
+
+def test_sampled_out_requests_are_not_recorded(tmp_path: Path) -> None:
+    recorder = TraceRecorder(tmp_path / "traces.jsonl", sample_rate=0.0)
+    client = TestClient(_traced_app(recorder))
+
+    client.post("/search/semantic", json={"query": "q"})
+
+    assert recorder.recorded == 0
+
+
+def test_trace_is_written_off_the_event_loop(tmp_path: Path) -> None:
+    writer_threads: list[int] = []
+
+    class ThreadRecordingRecorder(TraceRecorder):
+        def record(self, trace: dict[str, Any]) -> None:
+            writer_threads.append(threading.get_ident())
+            super().record(trace)
+
+    app = FastAPI()
+    app.add_middleware(TraceMiddleware, recorder_factory=lambda: ThreadRecordingRecorder(tmp_path / "traces.jsonl"))
+
+    @app.get("/loop")
+    async def loop_thread() -> int:
+        return threading.get_ident()
+
+    loop_ident = TestClient(app).get("/loop").json()
+
+    assert len(writer_threads) == 1
+    assert writer_threads[0] != loop_ident